@@ -1,68 +1,40 @@
-from pydoc import pager
-import streamlit as st
-import sqlite3
-import json
+import time
+
 import streamlit as st
-import sqlite3
-import base64
-import json
-from streamlit_lottie import st_lottie
-import pandas as pd
-import matplotlib.pyplot as plt
-import os
-
-# Load Lottie animation
-def load_lottie_file(filepath: str):
-    # Check if file exists
-    if os.path.exists(filepath):
-        with open(filepath, "r") as f:
-            return json.load(f)
-    else:
-        st.warning(f"Lottie file not found: {filepath}")
-        return None
-
-# Try to load the Lottie animation file, with fallback
-lottie_animation = None
-lottie_file_path = "assets/Animation - 1729896198439.json"
-if os.path.exists(lottie_file_path):
-    lottie_animation = load_lottie_file(lottie_file_path)
-else:
-    # Try alternative path
-    lottie_file_path_alt = "Animation - 1729896198439.json"
-    if os.path.exists(lottie_file_path_alt):
-        lottie_animation = load_lottie_file(lottie_file_path_alt)
-
-# Database connection
-conn = sqlite3.connect('green_invest.db')
-cursor = conn.cursor()
-
-# Create users table if it doesn't exist
-cursor.execute('''
-CREATE TABLE IF NOT EXISTS users (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    username TEXT NOT NULL UNIQUE,
-    password TEXT NOT NULL,
-    invested_amount REAL DEFAULT 0,
-    energy_produced REAL DEFAULT 0,
-    co_saved REAL DEFAULT 0
-)
-''')
-
-# Commit changes and close the connection
-conn.commit()
-
-# User functions
-def create_user(username, password):
-    try:
-        cursor.execute("INSERT INTO users (username, password) VALUES (?, ?)", (username, password)) 
-        conn.commit()
-        return True
-    except sqlite3.IntegrityError:
-        return False
-
-def check_credentials(username, password):
-    cursor.execute("SELECT * FROM users WHERE username = ? AND password = ?", (username, password))  
-    return cursor.fetchone()
+from db import PoolExhausted, create_user, check_credentials, get_user_profile
+from images import image_bytes
+from resources import lottie_animation
+from passwords import HasherBusy
+from sessions import get_store as get_session_store
+from metrics import Rerun, profiling_allowed
+
+# Modules only some pages need (pandas/numpy for the calculator, the catalog,
+# streamlit_lottie) are imported inside those pages, so the login page and
+# cold starts do not pay for them. Python keeps them loaded once imported.
+
+# Times this rerun for /metrics; ?profile=1 shows a profile of it at the bottom of the page
+rerun = Rerun("app.py", profile=profiling_allowed(st.query_params.get("profile"), st.context.ip_address))
+
+COMPANIES_PER_PAGE = 10
+COMPANY_THUMBNAIL_WIDTH = 320
+# Cookie holding the session token between page loads. Never put the token
+# in the URL, where history, referrers and logs would keep it.
+SESSION_COOKIE = "green_invest_session"
+
+
+# Profile snapshot stored on the session
+def load_profile(user_id):
+    row = get_user_profile(user_id)
+    return dict(row) if row else None
+
+
+def set_session_cookie(token, max_age):
+    """Set the session cookie from the browser (Streamlit cannot send Set-Cookie); max_age 0 clears it."""
+    st.iframe(f"""<script>
+        const secure = window.parent.location.protocol === "https:" ? "; Secure" : "";
+        window.parent.document.cookie = "{SESSION_COOKIE}={token}; Max-Age={int(max_age)}; Path=/; SameSite=Strict" + secure;
+    </script>""", height=1)
+
 
 # Streamlit app layout
 st.set_page_config(page_title="Green Invest", layout="wide")
@@ -86,12 +58,10 @@ st.markdown("""
     </style>
 """, unsafe_allow_html=True)
 
-# Display the logo - with error handling
-logo_path = 'assets/login.jpg'
-if os.path.exists(logo_path):
-    st.markdown('<div class="logo-container"><img class="logo" src="data:login.jpg;base64,{}" alt="Logo"></div>'.format(
-        base64.b64encode(open(logo_path, 'rb').read()).decode()
-    ), unsafe_allow_html=True)
+# Display the logo - with error handling (a resized variant, encoded once per process)
+logo_bytes = image_bytes('login.jpg', width=700)
+if logo_bytes:
+    st.columns([1, 1, 1])[1].image(logo_bytes, width=350)
 else:
     # Fallback - just show the title
     st.markdown("<h1 class='main-title'>Green Invest</h1>", unsafe_allow_html=True)
@@ -99,20 +69,40 @@ else:
 # Login or Signup Form Selection
 auth_mode = st.sidebar.selectbox("Select Mode", ["Login", "Sign Up"])
 
+# Restore the login from the server-side session. The token is kept in
+# st.session_state and in a cookie, so a reload or another app process
+# behind the load balancer finds the same session.
+session_store = get_session_store()
+session = session_store.get(st.session_state.get("session_token") or st.context.cookies.get(SESSION_COOKIE))
+if session:
+    st.session_state.session_token = session.token
+    st.session_state.logged_in = True
+    st.session_state.user_id = session.user_id
+else:
+    # Expired, logged out elsewhere, or never logged in
+    for key in ("logged_in", "user_id", "session_token"):
+        st.session_state.pop(key, None)
+
 # Sign Up Form
 if auth_mode == "Sign Up" and "logged_in" not in st.session_state:
     st.markdown("<h1 class='main-title'>Sign Up for Green Invest</h1>", unsafe_allow_html=True)      
     with st.form("signup_form"):
         st.write("Create a new account.")
         new_username = st.text_input("Username")
+        new_email = st.text_input("Email (optional)")
         new_password = st.text_input("Password", type="password")
         signup_button = st.form_submit_button("Sign Up")
 
     if signup_button:
-        if create_user(new_username, new_password):
-            st.success("Account created successfully! Please log in.")
+        try:
+            created = create_user(new_username, new_password, new_email)
+        except (HasherBusy, PoolExhausted):
+            st.error("The server is busy. Please try again in a moment.")
         else:
-            st.error("Username already exists. Please choose a different one.")
+            if created:
+                st.success("Account created successfully! Please log in.")
+            else:
+                st.error("Username or email already exists. Please choose a different one.")
 
 # Login Form
 elif auth_mode == "Login" and "logged_in" not in st.session_state:
@@ -125,91 +115,113 @@ elif auth_mode == "Login" and "logged_in" not in st.session_state:
 
     # Verify login
     if login_button:
-        user = check_credentials(username, password)
-        if user:
-            st.session_state.logged_in = True
-            st.session_state.user_id = user[0]  # Store user ID for session
-            st.success("Login successful!")
-            st.experimental_set_query_params()  # Reload the app to show the main content
+        try:
+            user = check_credentials(username, password)
+        except (HasherBusy, PoolExhausted):
+            st.error("The server is busy. Please try again in a moment.")
         else:
-            st.error("Invalid username or password.")
+            if user:
+                session = session_store.create(user["id"], profile=load_profile(user["id"]))
+                st.session_state.session_token = session.token
+                st.session_state.set_session_cookie = True
+                rerun.finish()
+                st.rerun()  # Reload the app to show the main content
+            else:
+                st.error("Invalid username or password.")
 
 # Main Content after Login
 if "logged_in" in st.session_state and st.session_state.logged_in:
     st.markdown("<h1 class='main-title'>Green Invest</h1>", unsafe_allow_html=True)
+    # The login's st.rerun() ends that run before anything renders, so the cookie is set here
+    if st.session_state.pop("set_session_cookie", False):
+        set_session_cookie(session.token, session.expires_at - time.time())
 
     # Sidebar Navigation
     page = st.sidebar.selectbox("Navigation", ["Explore Investment Opportunities", "Chatbot", "User Profile", "Logout"])
 
-    # Sample dummy companies data
-    dummy_companies = [
-        {
-            "name": "SolarTech Innovations",
-            "description": "Leading the way in solar technology and sustainable energy solutions.",  
-            "target_funding": 1000000,
-            "energy_output": 50000,
-            "image": "company1.jpg"
-        },
-        {
-            "name": "Green Energy Solutions",
-            "description": "Committed to providing renewable energy solutions for a sustainable future.",
-            "target_funding": 500000,
-            "energy_output": 30000,
-            "image": "company2.jpg"
-        },
-        {
-            "name": "EcoPower Inc.",
-            "description": "Harnessing the power of the sun to provide clean energy.",
-            "target_funding": 750000,
-            "energy_output": 45000,
-            "image": "company3.jpg"
-        },
-    ]
-
     # Page 1: Explore Investment Opportunities
     if page == "Explore Investment Opportunities":
+        from catalog import SORTS, catalog_bounds, query_companies
+        from ledger import record_investment
+
         st.header("Explore Investment Opportunities")
         st.write("Browse available solar energy projects to make sustainable investments.")
 
-        for company in dummy_companies:
-            st.write(f"### {company['name']}")  # Company Name
-            st.write(f"{company['description']}")  # Description
-            st.write(f"**Target Funding:** ${company['target_funding']:,.2f}")
-            st.write(f"**Energy Output:** {company['energy_output']:,.2f} kWh")
+        # Filters, sorting and paging run in SQL; results are cached per filter set
+        max_funding, max_energy = catalog_bounds()
+        filter_cols = st.columns(4)
+        search = filter_cols[0].text_input("Search by name")
+        min_funding = filter_cols[1].number_input("Min. target funding ($)", 0.0, float(max_funding), 0.0, step=10000.0)
+        min_energy = filter_cols[2].number_input("Min. energy output (kWh)", 0.0, float(max_energy), 0.0, step=1000.0)
+        sort = filter_cols[3].selectbox("Sort by", list(SORTS))
+        page_number = st.session_state.get("catalog_page", 1)
+
+        results = query_companies(search, min_funding, min_energy, sort, page_number, page_size=COMPANIES_PER_PAGE)
+        st.caption(f"{results.total:,} projects found")
+
+        for company in results.companies:
+            image_col, details_col = st.columns([1, 3])
+            thumbnail = image_bytes(company['image'], width=COMPANY_THUMBNAIL_WIDTH)
+            if thumbnail:
+                image_col.image(thumbnail)
+            details_col.markdown(
+                f"### {company['name']}\n"
+                f"{company['description'] or ''}\n\n"
+                f"**Target Funding:** ${company['target_funding']:,.2f}  \n"
+                f"**Energy Output:** {company['energy_output']:,.2f} kWh"
+            )
 
             # Invest button
-            if st.button(f"Invest in {company['name']}"):
-                st.write(f"### Investment Details for {company['name']}")
-                st.write(f"**Description:** {company['description']}")
-                st.write(f"**Target Funding:** ${company['target_funding']:,.2f}")
-                st.write(f"**Energy Output:** {company['energy_output']:,.2f} kWh")
-                st.write("Thank you for your interest in investing!")
+            amount_col, button_col = st.columns([3, 1], vertical_alignment="bottom")
+            amount = amount_col.number_input("Amount ($)", min_value=100.0, value=1000.0, step=100.0, key=f"amount_{company['id']}")
+            if button_col.button(f"Invest in {company['name']}", key=f"invest_{company['id']}"):
+                try:
+                    invested = record_investment(st.session_state.user_id, company['id'], amount)
+                except PoolExhausted:
+                    st.error("The server is busy. Please try again in a moment.")
+                else:
+                    if invested:
+                        session_store.invalidate_profile(session)
+                        st.success(f"Invested ${amount:,.2f} in {company['name']}. Thank you for investing!")
+                    else:
+                        st.error("This project is not accepting investments right now.")
             st.markdown("---")
 
-        if lottie_animation:
-            st_lottie(lottie_animation, speed=1, height=50, width=300, key="animation")
+        if page_number > results.page_count:
+            st.session_state.catalog_page = results.page_count
+        st.number_input(f"Page (of {results.page_count})", min_value=1, max_value=results.page_count, step=1, key="catalog_page")
+
+        # Parsed once per process
+        animation = lottie_animation()
+        if animation:
+            from streamlit_lottie import st_lottie
+            st_lottie(animation, speed=1, height=50, width=300, key="animation")
 
     # Page 3: User Profile
     elif page == "User Profile":
+        import pandas as pd
+        from charts import Y_FIELD, credits_chart_spec, risk_chart_spec
+        from credit_calculator import DECLINE_RATE, GROWTH_MONTHS
+        from portfolio import user_projection
+        from projection_cache import cached_projection
+        from risk_engine import cached_simulation, normal
+        from stats import user_shares
+
         st.header("User Profile")
         st.write("View your investment summary and environmental impact.")
 
-        # Fetch user profile data
-        def get_user_profile(user_id):
-            cursor.execute("SELECT * FROM users WHERE id = ?", (user_id,))
-            return cursor.fetchone()
-
-        user_profile = get_user_profile(st.session_state.user_id)
+        # Profile snapshot cached on the session (impact totals are maintained by the investments ledger)
+        user_profile = session_store.profile(session, load_profile)
 
         # Display user profile information
         if user_profile:
             profile_data = {
                 "Attribute": ["Username", "Invested Amount", "Energy Produced", "CO₂ Saved"],        
                 "Value": [
-                    user_profile[1],  # Username
-                    f"${user_profile[3]:,.2f}",  # Invested Amount
-                    f"{user_profile[4]:,.2f} kWh",  # Energy Produced
-                    f"{user_profile[5]:,.2f} tons"  # CO₂ Saved
+                    user_profile["username"],
+                    f"${user_profile['invested_amount']:,.2f}",
+                    f"{user_profile['energy_produced']:,.2f} kWh",
+                    f"{user_profile['co_saved']:,.2f} tons"
                 ]
             }
 
@@ -217,6 +229,18 @@ if "logged_in" in st.session_state and st.session_state.logged_in:
 
             st.table(profile_df.style.set_table_attributes('style="margin: 0 auto; border-collapse: separate; border-spacing: 0 15px;"'))
 
+            # Only the logged-in user's own holdings, with their share of each company's target
+            shares = user_shares(session.user_id)
+            if shares:
+                st.subheader("Your Shares")
+                st.dataframe(pd.DataFrame([dict(row) for row in shares]), hide_index=True)
+
+                # Read from the last portfolio.py build rather than projected on every rerun
+                projected = user_projection(session.user_id)
+                if projected is not None and projected[Y_FIELD].any():
+                    st.subheader("Projected Credits From Your Holdings")
+                    st.vega_lite_chart(spec=credits_chart_spec(projected))
+
             # Investment Calculator
             st.subheader("Solar Project Share Calculator")
             user_share = st.slider("Enter your share in the company (%):", 0.0, 100.0, 10.0) / 100   
@@ -224,54 +248,36 @@ if "logged_in" in st.session_state and st.session_state.logged_in:
             manufacturing_duration = st.number_input("Manufacturing Duration (in months):", value=6) 
             growth_rate = st.slider("Monthly Growth Rate After Manufacturing (%)", 0.0, 10.0, 2.0) / 100
 
-            # Calculate Credits
-            class CreditCalculator:
-                def __init__(self, user_share, initial_credits, manufacturing_duration, growth_rate):
-                    self.user_share = user_share
-                    self.initial_credits = initial_credits
-                    self.manufacturing_duration = manufacturing_duration
-                    self.growth_rate = growth_rate
-                    self.credit_data = []
-
-                def calculate_manufacturing_loss(self):
-                    decline_rate = 0.05  # 5% monthly loss in credits during manufacturing
-                    credits = self.initial_credits
-                    for month in range(self.manufacturing_duration):
-                        credits -= credits * decline_rate
-                        self.credit_data.append((f'Month {month+1}', credits, credits * self.user_share))
-
-                def calculate_growth_after_manufacturing(self):
-                    credits = self.credit_data[-1][1]
-                    for month in range(12):
-                        credits += credits * self.growth_rate
-                        self.credit_data.append((f'Month {self.manufacturing_duration + month + 1}', credits, credits * self.user_share))
-
-                def get_data(self):
-                    columns = ["Time Period", "Company Credits", "User's Share Credits"]
-                    return pd.DataFrame(self.credit_data, columns=columns)
-
-            calculator = CreditCalculator(user_share, initial_credits, manufacturing_duration, growth_rate)
-            calculator.calculate_manufacturing_loss()
-            calculator.calculate_growth_after_manufacturing()
-            credits_df = calculator.get_data()
-
-            # Plotting
-            fig, ax = plt.subplots(figsize=(10, 5))
-            ax.plot(credits_df["Time Period"], credits_df["User's Share Credits"], marker='o')      
-            ax.set_title("Projected Credits Over Time")
-            ax.set_xlabel("Time Period")
-            ax.set_ylabel("User's Share Credits")
-            plt.xticks(rotation=45)
-            plt.tight_layout()
-            st.pyplot(fig)
+            if st.toggle("Stochastic mode (Monte Carlo)"):
+                # Decline and growth are drawn per month and path around the inputs above
+                growth_months = st.number_input("Projection months after manufacturing:", 1, 120, GROWTH_MONTHS)
+                rate_std = st.slider("Monthly rate volatility (std, %)", 0.0, 5.0, 1.0) / 100
+                paths = st.select_slider("Simulated paths", [10_000, 100_000, 300_000, 1_000_000], 100_000)
+                credits_df = cached_simulation(user_share, initial_credits, manufacturing_duration,
+                                               normal(DECLINE_RATE, rate_std), normal(growth_rate, rate_std),
+                                               growth_months, paths)
+                st.vega_lite_chart(spec=risk_chart_spec(credits_df))
+            else:
+                # Calculate Credits (projection and chart are cached per input set)
+                projection = cached_projection(user_share, initial_credits, manufacturing_duration, growth_rate,
+                                               render_chart=credits_chart_spec)
+                credits_df = projection.frame
+
+                # Plotting (Vega-Lite spec, drawn in the browser)
+                st.vega_lite_chart(spec=projection.chart)
 
             st.dataframe(credits_df.style.set_table_attributes('style="margin: 0 auto; border-collapse: separate; border-spacing: 0 15px;"'))
 
     # Logout
     elif page == "Logout":
-        st.session_state.logged_in = False
-        st.session_state.user_id = None
+        session_store.delete(session.token)
+        for key in ("logged_in", "user_id", "session_token"):
+            st.session_state.pop(key, None)
+        set_session_cookie("", 0)
         st.success("You have logged out successfully. Please log in again.")
 
-# Close the database connection when the app ends
-conn.close()
\ No newline at end of file
+# Rerun timing, and the profile when one was requested
+rerun_report = rerun.finish()
+if rerun_report:
+    with st.expander("Profile of this rerun"):
+        st.code(rerun_report)
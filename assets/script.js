@@ -10,12 +10,56 @@ const themeToggleBtn = document.querySelector("#theme-toggle-btn");
 const deleteChatsBtn = document.querySelector("#delete-chats-btn");
 const suggestionsContainer = document.querySelector(".suggestions");
 
+// Set by the embedding page; otherwise the server that served this page,
+// or the default local research server when inlined
+const RESEARCH_API_URL = window.RESEARCH_API_URL
+    || (location.protocol.startsWith("http") ? location.origin : "http://127.0.0.1:8502");
+
+// Chat history is kept in IndexedDB, one record per message. Messages are
+// appended as they happen and only the newest page is read on load; older
+// pages load as the user scrolls up. Past HISTORY_LIMIT messages the oldest
+// are dropped.
+const HISTORY_DB = "chat-history";
+const HISTORY_STORE = "messages";
+const HISTORY_PAGE_SIZE = window.CHAT_HISTORY_PAGE_SIZE || 20;
+const HISTORY_LIMIT = window.CHAT_HISTORY_LIMIT || 500;
+// Where earlier versions kept the whole chat container's HTML
+const LEGACY_CHATS_KEY = "all-chats";
+
 let controller = null;
 let filesArray = [];
 
 const removeSuggestions = () => suggestionsContainer.classList.add("hidden");
 
-const handleFormSubmission = async (userMessage, filesData = []) => {
+// Parse a Server-Sent Events stream, calling onEvent(name, data) for each event
+const readEventStream = async (body, onEvent) => {
+    const reader = body.getReader();
+    const decoder = new TextDecoder();
+    let buffer = "";
+
+    while (true) {
+        const { value, done } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+
+        let boundary;
+        while ((boundary = buffer.indexOf("\n\n")) !== -1) {
+            const frame = buffer.slice(0, boundary);
+            buffer = buffer.slice(boundary + 2);
+            let event = "message";
+            let data = "";
+            frame.split("\n").forEach(line => {
+                if (line.startsWith("event:")) event = line.slice(6).trim();
+                else if (line.startsWith("data:")) data += line.slice(5).trim();
+            });
+            onEvent(event, data ? JSON.parse(data) : {});
+        }
+    }
+};
+
+// Stream the research answer: onSource fires for each source as it arrives,
+// onReset when those sources are replaced, onAnswer once with the summary and suggestions
+const handleFormSubmission = async (userMessage, filesData = [], { onSource, onReset, onAnswer }) => {
     const formData = {
         query: userMessage,  // Changed from message to query to match backend
         files: filesData,
@@ -23,21 +67,29 @@ const handleFormSubmission = async (userMessage, filesData = []) => {
     
     try {
         controller = new AbortController();
-        const response = await fetch("http://127.0.0.1:8502/api/research", {  // Use full URL
+        const response = await fetch(`${RESEARCH_API_URL}/api/research/stream`, {
             method: "POST",
             headers: {
                 "Content-Type": "application/json",
-                "Accept": "application/json"
+                "Accept": "text/event-stream"
             },
             body: JSON.stringify(formData),
             signal: controller.signal,
         });
+        if (!response.ok || !response.body) {
+            throw new Error(`HTTP ${response.status}`);
+        }
 
-        const data = await response.json();
-        if (data.error) {
-            throw new Error(data.error);
+        let answer = null;
+        await readEventStream(response.body, (event, data) => {
+            if (event === "source") onSource(data);
+            else if (event === "reset") onReset();
+            else if (event === "answer") answer = data;
+        });
+        if (!answer || answer.error) {
+            throw new Error(answer ? answer.error : "incomplete_response");
         }
-        return data;
+        onAnswer(answer);
     } catch (error) {
         if (error.name === "AbortError") {
             throw new Error("Request aborted.");
@@ -53,90 +105,293 @@ const createChatElement = (content, className) => {
         <div class="chat-content">
             <div class="chat-details">
                 <img src="${className === "outgoing" ? "assets/user.jpg" : "assets/chatbot.jpg"}" alt="chat-avatar">
-                <p>${content}</p>
+                <p></p>
             </div>
         </div>
     `;
+    chatDiv.querySelector(".chat-details p").textContent = content;
     return chatDiv;
 };
 
-const getChatResponse = async (incomingChatDiv, userMessage) => {
-    try {
-        const response = await handleFormSubmission(userMessage, filesArray);
-        incomingChatDiv.querySelector(".typing-animation")?.remove();
-        
-        // Create response content
-        const contentDiv = document.createElement("div");
-        contentDiv.className = "chat-response";
-        
-        // Add main response
-        if (response.summary) {
-            const mainResponse = document.createElement("div");
-            mainResponse.className = "main-response";
-            mainResponse.textContent = response.summary;
-            contentDiv.appendChild(mainResponse);
+const createSourceCard = (source) => {
+    const sourceCard = document.createElement("a");
+    sourceCard.href = source.url;
+    sourceCard.target = "_blank";
+    sourceCard.className = "source-card";
+    
+    // Add thumbnail if available
+    if (source.thumbnail) {
+        const img = document.createElement("img");
+        img.src = source.thumbnail;
+        img.alt = source.title;
+        sourceCard.appendChild(img);
+    }
+    
+    const sourceInfo = document.createElement("div");
+    sourceInfo.className = "source-info";
+    sourceInfo.innerHTML = `
+        <div class="source-title">${source.title || 'Source'}</div>
+        <div class="source-text">${source.text.substring(0, 150)}...</div>
+        <div class="source-domain">${source.source}</div>
+    `;
+    sourceCard.appendChild(sourceInfo);
+    return sourceCard;
+};
+
+const createSuggestions = (suggestions) => {
+    const suggestionsDiv = document.createElement("div");
+    suggestionsDiv.className = "response-suggestions";
+    
+    suggestions.forEach(suggestion => {
+        const suggestionBtn = document.createElement("button");
+        suggestionBtn.className = "suggestion-btn";
+        suggestionBtn.textContent = suggestion.text;
+        suggestionBtn.onclick = () => {
+            promptInput.value = suggestion.text;
+            promptForm.dispatchEvent(new Event("submit"));
+        };
+        suggestionsDiv.appendChild(suggestionBtn);
+    });
+    return suggestionsDiv;
+};
+
+const idbRequest = (request) => new Promise((resolve, reject) => {
+    request.onsuccess = () => resolve(request.result);
+    request.onerror = () => reject(request.error);
+});
+
+const idbTransaction = (transaction) => new Promise((resolve, reject) => {
+    transaction.oncomplete = () => resolve();
+    transaction.onerror = transaction.onabort = () => reject(transaction.error);
+});
+
+// Messages rebuilt from the legacy innerHTML snapshot, oldest first
+const parseLegacyChats = (html) => {
+    const doc = new DOMParser().parseFromString(html, "text/html");
+    return [...doc.querySelectorAll(".chat")].map(chat => {
+        if (chat.classList.contains("outgoing")) {
+            return { role: "outgoing", text: chat.querySelector(".chat-details p")?.textContent || "" };
         }
-        
-        // Add sources if available
-        if (response.sources && response.sources.length > 0) {
-            const sourcesDiv = document.createElement("div");
-            sourcesDiv.className = "sources";
-            
-            response.sources.forEach(source => {
-                const sourceCard = document.createElement("a");
-                sourceCard.href = source.url;
-                sourceCard.target = "_blank";
-                sourceCard.className = "source-card";
-                
-                // Add thumbnail if available
-                if (source.thumbnail) {
-                    const img = document.createElement("img");
-                    img.src = source.thumbnail;
-                    img.alt = source.title;
-                    sourceCard.appendChild(img);
-                }
-                
-                const sourceInfo = document.createElement("div");
-                sourceInfo.className = "source-info";
-                sourceInfo.innerHTML = `
-                    <div class="source-title">${source.title || 'Source'}</div>
-                    <div class="source-text">${source.text.substring(0, 150)}...</div>
-                    <div class="source-domain">${source.source}</div>
-                `;
-                sourceCard.appendChild(sourceInfo);
-                sourcesDiv.appendChild(sourceCard);
-            });
-            
-            contentDiv.appendChild(sourcesDiv);
+        if (chat.querySelector(".error-message")) {
+            return { role: "incoming", error: true };
         }
-        
-        // Add suggestions if available
-        if (response.suggestions && response.suggestions.length > 0) {
-            const suggestionsDiv = document.createElement("div");
-            suggestionsDiv.className = "response-suggestions";
-            
-            response.suggestions.forEach(suggestion => {
-                const suggestionBtn = document.createElement("button");
-                suggestionBtn.className = "suggestion-btn";
-                suggestionBtn.textContent = suggestion.text;
-                suggestionBtn.onclick = () => {
-                    promptInput.value = suggestion.text;
-                    promptForm.dispatchEvent(new Event("submit"));
-                };
-                suggestionsDiv.appendChild(suggestionBtn);
-            });
-            
-            contentDiv.appendChild(suggestionsDiv);
+        const main = chat.querySelector(".main-response");
+        return {
+            role: "incoming",
+            summary: (main || chat.querySelector(".chat-details")).textContent.trim(),
+            sources: [...chat.querySelectorAll(".source-card")].map(card => ({
+                url: card.getAttribute("href"),
+                title: card.querySelector(".source-title")?.textContent || "",
+                text: card.querySelector(".source-text")?.textContent.replace(/\.\.\.$/, "") || "",
+                source: card.querySelector(".source-domain")?.textContent || "",
+                thumbnail: card.querySelector("img")?.getAttribute("src") || undefined,
+            })),
+            suggestions: [...chat.querySelectorAll(".suggestion-btn")].map(btn => ({ text: btn.textContent })),
+        };
+    });
+};
+
+// One-time move of the legacy localStorage history into the store
+const migrateLegacyChats = async (db) => {
+    const html = localStorage.getItem(LEGACY_CHATS_KEY);
+    if (html === null) return;
+    const transaction = db.transaction(HISTORY_STORE, "readwrite");
+    const store = transaction.objectStore(HISTORY_STORE);
+    parseLegacyChats(html).slice(-HISTORY_LIMIT).forEach(message => store.add({ ...message, created: 0 }));
+    await idbTransaction(transaction);
+    localStorage.removeItem(LEGACY_CHATS_KEY);
+};
+
+let historyDb = null;
+
+// The history database, or null where IndexedDB is unavailable (private
+// browsing, sandboxed frames); chats then simply aren't kept
+const openHistory = () => {
+    historyDb ??= (async () => {
+        try {
+            const request = indexedDB.open(HISTORY_DB, 1);
+            request.onupgradeneeded = () => {
+                request.result.createObjectStore(HISTORY_STORE, { keyPath: "id", autoIncrement: true });
+            };
+            const db = await idbRequest(request);
+            db.onversionchange = () => db.close();
+            await migrateLegacyChats(db);
+            return db;
+        } catch (error) {
+            console.error("Chat history unavailable:", error);
+            return null;
+        }
+    })();
+    return historyDb;
+};
+
+// Append one message and drop whatever falls outside the retention cap.
+// Ids only grow, so the cap is a single key-range delete.
+const saveMessage = async (message) => {
+    const db = await openHistory();
+    if (!db) return;
+    const transaction = db.transaction(HISTORY_STORE, "readwrite");
+    const store = transaction.objectStore(HISTORY_STORE);
+    const id = await idbRequest(store.add({ ...message, created: Date.now() }));
+    if (id > HISTORY_LIMIT) {
+        store.delete(IDBKeyRange.upperBound(id - HISTORY_LIMIT));
+    }
+    await idbTransaction(transaction);
+};
+
+// Up to HISTORY_PAGE_SIZE messages older than beforeId, oldest first
+const loadMessages = async (beforeId = Infinity) => {
+    const db = await openHistory();
+    if (!db) return [];
+    const range = beforeId === Infinity ? null : IDBKeyRange.upperBound(beforeId, true);
+    const request = db.transaction(HISTORY_STORE).objectStore(HISTORY_STORE).openCursor(range, "prev");
+    const messages = [];
+    return new Promise((resolve, reject) => {
+        request.onerror = () => reject(request.error);
+        request.onsuccess = () => {
+            const cursor = request.result;
+            if (cursor && messages.length < HISTORY_PAGE_SIZE) {
+                messages.push(cursor.value);
+                cursor.continue();
+            } else {
+                resolve(messages.reverse());
+            }
+        };
+    });
+};
+
+const clearMessages = async () => {
+    const db = await openHistory();
+    if (db) {
+        await idbRequest(db.transaction(HISTORY_STORE, "readwrite").objectStore(HISTORY_STORE).clear());
+    }
+};
+
+const createResponseContent = ({ summary, sources = [], suggestions = [] }) => {
+    const contentDiv = document.createElement("div");
+    contentDiv.className = "chat-response";
+    const mainResponse = document.createElement("div");
+    mainResponse.className = "main-response";
+    mainResponse.textContent = summary || "";
+    const sourcesDiv = document.createElement("div");
+    sourcesDiv.className = "sources";
+    sources.forEach(source => sourcesDiv.appendChild(createSourceCard(source)));
+    contentDiv.append(mainResponse, sourcesDiv);
+    if (suggestions.length > 0) {
+        contentDiv.appendChild(createSuggestions(suggestions));
+    }
+    return contentDiv;
+};
+
+const createErrorMessage = () => {
+    const errorMessage = document.createElement("p");
+    errorMessage.className = "error-message";
+    errorMessage.textContent = "Oops! Something went wrong. Please try again.";
+    return errorMessage;
+};
+
+const createHistoryElement = (message) => {
+    if (message.role === "outgoing") {
+        return createChatElement(message.text, "outgoing");
+    }
+    const chatDiv = createChatElement("", "incoming");
+    const chatDetails = chatDiv.querySelector(".chat-details");
+    chatDetails.innerHTML = "";
+    chatDetails.appendChild(message.error ? createErrorMessage() : createResponseContent(message));
+    return chatDiv;
+};
+
+// Older pages are prepended when this marker at the top scrolls into view
+const historySentinel = document.createElement("div");
+historySentinel.className = "history-sentinel";
+let oldestLoadedId = Infinity;
+let loadingHistory = false;
+
+const loadOlderMessages = async () => {
+    if (loadingHistory || oldestLoadedId <= 1) return;
+    loadingHistory = true;
+    try {
+        const messages = await loadMessages(oldestLoadedId);
+        if (messages.length === 0) {
+            oldestLoadedId = 0;
+            historyObserver.disconnect();
+            return;
         }
-        
-        const chatDetails = incomingChatDiv.querySelector(".chat-details");
+        oldestLoadedId = messages[0].id;
+        // Keep the messages on screen where they are
+        const fromBottom = chatContainer.scrollHeight - chatContainer.scrollTop;
+        const fragment = document.createDocumentFragment();
+        messages.forEach(message => fragment.appendChild(createHistoryElement(message)));
+        historySentinel.after(fragment);
+        chatContainer.scrollTop = chatContainer.scrollHeight - fromBottom;
+    } finally {
+        loadingHistory = false;
+    }
+};
+
+const historyObserver = new IntersectionObserver(
+    (entries) => entries.some(entry => entry.isIntersecting) && loadOlderMessages(),
+    { root: chatContainer, rootMargin: "200px 0px 0px 0px" },
+);
+
+const restoreHistory = async () => {
+    chatContainer.prepend(historySentinel);
+    await loadOlderMessages();
+    if (oldestLoadedId !== Infinity && oldestLoadedId !== 0) {
+        removeSuggestions();
+        chatContainer.scrollTo(0, chatContainer.scrollHeight);
+        historyObserver.observe(historySentinel);
+    }
+};
+
+const getChatResponse = async (incomingChatDiv, userMessage) => {
+    const chatDetails = incomingChatDiv.querySelector(".chat-details");
+
+    // Response skeleton, filled in as the stream arrives
+    const contentDiv = document.createElement("div");
+    contentDiv.className = "chat-response";
+    const mainResponse = document.createElement("div");
+    mainResponse.className = "main-response";
+    const sourcesDiv = document.createElement("div");
+    sourcesDiv.className = "sources";
+    contentDiv.append(mainResponse, sourcesDiv);
+    const sources = [];
+
+    let shown = false;
+    const show = () => {
+        if (shown) return;
+        shown = true;
+        incomingChatDiv.querySelector(".typing-animation")?.remove();
         chatDetails.innerHTML = ""; // Clear existing content
         chatDetails.appendChild(contentDiv);
-        
+    };
+
+    try {
+        await handleFormSubmission(userMessage, filesArray, {
+            onSource: (source) => {
+                show();
+                sources.push(source);
+                sourcesDiv.appendChild(createSourceCard(source));
+                chatContainer.scrollTo(0, chatContainer.scrollHeight);
+            },
+            onReset: () => {
+                sources.length = 0;
+                sourcesDiv.replaceChildren();
+            },
+            onAnswer: (answer) => {
+                show();
+                mainResponse.textContent = answer.summary || "";
+                if (answer.suggestions && answer.suggestions.length > 0) {
+                    contentDiv.appendChild(createSuggestions(answer.suggestions));
+                }
+                saveMessage({ role: "incoming", summary: answer.summary, sources, suggestions: answer.suggestions || [] });
+            },
+        });
     } catch (error) {
         incomingChatDiv.querySelector(".typing-animation")?.remove();
-        incomingChatDiv.querySelector(".chat-details").innerHTML = 
-            '<p class="error-message">Oops! Something went wrong. Please try again.</p>';
+        chatDetails.innerHTML = "";
+        chatDetails.appendChild(createErrorMessage());
+        saveMessage({ role: "incoming", error: true });
     } finally {
         filesArray = [];
         stopResponseBtn.style.display = "none";
@@ -154,6 +409,7 @@ const handleChat = async (e) => {
 
     // Append the user's message to the chat
     chatContainer.appendChild(createChatElement(userMessage, "outgoing"));
+    saveMessage({ role: "outgoing", text: userMessage });
     chatContainer.scrollTo(0, chatContainer.scrollHeight);
 
     // Create and append the incoming chat div
@@ -192,8 +448,11 @@ const handleThemeToggle = () => {
 
 const handleDeleteChats = () => {
     if(confirm("Are you sure you want to delete all chats?")) {
-        chatContainer.innerHTML = "";
-        localStorage.removeItem("all-chats");
+        chatContainer.replaceChildren(historySentinel);
+        historyObserver.disconnect();
+        oldestLoadedId = 0;
+        localStorage.removeItem(LEGACY_CHATS_KEY);
+        clearMessages();
     }
 };
 
@@ -218,4 +477,6 @@ suggestionsContainer.addEventListener("click", handleSuggestionClick);
 // Load saved theme from localStorage
 if(localStorage.getItem("theme") === "dark") {
     handleThemeToggle();
-}
\ No newline at end of file
+}
+
+restoreHistory();
@@ -0,0 +1,118 @@
+"""Per-rerun latency and RSS growth of the profile page chart.
+
+Compares the old pyplot path (a new figure per rerun, never closed) and a
+per-thread reused figure rendered to PNG with the Vega-Lite spec from
+charts.py that the pages draw.
+Each mode runs in its own interpreter so RSS numbers do not mix.
+
+    python benchmarks/bench_chart.py --reruns 200
+"""
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MODES = ["pyplot", "pooled", "vega"]
+
+
+def rss_mb():
+    """Current resident set size in MB (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def make_renderer(mode):
+    if mode == "pyplot":
+        import matplotlib
+        matplotlib.use("Agg")
+        import matplotlib.pyplot as plt
+
+        def render(credits_df):
+            fig, ax = plt.subplots(figsize=(10, 5))
+            ax.plot(credits_df["Time Period"], credits_df["User's Share Credits"], marker='o')
+            ax.set_title("Projected Credits Over Time")
+            plt.xticks(rotation=45)
+            plt.tight_layout()
+            fig.canvas.draw()
+            return fig
+        return render
+
+    if mode == "pooled":
+        import io
+
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        # One figure built with the object-oriented API (never registered
+        # with pyplot), cleared and redrawn on every rerun
+        fig = Figure(figsize=(10, 5))
+        FigureCanvasAgg(fig)
+
+        def render(credits_df):
+            fig.clear()
+            ax = fig.add_subplot()
+            ax.plot(credits_df["Time Period"], credits_df["User's Share Credits"], marker='o')
+            ax.set_title("Projected Credits Over Time")
+            ax.tick_params(axis='x', labelrotation=45)
+            fig.tight_layout()
+            buf = io.BytesIO()
+            fig.savefig(buf, format="png", dpi=100)
+            return buf.getvalue()
+        return render
+
+    from charts import credits_chart_spec
+    return lambda credits_df: json.dumps(credits_chart_spec(credits_df))
+
+
+def run_mode(mode, reruns):
+    from credit_calculator import project_credits
+
+    render = make_renderer(mode)
+    render(project_credits(0.1, 1_000_000, 6, 0.02))  # warm-up: imports, font cache
+    start_rss = rss_mb()
+    timings = []
+    for i in range(reruns):
+        credits_df = project_credits(0.1, 1_000_000 + i, 6, 0.02)
+        t0 = time.perf_counter()
+        render(credits_df)
+        timings.append(time.perf_counter() - t0)
+    timings.sort()
+    return {
+        "mode": mode,
+        "reruns": reruns,
+        "mean_ms": 1000 * sum(timings) / reruns,
+        "p95_ms": 1000 * timings[int(0.95 * (reruns - 1))],
+        "rss_growth_mb": rss_mb() - start_rss,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reruns", type=int, default=100)
+    parser.add_argument("--mode", choices=MODES, help="run a single mode in this process")
+    args = parser.parse_args()
+
+    if args.mode:
+        print(json.dumps(run_mode(args.mode, args.reruns)))
+        return
+
+    print(f"{'mode':<8} {'mean ms':>9} {'p95 ms':>9} {'RSS growth MB':>14}")
+    for mode in MODES:
+        out = subprocess.run([sys.executable, __file__, "--mode", mode, "--reruns", str(args.reruns)],
+                             check=True, capture_output=True, text=True).stdout
+        r = json.loads(out.strip().splitlines()[-1])
+        print(f"{r['mode']:<8} {r['mean_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['rss_growth_mb']:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
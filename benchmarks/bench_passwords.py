@@ -0,0 +1,58 @@
+"""Login throughput (logins/sec) at several scrypt cost settings.
+
+Runs check_credentials() from concurrent client threads against a
+throwaway copy of the users table, once per cost setting:
+
+    python benchmarks/bench_passwords.py --costs 12 14 15 --clients 8
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+def run(log2_n, clients, logins, users=16):
+    import db
+    import passwords
+
+    passwords._hasher = passwords.Hasher(n=2**log2_n)
+    names = [f"bench-{log2_n}-{i}" for i in range(users)]
+    for name in names:
+        db.create_user(name, "correct horse")
+
+    def client(i):
+        for j in range(logins):
+            assert db.check_credentials(names[(i + j) % users], "correct horse")
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(clients)]
+    start = time.perf_counter()
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    return clients * logins / elapsed, elapsed / logins * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--costs", type=int, nargs="+", default=[12, 13, 14, 15], help="log2 of scrypt N")
+    parser.add_argument("--clients", type=int, default=8)
+    parser.add_argument("--logins", type=int, default=10, help="logins per client")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["GREEN_INVEST_DB"] = os.path.join(tmp, "bench.db")
+        print(f"{'scrypt N':>10} {'logins/s':>10} {'ms/login (per client)':>22}   workers={os.environ.get('PASSWORD_WORKERS', 'default')}")
+        for log2_n in args.costs:
+            rate, latency = run(log2_n, args.clients, args.logins)
+            print(f"{'2^' + str(log2_n):>10} {rate:>10.1f} {latency:>22.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,199 @@
+"""Benchmark cases run by runner.py.
+
+Each ``@case`` function sets up its inputs and returns (or yields) the
+callable that is timed. Names are grouped by the production path they
+cover: calculator, risk, chart, db, research and page.
+"""
+import itertools
+import os
+import threading
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CASES = []
+
+
+def case(name, params=None, ops=1):
+    """Register a benchmark.
+
+    ``params`` is a list of keyword-argument dicts, one variant each.
+    ``ops`` is the number of operations one call performs (an int or a
+    function of the params) and turns timings into ops/sec.
+    """
+    def register(fn):
+        for p in params or [{}]:
+            label = name + (f"[{','.join(f'{k}={v}' for k, v in p.items())}]" if p else "")
+            CASES.append((label, fn, p, ops(**p) if callable(ops) else ops))
+        return fn
+    return register
+
+
+# Manufacturing durations giving 12-, 60- and 240-month horizons
+HORIZONS = [{"duration": 0}, {"duration": 48}, {"duration": 228}]
+
+
+# Calculator
+@case("calculator.CreditCalculator", params=[{"duration": d["duration"], "batch": b}
+                                             for d in HORIZONS for b in (1, 100)], ops=lambda duration, batch: batch)
+def credit_calculator_loop(duration, batch):
+    from credit_calculator import CreditCalculator
+
+    def run():
+        for i in range(batch):
+            calc = CreditCalculator(0.1, 1_000_000 + i, duration, 0.02)
+            calc.calculate_manufacturing_loss()
+            calc.calculate_growth_after_manufacturing()
+            calc.get_data()
+    return run
+
+
+@case("calculator.project_credits", params=HORIZONS)
+def project_credits(duration):
+    from credit_calculator import project_credits
+    return lambda: project_credits(0.1, 1_000_000, duration, 0.02)
+
+
+@case("calculator.project_scenarios", params=[{"duration": d["duration"], "batch": b}
+                                              for d in HORIZONS for b in (1, 100, 100_000)],
+      ops=lambda duration, batch: batch)
+def project_scenarios(duration, batch):
+    import numpy as np
+    from credit_calculator import project_scenarios
+
+    initial = np.linspace(500_000, 2_000_000, batch)
+    return lambda: project_scenarios(0.1, initial, duration, 0.02)
+
+
+@case("calculator.cached_projection")
+def cached_projection():
+    from charts import credits_chart_spec
+    from projection_cache import cached_projection
+    return lambda: cached_projection(0.1, 1_000_000, 6, 0.02, render_chart=credits_chart_spec)
+
+
+# Monte Carlo (in-process; the pool only pays off with more than one core)
+@case("risk.simulate_credits", params=[{"paths": 10_000}, {"paths": 100_000}], ops=lambda paths: paths)
+def simulate_credits(paths):
+    from risk_engine import simulate_credits
+    return lambda: simulate_credits(0.1, 1_000_000, 6, paths=paths, seed=0, parallel=False)
+
+
+# Charts (see bench_chart.py for the RSS comparison with the old pyplot and PNG paths)
+@case("chart.credits_chart_spec")
+def chart_spec():
+    from charts import credits_chart_spec
+    from credit_calculator import project_credits
+
+    df = project_credits(0.1, 1_000_000, 6, 0.02)
+    return lambda: credits_chart_spec(df)
+
+
+# Database (production scrypt cost; see bench_passwords.py to sweep it)
+@case("db.create_user")
+def create_user():
+    from db import create_user
+
+    names = (f"bench-create-{i}" for i in itertools.count())
+    return lambda: create_user(next(names), "correct horse")
+
+
+@case("db.check_credentials", params=[{"clients": 1}, {"clients": 4}], ops=lambda clients: clients)
+def check_credentials(clients):
+    from db import check_credentials, create_user
+
+    names = [f"bench-login-{i}" for i in range(clients)]
+    for name in names:
+        create_user(name, "correct horse")
+
+    def login(name):
+        assert check_credentials(name, "correct horse")
+
+    def run():
+        threads = [threading.Thread(target=login, args=(name,)) for name in names]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+    return run
+
+
+@case("db.query_companies")
+def query_companies():
+    from catalog import CATALOG_CACHE, query_companies
+
+    def run():
+        CATALOG_CACHE.clear()
+        query_companies(search="solar", page=1, page_size=10)
+    return run
+
+
+# Research API against the local upstream stub
+@case("research.api", params=[{"cached": False}, {"cached": True}])
+def research_api(cached):
+    from rate_limit import RateLimiter
+    from research import ResearchClient
+    from research_cache import ResearchCache
+    from research_server import create_app
+    from research_stub import StubUpstream
+
+    stub = StubUpstream().start()
+    client = ResearchClient(**stub.client_urls())
+    # Every call comes from one client; lift its rate limit
+    app = create_app(client=client, cache=ResearchCache(db_path=None),
+                     limiter=RateLimiter(rate=1e9, burst=10**9)).test_client()
+    queries = (("solar panels" if cached else f"solar panels {i}") for i in itertools.count())
+
+    def run():
+        response = app.post("/api/research", json={"query": next(queries)})
+        assert response.status_code == 200
+    yield run
+    stub.stop()
+
+
+@case("research.api_upstream_down")
+def research_api_upstream_down():
+    """Every upstream failing: open circuits fail fast and the stale answer is served."""
+    from rate_limit import RateLimiter
+    from research import ResearchClient
+    from research_cache import ResearchCache
+    from research_server import create_app
+    from research_stub import StubUpstream
+
+    stub = StubUpstream().start()
+    client = ResearchClient(**stub.client_urls())
+    app = create_app(client=client, cache=ResearchCache(db_path=None, ttl=0),
+                     limiter=RateLimiter(rate=1e9, burst=10**9)).test_client()
+    app.post("/api/research", json={"query": "solar panels"})
+    stub.failing = {"ddg", "search", "summary"}
+
+    def run():
+        response = app.post("/api/research", json={"query": "solar panels"})
+        assert response.json.get("stale")
+    yield run
+    stub.stop()
+
+
+# Full script runs through Streamlit's test harness
+@case("page.app", params=[{"script": "app.py"}, {"script": "calc.py"}])
+def page_run(script):
+    from streamlit.testing.v1 import AppTest
+
+    path = os.path.join(ROOT, script)
+
+    def run():
+        at = AppTest.from_file(path, default_timeout=30).run()
+        assert not at.exception
+    return run
+
+
+@case("page.calc_statistics")
+def statistics_page():
+    from streamlit.testing.v1 import AppTest
+
+    at = AppTest.from_file(os.path.join(ROOT, "calc.py"), default_timeout=30).run()
+    at.selectbox[0].set_value("Company Statistics")
+
+    def run():
+        at.run()
+        assert not at.exception
+    return run
@@ -0,0 +1,99 @@
+"""Cold-start and rerun cost of the Streamlit entry points, with an import breakdown.
+
+Each script runs in a fresh interpreter under ``-X importtime``: once cold
+(first run, paying for its imports) and then ``--reruns`` more times warm.
+The imports the script itself triggers (after Streamlit is loaded) are
+listed by cumulative time:
+
+    python benchmarks/import_time.py app.py calc.py new_app.py --top 15
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+MARKER = "--- script imports start ---"
+LINE = re.compile(r"import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)")
+
+
+def child(script, reruns):
+    """Runs inside the measured interpreter; prints a JSON result line."""
+    from streamlit.testing.v1 import AppTest
+
+    print(MARKER, file=sys.stderr, flush=True)
+    at = AppTest.from_file(os.path.join(ROOT, script), default_timeout=60)
+    start = time.perf_counter()
+    at.run()
+    cold = time.perf_counter() - start
+    warm = []
+    for _ in range(reruns):
+        start = time.perf_counter()
+        at.run()
+        warm.append(time.perf_counter() - start)
+    print(json.dumps({"cold": cold, "rerun": statistics.median(warm) if warm else None,
+                      "errors": [str(e.value) for e in at.exception]}))
+
+
+def parse_imports(stderr):
+    """Top-level imports after the marker as ``(module, self_us, cumulative_us)``."""
+    _, _, after = stderr.partition(MARKER)
+    imports = []
+    for match in LINE.finditer(after):
+        self_us, cumulative_us, indent, module = match.groups()
+        if len(indent) == 1:  # nested imports are indented further
+            imports.append((module, int(self_us), int(cumulative_us)))
+    return imports
+
+
+def measure(script, reruns):
+    with tempfile.TemporaryDirectory() as tmp:
+        db = os.path.join(tmp, "green_invest.db")
+        with open(os.path.join(ROOT, "green_invest.db"), "rb") as src, open(db, "wb") as dst:
+            dst.write(src.read())
+        env = dict(os.environ, GREEN_INVEST_DB=db, SESSION_DB=db)
+        proc = subprocess.run([sys.executable, "-X", "importtime", __file__, "--child", script, "--reruns", str(reruns)],
+                              cwd=ROOT, env=env, capture_output=True, text=True, check=True)
+    result = json.loads(proc.stdout.strip().splitlines()[-1])
+    result["imports"] = parse_imports(proc.stderr)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("scripts", nargs="*", default=["app.py", "calc.py", "new_app.py"])
+    parser.add_argument("--reruns", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="imports to list per script")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child, args.reruns)
+        return
+
+    results = {}
+    for script in args.scripts:
+        r = results[script] = measure(script, args.reruns)
+        total = sum(cumulative for _, _, cumulative in r["imports"])
+        rerun = f"{r['rerun'] * 1000:.1f} ms" if r["rerun"] is not None else "-"
+        print(f"\n{script}: first run {r['cold'] * 1000:.1f} ms (imports {total / 1000:.1f} ms), rerun {rerun}")
+        for error in r["errors"]:
+            print(f"  error: {error}")
+        for module, _, cumulative in sorted(r["imports"], key=lambda i: -i[2])[:args.top]:
+            print(f"  {cumulative / 1000:>8.1f} ms  {module}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
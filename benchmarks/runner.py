@@ -0,0 +1,176 @@
+"""Benchmark runner: times the cases in cases.py, saves JSON, compares runs.
+
+    python benchmarks/runner.py                          # run all, write results/latest.json
+    python benchmarks/runner.py -k calculator            # only cases whose name contains "calculator"
+    python benchmarks/runner.py --save baseline.json     # keep a baseline
+    python benchmarks/runner.py --compare baseline.json  # exit 1 if any case got slower
+
+A case is a function registered with ``@case`` in cases.py. It does its setup and
+returns the callable to time, or yields it when it needs to clean up
+afterwards. Cases run against a throwaway copy of green_invest.db.
+"""
+import argparse
+import fnmatch
+import inspect
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+# A case is a regression when its median exceeds the baseline's by this factor
+DEFAULT_THRESHOLD = 1.25
+
+
+def _autorange(fn, target=0.002):
+    """Calls per round so that one round takes at least ``target`` seconds."""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        if time.perf_counter() - start >= target or number >= 1 << 20:
+            return number
+        number *= 2
+
+
+def measure(fn, min_time=1.0, min_rounds=5, max_rounds=1000):
+    fn()  # warm-up: imports, caches, connections
+    number = _autorange(fn)
+    timings = []
+    deadline = time.perf_counter() + min_time
+    while len(timings) < min_rounds or (time.perf_counter() < deadline and len(timings) < max_rounds):
+        start = time.perf_counter()
+        for _ in range(number):
+            fn()
+        timings.append((time.perf_counter() - start) / number)
+    timings.sort()
+    return {
+        "rounds": len(timings),
+        "number": number,
+        "min": timings[0],
+        "median": statistics.median(timings),
+        "mean": statistics.fmean(timings),
+        "stdev": statistics.stdev(timings) if len(timings) > 1 else 0.0,
+        "p95": timings[int(0.95 * (len(timings) - 1))],
+    }
+
+
+def run_case(fn, params, ops, min_time):
+    if inspect.isgeneratorfunction(fn):
+        gen = fn(**params)
+        target = next(gen)
+        try:
+            result = measure(target, min_time)
+        finally:
+            next(gen, None)
+    else:
+        result = measure(fn(**params), min_time)
+    result["ops"] = ops
+    result["ops_per_sec"] = ops / result["median"] if result["median"] else None
+    return result
+
+
+def machine_info():
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True).stdout.strip()
+    except OSError:
+        commit = None
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "commit": commit or None,
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+    }
+
+
+def compare(results, baseline, threshold):
+    """Print current vs baseline medians; returns the names that regressed."""
+    regressions = []
+    print(f"\n{'case':<52} {'baseline':>11} {'current':>11} {'ratio':>7}")
+    for name, result in results.items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            print(f"{name:<52} {'-':>11} {_ms(result['median']):>11} {'new':>7}")
+            continue
+        ratio = result["median"] / base["median"]
+        flag = ""
+        if ratio > threshold:
+            flag = "  SLOWER"
+            regressions.append(name)
+        elif ratio < 1 / threshold:
+            flag = "  faster"
+        print(f"{name:<52} {_ms(base['median']):>11} {_ms(result['median']):>11} {ratio:>6.2f}x{flag}")
+    return regressions
+
+
+def _ms(seconds):
+    return f"{seconds * 1000:.3f}ms"
+
+
+def _isolate_db(tmp):
+    """Point the app at a copy of green_invest.db so benchmarks never write to the real one."""
+    path = os.path.join(tmp, "green_invest.db")
+    shutil.copy(os.path.join(ROOT, "green_invest.db"), path)
+    os.environ["GREEN_INVEST_DB"] = path
+    os.environ.setdefault("SESSION_DB", path)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="pattern", help="run cases whose name contains this (or matches this glob)")
+    parser.add_argument("--min-time", type=float, default=1.0, help="seconds to spend timing each case")
+    parser.add_argument("--save", help="also write the results to this file")
+    parser.add_argument("--compare", help="baseline results file to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="median ratio above which a case counts as a regression")
+    parser.add_argument("--list", action="store_true", help="list cases and exit")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        _isolate_db(tmp)
+        from cases import CASES  # imported after _isolate_db so the app modules see the copy
+
+        selected = [c for c in CASES if not args.pattern or args.pattern in c[0]
+                    or fnmatch.fnmatch(c[0], args.pattern)]
+        if args.list:
+            print("\n".join(c[0] for c in selected))
+            return 0
+
+        results = {}
+        print(f"{'case':<52} {'median':>11} {'p95':>11} {'ops/s':>12} {'rounds':>7}")
+        for name, fn, params, ops in selected:
+            r = results[name] = run_case(fn, params, ops, args.min_time)
+            print(f"{name:<52} {_ms(r['median']):>11} {_ms(r['p95']):>11} {r['ops_per_sec']:>12,.1f} "
+                  f"{r['rounds']:>7}", flush=True)
+
+    report = {"machine": machine_info(), "results": results}
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    for path in filter(None, [os.path.join(RESULTS_DIR, "latest.json"), args.save]):
+        with open(path, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if baseline.get("machine", {}).get("platform") != report["machine"]["platform"]:
+            print("\nnote: baseline was recorded on a different platform; ratios are indicative only")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} case(s) slower than {args.threshold:.2f}x baseline")
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
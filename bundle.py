@@ -0,0 +1,66 @@
+import gzip
+import hashlib
+import os
+import threading
+from collections import namedtuple
+
+ASSETS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "assets")
+SOURCES = ("template.html", "style.css", "script.js")
+
+# ``gzipped`` is the page compressed once, for clients that accept gzip
+Bundle = namedtuple("Bundle", ["html", "gzipped", "etag", "stamp"])
+
+
+def build_bundle(assets_dir=ASSETS_DIR):
+    """Assemble the chatbot page with its CSS and JS inlined verbatim.
+
+    Nothing is minified: the page is served gzipped, and its content hash
+    lets browsers cache it for good.
+    """
+    with open(os.path.join(assets_dir, "template.html"), "r", encoding="utf-8") as f:
+        html_content = f.read()
+    with open(os.path.join(assets_dir, "style.css"), "r", encoding="utf-8") as f:
+        css_content = f.read()
+    with open(os.path.join(assets_dir, "script.js"), "r", encoding="utf-8") as f:
+        js_content = f.read()
+
+    html_content = html_content.replace("<!-- CSS will be injected here -->", f"<style>{css_content}</style>")
+    return html_content.replace("<!-- Scripts will be injected here -->",
+        f'''<script>
+        window.addEventListener("error", function(e) {{
+            console.error("Error:", e.message);
+        }});
+    </script>
+    <script>{js_content}</script>''')
+
+
+_bundle = None
+_bundle_lock = threading.Lock()
+
+
+def _stamp(assets_dir):
+    return tuple(os.stat(os.path.join(assets_dir, name)).st_mtime_ns for name in SOURCES)
+
+
+def get_bundle(assets_dir=ASSETS_DIR):
+    """The current ``Bundle``, rebuilt only when a source file's mtime changes.
+
+    ``etag`` is a hash of the assembled HTML, so it only changes when the
+    content does.
+    """
+    global _bundle
+    stamp = _stamp(assets_dir)
+    bundle = _bundle
+    if bundle is None or bundle.stamp != stamp:
+        with _bundle_lock:
+            if _bundle is None or _bundle.stamp != stamp:
+                html = build_bundle(assets_dir)
+                data = html.encode("utf-8")
+                _bundle = Bundle(html, gzip.compress(data, mtime=0), hashlib.sha256(data).hexdigest()[:16], stamp)
+            bundle = _bundle
+    return bundle
+
+
+def widget_url(base_url):
+    """Content-hashed URL of the chatbot page on the research server at ``base_url``."""
+    return f"{base_url}/widget/{get_bundle().etag}.html"
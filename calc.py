@@ -1,39 +1,14 @@
-import streamlit as st
-import numpy as np
+import time
+
 import pandas as pd
+import streamlit as st
+from charts import credits_line_data
+from projection_cache import cached_projection
+from credit_calculator import DECLINE_RATE, GROWTH_MONTHS
+from metrics import Rerun, profiling_allowed
 
-# Mock Database (dictionary) for Users and Shares
-user_database = {
-    "user1@example.com": {"share_percentage": 0.1, "initial_investment": 100000},
-    "user2@example.com": {"share_percentage": 0.2, "initial_investment": 200000},
-    "user3@example.com": {"share_percentage": 0.05, "initial_investment": 50000},
-}
-
-# Backend calculations for credit simulation
-class CreditCalculator:
-    def __init__(self, user_share, initial_credits, manufacturing_duration, growth_rate):
-        self.user_share = user_share
-        self.initial_credits = initial_credits
-        self.manufacturing_duration = manufacturing_duration
-        self.growth_rate = growth_rate
-        self.credit_data = []
-
-    def calculate_manufacturing_loss(self):
-        decline_rate = 0.05  # 5% monthly loss in credits during manufacturing
-        credits = self.initial_credits
-        for month in range(self.manufacturing_duration):
-            credits -= credits * decline_rate
-            self.credit_data.append((f'Month {month+1}', credits, credits * self.user_share))
-
-    def calculate_growth_after_manufacturing(self):
-        credits = self.credit_data[-1][1]
-        for month in range(12):
-            credits += credits * self.growth_rate
-            self.credit_data.append((f'Month {self.manufacturing_duration + month + 1}', credits, credits * self.user_share))
-
-    def get_data(self):
-        columns = ["Time Period", "Company Credits", "User's Share Credits"]
-        return pd.DataFrame(list(self.credit_data), columns=columns)
+# Times this rerun for /metrics; ?profile=1 shows a profile of it at the bottom of the page
+rerun = Rerun("calc.py", profile=profiling_allowed(st.query_params.get("profile"), st.context.ip_address))
 
 # Streamlit App with Multi-Page Setup
 st.sidebar.title("Solar Investment Platform")
@@ -48,36 +23,82 @@ if page == "Investment Calculator":
     manufacturing_duration = st.number_input("Manufacturing Duration (in months):", value=6)
     growth_rate = st.slider("Monthly Growth Rate After Manufacturing (%)", 0.0, 10.0, 2.0) / 100
 
-    # Calculate Credits
-    calculator = CreditCalculator(user_share, initial_credits, manufacturing_duration, growth_rate)
-    calculator.calculate_manufacturing_loss()
-    calculator.calculate_growth_after_manufacturing()
+    if st.toggle("Stochastic mode (Monte Carlo)"):
+        from risk_engine import cached_simulation, fixed, normal, triangular, uniform
+
+        # Monthly decline and growth rates are sampled per path
+        growth_months = st.number_input("Projection months after manufacturing:", 1, 120, GROWTH_MONTHS)
+        kind = st.selectbox("Rate distribution", ["Normal", "Uniform", "Triangular"])
+        decline_rate = st.slider("Monthly Decline Rate During Manufacturing (%)", 0.0, 20.0, DECLINE_RATE * 100) / 100
+        spread = st.slider("Rate spread (std for Normal, half-width otherwise, %)", 0.0, 5.0, 1.0) / 100
+        paths = st.select_slider("Simulated paths", [10_000, 100_000, 300_000, 1_000_000], 100_000)
 
-    # Display Results
-    credit_data = calculator.get_data()
-    st.write("### Credit Projection Table")
-    st.dataframe(credit_data)
+        def distribution(center):
+            if spread == 0:
+                return fixed(center)
+            if kind == "Normal":
+                return normal(center, spread)
+            if kind == "Uniform":
+                return uniform(center - spread, center + spread)
+            return triangular(center - spread, center, center + spread)
+
+        risk = cached_simulation(user_share, initial_credits, manufacturing_duration,
+                                 distribution(decline_rate), distribution(growth_rate), growth_months, paths)
+
+        st.write("### Credit Projection Bands")
+        st.dataframe(risk)
+
+        st.write("### User Share Credits (P5 / P50 / P95 and expected)")
+        st.line_chart(risk.set_index("Time Period")[["User P5", "User P50", "User P95", "Expected User Credits"]])
+    else:
+        # Calculate Credits
+        projection = cached_projection(user_share, initial_credits, manufacturing_duration, growth_rate,
+                                       render_chart=credits_line_data)
 
-    st.write("### Credit Projection Chart")
-    st.line_chart(credit_data.set_index("Time Period")[["Company Credits", "User's Share Credits"]])
+        # Display Results
+        st.write("### Credit Projection Table")
+        st.dataframe(projection.frame)
+
+        st.write("### Credit Projection Chart")
+        st.line_chart(projection.chart)
 
 elif page == "Company Statistics":
+    from stats import funding_progress, get_stats, top_holders
+
     st.title("Company Statistics and User Shares")
 
-    # Overall Company Statistics
-    total_credits = 5000000  # Example of total initial company credits
-    st.write(f"**Total Company Credits Available:** {total_credits}")
-
-    # User Share Check
-    st.write("### Check Your Share")
-    user_email = st.text_input("Enter your email to check your share:")
-
-    if user_email in user_database:
-        user_data = user_database[user_email]
-        user_share_percentage = user_data["share_percentage"] * 100
-        user_investment = user_data["initial_investment"]
-        st.write(f"**User Email:** {user_email}")
-        st.write(f"**Share Percentage:** {user_share_percentage}%")
-        st.write(f"**Initial Investment:** ${user_investment}")
+    # Overall Company Statistics (precomputed summary, refreshed incrementally)
+    stats = get_stats()
+    cols = st.columns(4)
+    cols[0].metric("Total Company Credits", f"{stats.total_credits:,.0f}")
+    cols[1].metric("Credits Held by Users", f"{stats.allocated_credits:,.0f}")
+    cols[2].metric("Total Invested", f"${stats.total_invested:,.2f}")
+    cols[3].metric("Holdings", f"{stats.holdings:,}")
+    st.caption(f"Updated {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(stats.refreshed_at))}")
+
+    st.write("### Share Distribution")
+    st.bar_chart(pd.DataFrame(stats.histogram, columns=["Share of company", "Holdings"]).set_index("Share of company"))
+
+    st.write("### Top Holders")
+    # Amounts only; this page needs no login, so holders stay anonymous
+    holders = top_holders()
+    if holders:
+        st.dataframe(pd.DataFrame({"Rank": range(1, len(holders) + 1),
+                                   "Total Invested": [row["invested_amount"] for row in holders]}), hide_index=True)
     else:
-        st.write("User not found. Please check your email or register with the platform.")
\ No newline at end of file
+        st.write("No investments yet.")
+
+    st.write("### Funding Progress")
+    for company in funding_progress():
+        target = company["target_funding"] or 0
+        progress = min(company["total_invested"] / target, 1.0) if target > 0 else 0.0
+        st.progress(progress, text=f"{company['name']}: ${company['total_invested']:,.0f} of ${target:,.0f} "
+                                   f"({company['investment_count']} investments)")
+
+    st.caption("Log in to the Green Invest app to see your own shares on your profile page.")
+
+# Rerun timing, and the profile when one was requested
+rerun_report = rerun.finish()
+if rerun_report:
+    with st.expander("Profile of this rerun"):
+        st.code(rerun_report)
@@ -0,0 +1,114 @@
+import argparse
+import os
+import threading
+from collections import namedtuple
+
+from cache import TTLCache
+from db import connection
+from metrics import DB_QUERY_SECONDS, timed
+
+# Query results, keyed on the normalized filters and the catalog version.
+# The TTL bounds staleness when another process edits the catalog.
+CATALOG_CACHE = TTLCache(
+    maxsize=int(os.environ.get("CATALOG_CACHE_SIZE", 512)),
+    ttl=float(os.environ.get("CATALOG_CACHE_TTL", 60)),
+)
+
+# Sort options shown on the Explore page -> ORDER BY clause (id breaks ties)
+SORTS = {
+    "Name": "name COLLATE NOCASE ASC, id",
+    "Target funding (high to low)": "target_funding DESC, id",
+    "Target funding (low to high)": "target_funding ASC, id",
+    "Energy output (high to low)": "energy_output DESC, id",
+}
+
+COLUMNS = "id, name, description, target_funding, energy_output, image"
+
+CompanyPage = namedtuple("CompanyPage", ["companies", "total", "page", "page_count"])
+
+_version = 0
+_version_lock = threading.Lock()
+
+
+def invalidate():
+    """Drop cached query results after this process changes the catalog."""
+    global _version
+    with _version_lock:
+        _version += 1
+
+
+def _where(search, min_funding, min_energy):
+    clauses, params = [], []
+    if search:
+        clauses.append("name LIKE ? ESCAPE '\\'")
+        params.append("%" + search.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%")
+    if min_funding:
+        clauses.append("target_funding >= ?")
+        params.append(min_funding)
+    if min_energy:
+        clauses.append("energy_output >= ?")
+        params.append(min_energy)
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), params
+
+
+def _query_companies(search, min_funding, min_energy, sort, page, page_size):
+    where, params = _where(search, min_funding, min_energy)
+    with connection() as conn:
+        total = conn.execute("SELECT COUNT(*) FROM companies" + where, params).fetchone()[0]
+        page_count = max((total + page_size - 1) // page_size, 1)
+        page = min(page, page_count)
+        rows = conn.execute(
+            f"SELECT {COLUMNS} FROM companies{where} ORDER BY {SORTS[sort]} LIMIT ? OFFSET ?",
+            params + [page_size, (page - 1) * page_size],
+        ).fetchall()
+    return CompanyPage(tuple(dict(row) for row in rows), total, page, page_count)
+
+
+@timed(DB_QUERY_SECONDS, op="query_companies")
+def query_companies(search="", min_funding=0, min_energy=0, sort="Name", page=1, page_size=10):
+    """One page of the catalog, filtered and sorted in SQL and cached.
+
+    Returns a ``CompanyPage``; ``page`` is clamped to the last page. The
+    company dicts are shared with other sessions and must not be mutated.
+    """
+    if sort not in SORTS:
+        raise ValueError(f"Unknown sort: {sort}")
+    key = (_version, (search or "").strip(), float(min_funding or 0), float(min_energy or 0),
+           sort, max(int(page), 1), max(int(page_size), 1))
+    return CATALOG_CACHE.get_or_set(key, lambda: _query_companies(*key[1:]))
+
+
+@timed(DB_QUERY_SECONDS, op="catalog_bounds")
+def catalog_bounds():
+    """(max target funding, max energy output), for sizing the filter widgets."""
+    def load():
+        with connection() as conn:
+            row = conn.execute("SELECT MAX(target_funding), MAX(energy_output) FROM companies").fetchone()
+        return (row[0] or 0.0, row[1] or 0.0)
+    return CATALOG_CACHE.get_or_set((_version, "bounds"), load)
+
+
+def import_companies(source_path):
+    """Copy the companies table of another SQLite file (e.g. database.db) into the catalog.
+
+    Rows whose id already exists are left untouched. Returns the number of rows added.
+    """
+    with connection() as conn:
+        conn.execute("ATTACH DATABASE ? AS source", (source_path,))
+        try:
+            added = conn.execute(
+                "INSERT OR IGNORE INTO companies (id, name, description, target_funding, energy_output) "
+                "SELECT id, name, description, target_funding, energy_output FROM source.companies"
+            ).rowcount
+            conn.commit()
+        finally:
+            conn.execute("DETACH DATABASE source")
+    invalidate()
+    return added
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import companies into the Green Invest catalog.")
+    parser.add_argument("source", help="SQLite file with a companies table, e.g. database.db")
+    args = parser.parse_args()
+    print(f"Imported {import_companies(args.source)} companies from {args.source}")
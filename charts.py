@@ -0,0 +1,56 @@
+from metrics import CHART_SECONDS, timed
+
+CHART_TITLE = "Projected Credits Over Time"
+X_FIELD = "Time Period"
+Y_FIELD = "User's Share Credits"
+
+
+@timed(CHART_SECONDS, kind="credits_chart_spec")
+def credits_chart_spec(credits_df):
+    """Vega-Lite spec of the user's share curve, rendered client-side by st.vega_lite_chart."""
+    return {
+        "title": CHART_TITLE,
+        "data": {"values": credits_df[[X_FIELD, Y_FIELD]].to_dict(orient="records")},
+        "mark": {"type": "line", "point": True},
+        "encoding": {
+            "x": {"field": X_FIELD, "type": "ordinal", "sort": None, "axis": {"labelAngle": -45}},
+            "y": {"field": Y_FIELD, "type": "quantitative"},
+            "tooltip": [{"field": X_FIELD}, {"field": Y_FIELD, "format": ",.2f"}],
+        },
+    }
+
+
+@timed(CHART_SECONDS, kind="credits_line_data")
+def credits_line_data(credits_df):
+    """Company and user curves indexed by month, for st.line_chart."""
+    return credits_df.set_index(X_FIELD)[["Company Credits", Y_FIELD]]
+
+
+@timed(CHART_SECONDS, kind="risk_chart_spec")
+def risk_chart_spec(risk_df):
+    """Vega-Lite spec of the user's P5-P95 band with the median and expected curves."""
+    x = {"field": X_FIELD, "type": "ordinal", "sort": None, "axis": {"labelAngle": -45}}
+    return {
+        "title": CHART_TITLE,
+        "data": {"values": risk_df.to_dict(orient="records")},
+        "layer": [
+            {
+                "mark": {"type": "area", "opacity": 0.3},
+                "encoding": {
+                    "x": x,
+                    "y": {"field": "User P5", "type": "quantitative", "title": Y_FIELD},
+                    "y2": {"field": "User P95"},
+                },
+            },
+            {
+                "transform": [{"fold": ["User P50", "Expected User Credits"], "as": ["Curve", "Credits"]}],
+                "mark": {"type": "line", "point": True},
+                "encoding": {
+                    "x": x,
+                    "y": {"field": "Credits", "type": "quantitative"},
+                    "color": {"field": "Curve", "type": "nominal"},
+                    "tooltip": [{"field": X_FIELD}, {"field": "Curve"}, {"field": "Credits", "format": ",.2f"}],
+                },
+            },
+        ],
+    }
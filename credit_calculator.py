@@ -0,0 +1,88 @@
+import numpy as np
+import pandas as pd
+
+from metrics import CALCULATOR_SECONDS, timed
+
+DECLINE_RATE = 0.05  # 5% monthly loss in credits during manufacturing
+GROWTH_MONTHS = 12  # Months projected after manufacturing
+COLUMNS = ["Time Period", "Company Credits", "User's Share Credits"]
+
+
+# Reference implementation: builds the projection one month at a time.
+# Kept as the oracle the vectorized functions below are checked against.
+class CreditCalculator:
+    def __init__(self, user_share, initial_credits, manufacturing_duration, growth_rate):
+        self.user_share = user_share
+        self.initial_credits = initial_credits
+        self.manufacturing_duration = manufacturing_duration
+        self.growth_rate = growth_rate
+        self.credit_data = []
+
+    def calculate_manufacturing_loss(self):
+        credits = self.initial_credits
+        for month in range(self.manufacturing_duration):
+            credits -= credits * DECLINE_RATE
+            self.credit_data.append((f'Month {month+1}', credits, credits * self.user_share))
+
+    def calculate_growth_after_manufacturing(self):
+        credits = self.credit_data[-1][1] if self.credit_data else self.initial_credits
+        for month in range(GROWTH_MONTHS):
+            credits += credits * self.growth_rate
+            self.credit_data.append((f'Month {self.manufacturing_duration + month + 1}', credits, credits * self.user_share))
+
+    def get_data(self):
+        return pd.DataFrame(list(self.credit_data), columns=COLUMNS)
+
+
+def credit_curve(initial_credits, manufacturing_duration, growth_rate,
+                 growth_months=GROWTH_MONTHS, decline_rate=DECLINE_RATE):
+    """Company credits for months 1..duration+growth_months in closed form.
+
+    Month m is initial * (1 - decline)^m while manufacturing and
+    initial * (1 - decline)^duration * (1 + growth)^(m - duration) afterwards.
+    """
+    duration = max(int(manufacturing_duration), 0)
+    months = np.arange(1, duration + growth_months + 1)
+    decline = np.minimum(months, duration)
+    growth = months - decline
+    return initial_credits * (1 - decline_rate) ** decline * (1 + growth_rate) ** growth
+
+
+@timed(CALCULATOR_SECONDS, op="project_credits")
+def project_credits(user_share, initial_credits, manufacturing_duration, growth_rate,
+                    growth_months=GROWTH_MONTHS):
+    """Vectorized equivalent of CreditCalculator(...).get_data()."""
+    company = credit_curve(initial_credits, manufacturing_duration, growth_rate, growth_months)
+    labels = [f"Month {m}" for m in range(1, len(company) + 1)]
+    return pd.DataFrame({
+        COLUMNS[0]: labels,
+        COLUMNS[1]: company,
+        COLUMNS[2]: company * user_share,
+    })
+
+
+@timed(CALCULATOR_SECONDS, op="project_scenarios")
+def project_scenarios(user_share, initial_credits, manufacturing_duration, growth_rate,
+                      growth_months=GROWTH_MONTHS, decline_rate=DECLINE_RATE):
+    """Project many scenarios in one array call.
+
+    Each argument is a scalar or a 1-d array; they are broadcast against each
+    other to N scenarios. Returns ``(company, user)`` arrays of shape
+    ``(N, horizon)`` where ``horizon`` is the longest scenario's
+    ``duration + growth_months``. Months past a shorter scenario's horizon
+    are NaN.
+    """
+    share, initial, duration, growth = np.broadcast_arrays(
+        np.asarray(user_share, dtype=float),
+        np.asarray(initial_credits, dtype=float),
+        np.maximum(np.asarray(manufacturing_duration, dtype=np.int64), 0),
+        np.asarray(growth_rate, dtype=float),
+    )
+    share, initial, duration, growth = (np.atleast_1d(a)[:, None] for a in (share, initial, duration, growth))
+
+    horizon = int(duration.max(initial=0)) + growth_months
+    months = np.arange(1, horizon + 1)[None, :]
+    decline = np.minimum(months, duration)
+    company = initial * (1 - decline_rate) ** decline * (1 + growth) ** (months - decline)
+    company[months > duration + growth_months] = np.nan
+    return company, company * share
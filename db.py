@@ -0,0 +1,296 @@
+import os
+import queue
+import sqlite3
+import threading
+from contextlib import contextmanager
+
+from metrics import DB_QUERY_SECONDS, timed
+from passwords import get_hasher, hash_password, verify_dummy, verify_password
+
+DB_PATH = os.environ.get("GREEN_INVEST_DB", os.path.join(os.path.dirname(os.path.abspath(__file__)), "green_invest.db"))
+POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 8))
+
+
+def add_column(table, column, definition):
+    """Schema step adding ``column`` to an existing ``table`` unless it is already there."""
+    def apply(conn):
+        if column not in {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}:
+            conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+    return apply
+
+
+# Schema statements (or callables taking the connection), applied once per
+# process when the pool for a database is created
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS users (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        username TEXT NOT NULL UNIQUE,
+        password TEXT NOT NULL,
+        invested_amount REAL DEFAULT 0,
+        energy_produced REAL DEFAULT 0,
+        co_saved REAL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TABLE IF NOT EXISTS companies (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        description TEXT,
+        target_funding REAL,
+        energy_output REAL,
+        image TEXT
+    )
+    ''',
+    # Emails are stored lower-cased so prefix lookups can range-scan the index
+    add_column("users", "email", "TEXT"),
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email)",
+    "CREATE INDEX IF NOT EXISTS idx_users_invested_amount ON users (invested_amount)",
+    "CREATE INDEX IF NOT EXISTS idx_companies_target_funding ON companies (target_funding)",
+    "CREATE INDEX IF NOT EXISTS idx_companies_energy_output ON companies (energy_output)",
+    # Starter catalog for a fresh database
+    '''
+    INSERT INTO companies (name, description, target_funding, energy_output, image)
+    SELECT * FROM (VALUES
+        ('SolarTech Innovations', 'Leading the way in solar technology and sustainable energy solutions.', 1000000, 50000, 'company1.jpg'),
+        ('Green Energy Solutions', 'Committed to providing renewable energy solutions for a sustainable future.', 500000, 30000, 'company2.jpg'),
+        ('EcoPower Inc.', 'Harnessing the power of the sun to provide clean energy.', 750000, 45000, 'company3.jpg')
+    )
+    WHERE NOT EXISTS (SELECT 1 FROM companies)
+    ''',
+    # Investments ledger. The users impact columns and company_totals are
+    # running aggregates of it, kept current by the triggers below in the
+    # same transaction as each ledger write (see ledger.py).
+    '''
+    CREATE TABLE IF NOT EXISTS investments (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL REFERENCES users (id),
+        company_id INTEGER NOT NULL REFERENCES companies (id),
+        amount REAL NOT NULL CHECK (amount > 0),
+        energy_produced REAL NOT NULL DEFAULT 0,
+        co_saved REAL NOT NULL DEFAULT 0,
+        created_at TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_investments_user_company ON investments (user_id, company_id)",
+    "CREATE INDEX IF NOT EXISTS idx_investments_company ON investments (company_id)",
+    '''
+    CREATE TABLE IF NOT EXISTS company_totals (
+        company_id INTEGER PRIMARY KEY REFERENCES companies (id),
+        total_invested REAL NOT NULL DEFAULT 0,
+        energy_produced REAL NOT NULL DEFAULT 0,
+        co_saved REAL NOT NULL DEFAULT 0,
+        investment_count INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_investments_insert AFTER INSERT ON investments
+    BEGIN
+        UPDATE users SET
+            invested_amount = invested_amount + NEW.amount,
+            energy_produced = energy_produced + NEW.energy_produced,
+            co_saved = co_saved + NEW.co_saved
+        WHERE id = NEW.user_id;
+        INSERT INTO company_totals (company_id, total_invested, energy_produced, co_saved, investment_count)
+        VALUES (NEW.company_id, NEW.amount, NEW.energy_produced, NEW.co_saved, 1)
+        ON CONFLICT (company_id) DO UPDATE SET
+            total_invested = total_invested + excluded.total_invested,
+            energy_produced = energy_produced + excluded.energy_produced,
+            co_saved = co_saved + excluded.co_saved,
+            investment_count = investment_count + 1;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_investments_delete AFTER DELETE ON investments
+    BEGIN
+        UPDATE users SET
+            invested_amount = invested_amount - OLD.amount,
+            energy_produced = energy_produced - OLD.energy_produced,
+            co_saved = co_saved - OLD.co_saved
+        WHERE id = OLD.user_id;
+        UPDATE company_totals SET
+            total_invested = total_invested - OLD.amount,
+            energy_produced = energy_produced - OLD.energy_produced,
+            co_saved = co_saved - OLD.co_saved,
+            investment_count = investment_count - 1
+        WHERE company_id = OLD.company_id;
+    END
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_investments_no_update BEFORE UPDATE ON investments
+    BEGIN
+        SELECT RAISE(ABORT, 'investments are append-only; delete and re-insert to correct an entry');
+    END
+    ''',
+]
+
+# Statements are module constants so each pooled connection's statement
+# cache prepares them once and reuses them for every call.
+INSERT_USER = "INSERT INTO users (username, password, email) VALUES (?, ?, ?)"
+SELECT_CREDENTIALS = "SELECT id, username, password FROM users WHERE username = ?"
+UPDATE_PASSWORD = "UPDATE users SET password = ? WHERE id = ? AND password = ?"
+SELECT_PROFILE = "SELECT id, username, invested_amount, energy_produced, co_saved FROM users WHERE id = ?"
+
+
+class PoolExhausted(RuntimeError):
+    """Raised when every pooled connection stays checked out for the pool's timeout."""
+
+
+class ConnectionPool:
+    """Bounded pool of SQLite connections shared by every thread in the process.
+
+    Streamlit runs each rerun on a fresh thread, so connections are checked
+    out per operation rather than pinned to a thread; a connection is only
+    ever used by the thread holding it.
+    """
+
+    def __init__(self, path, size=POOL_SIZE, timeout=30.0, schema=SCHEMA):
+        self.path = path
+        self.size = size
+        self.timeout = timeout
+        self._idle = queue.LifoQueue()
+        self._created = 0
+        self._lock = threading.Lock()
+        self._schemas = set()
+        self.apply_schema(schema)
+
+    def apply_schema(self, schema):
+        """Run a list of schema statements, once per pool."""
+        schema = tuple(schema)
+        if schema in self._schemas:
+            return
+        with self._lock:
+            if schema in self._schemas:
+                return
+            self._schemas.add(schema)
+        try:
+            with self.connection() as conn:
+                for statement in schema:
+                    if callable(statement):
+                        statement(conn)
+                    else:
+                        conn.execute(statement)
+        except Exception:
+            with self._lock:
+                self._schemas.discard(schema)
+            raise
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.timeout, check_same_thread=False, cached_statements=256)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA foreign_keys=ON")
+        return conn
+
+    def _checkout(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            if self._created < self.size:
+                self._created += 1
+                try:
+                    return self._connect()
+                except Exception:
+                    self._created -= 1
+                    raise
+        try:
+            return self._idle.get(timeout=self.timeout)
+        except queue.Empty:
+            raise PoolExhausted(f"No connection to {self.path} came free within {self.timeout:g}s "
+                                f"({self.size} in use)") from None
+
+    @contextmanager
+    def connection(self):
+        """Check out a connection; commit on success, roll back on error."""
+        conn = self._checkout()
+        try:
+            yield conn
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        finally:
+            self._idle.put(conn)
+
+    def close(self):
+        while True:
+            try:
+                self._idle.get_nowait().close()
+            except queue.Empty:
+                break
+            with self._lock:
+                self._created -= 1
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None, schema=SCHEMA):
+    """Process-wide pool for ``path`` (defaults to DB_PATH), created on first use.
+
+    ``schema`` is applied once per process for each file it is used with;
+    other modules (caches, session stores) pass their own tables.
+    """
+    path = path or DB_PATH
+    pool = _pools.get(path)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(path)
+            if pool is None:
+                pool = _pools[path] = ConnectionPool(path, schema=schema)
+    pool.apply_schema(schema)
+    return pool
+
+
+def connection(path=None):
+    return get_pool(path).connection()
+
+
+# User functions
+def normalize_email(email):
+    email = (email or "").strip().lower()
+    return email or None
+
+
+@timed(DB_QUERY_SECONDS, op="create_user")
+def create_user(username, password, email=None):
+    password_hash = hash_password(password)
+    try:
+        with connection() as conn:
+            conn.execute(INSERT_USER, (username, password_hash, normalize_email(email)))
+        return True
+    except sqlite3.IntegrityError:
+        return False
+
+
+@timed(DB_QUERY_SECONDS, op="check_credentials")
+def check_credentials(username, password):
+    """The user's id and username if the password matches, else None.
+
+    Rows still holding a plaintext password, or a hash made with older cost
+    settings, are re-hashed on a successful login. Unknown usernames are
+    checked against a dummy hash so they take as long as a wrong password.
+    """
+    with connection() as conn:
+        row = conn.execute(SELECT_CREDENTIALS, (username,)).fetchone()
+    if row is None:
+        verify_dummy(password)
+        return None
+    if not verify_password(password, row["password"]):
+        return None
+    if get_hasher().needs_rehash(row["password"]):
+        new_hash = hash_password(password)
+        with connection() as conn:
+            # Only replace the value we verified, in case it changed meanwhile
+            conn.execute(UPDATE_PASSWORD, (new_hash, row["id"], row["password"]))
+    return {"id": row["id"], "username": row["username"]}
+
+
+@timed(DB_QUERY_SECONDS, op="get_user_profile")
+def get_user_profile(user_id):
+    with connection() as conn:
+        return conn.execute(SELECT_PROFILE, (user_id,)).fetchone()
@@ -0,0 +1,88 @@
+import hashlib
+import importlib.util
+import io
+import os
+import threading
+
+from cache import TTLCache
+from resources import ROOT_DIR, resolve_asset
+
+IMAGE_CACHE_DIR = os.environ.get("IMAGE_CACHE_DIR", os.path.join(ROOT_DIR, ".cache", "images"))
+
+# Encoded variant bytes, keyed by (source path, mtime, size, width, format)
+IMAGE_CACHE = TTLCache(maxsize=int(os.environ.get("IMAGE_CACHE_SIZE", 64)))
+
+_write_lock = threading.Lock()
+
+
+# Without Pillow, variants are the original files, unchanged
+HAS_PILLOW = importlib.util.find_spec("PIL") is not None
+
+
+def _encode(path, width, fmt, quality):
+    if not HAS_PILLOW:
+        with open(path, "rb") as f:
+            return f.read()
+    from PIL import Image
+    with Image.open(path) as img:
+        img = img.convert("RGB")
+        if img.width > width:
+            img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+        options = {"quality": quality}
+        if fmt == "webp":
+            options["method"] = 4
+        buf = io.BytesIO()
+        img.save(buf, format={"jpg": "JPEG"}.get(fmt, fmt.upper()), **options)
+        return buf.getvalue()
+
+
+def variant_name(path, width, fmt="webp"):
+    """Content-addressed file name of a variant: source digest, width and format."""
+    with open(path, "rb") as f:
+        digest = hashlib.sha256(f.read()).hexdigest()[:16]
+    return f"{digest}-{width}.{fmt}"
+
+
+def image_variant(path, width=480, fmt="webp", quality=80):
+    """``(file name, bytes)`` of a resized variant of ``path``, or None if it cannot be decoded.
+
+    Variants are written to IMAGE_CACHE_DIR under their content-addressed
+    name the first time they are needed and kept in memory afterwards, so
+    nothing is decoded or encoded on the render path once warm.
+    """
+    if not HAS_PILLOW:
+        fmt = os.path.splitext(path)[1].lstrip(".").lower()
+    stat = os.stat(path)
+    key = (path, stat.st_mtime_ns, stat.st_size, width, fmt)
+
+    def load():
+        name = variant_name(path, width, fmt)
+        target = os.path.join(IMAGE_CACHE_DIR, name)
+        if os.path.isfile(target):
+            with open(target, "rb") as f:
+                return name, f.read()
+        try:
+            data = _encode(path, width, fmt, quality)
+        except OSError:
+            # Not an image Pillow can read (UnidentifiedImageError is an
+            # OSError); remembered until the file changes
+            return None
+        with _write_lock:
+            os.makedirs(IMAGE_CACHE_DIR, exist_ok=True)
+            tmp = f"{target}.{os.getpid()}.tmp"
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, target)
+        return name, data
+
+    return IMAGE_CACHE.get_or_set(key, load)
+
+
+def image_bytes(name, width=480, fmt="webp"):
+    """Encoded bytes of a shipped image's variant, or None if it is missing or not an image.
+
+    Pages fall back to a title or no thumbnail on None.
+    """
+    path = resolve_asset(name)
+    variant = image_variant(path, width, fmt) if path else None
+    return variant[1] if variant else None
@@ -0,0 +1,75 @@
+import argparse
+import time
+
+from db import connection
+from metrics import DB_QUERY_SECONDS, timed
+
+# Grid-average emissions avoided per kWh of solar output, in metric tons
+CO2_TONS_PER_KWH = 0.0004
+
+# The energy attributed to an investment is its share of the project's
+# funding target applied to the project's output.
+INSERT_INVESTMENT = '''
+    INSERT INTO investments (user_id, company_id, amount, energy_produced, co_saved)
+    SELECT :user_id, id, :amount,
+           :amount / target_funding * energy_output,
+           :amount / target_funding * energy_output * :co2_per_kwh
+    FROM companies
+    WHERE id = :company_id AND target_funding > 0
+'''
+
+
+@timed(DB_QUERY_SECONDS, op="record_investment")
+def record_investment(user_id, company_id, amount):
+    """Append an investment to the ledger and return its id.
+
+    The user's and the company's running totals are updated by triggers in
+    the same transaction. Returns None if the company does not exist or has
+    no funding target.
+    """
+    if amount <= 0:
+        raise ValueError("Investment amount must be positive")
+    with connection() as conn:
+        cur = conn.execute(INSERT_INVESTMENT, {
+            "user_id": user_id, "company_id": company_id,
+            "amount": float(amount), "co2_per_kwh": CO2_TONS_PER_KWH,
+        })
+        return cur.lastrowid if cur.rowcount else None
+
+
+def rebuild_aggregates(path=None):
+    """Recompute every running total from the ledger in one transaction.
+
+    Used to backfill the aggregates after a bulk ledger import or to repair
+    drift. Users without ledger entries are reset to zero.
+    """
+    with connection(path) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("UPDATE users SET invested_amount = 0, energy_produced = 0, co_saved = 0")
+        users = conn.execute('''
+            UPDATE users SET
+                invested_amount = totals.amount,
+                energy_produced = totals.energy_produced,
+                co_saved = totals.co_saved
+            FROM (
+                SELECT user_id, SUM(amount) AS amount, SUM(energy_produced) AS energy_produced, SUM(co_saved) AS co_saved
+                FROM investments GROUP BY user_id
+            ) AS totals
+            WHERE users.id = totals.user_id
+        ''').rowcount
+        conn.execute("DELETE FROM company_totals")
+        companies = conn.execute('''
+            INSERT INTO company_totals (company_id, total_invested, energy_produced, co_saved, investment_count)
+            SELECT company_id, SUM(amount), SUM(energy_produced), SUM(co_saved), COUNT(*)
+            FROM investments GROUP BY company_id
+        ''').rowcount
+    return users, companies
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Rebuild user and company totals from the investments ledger.")
+    parser.add_argument("--db", help="database file (defaults to green_invest.db)")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    users, companies = rebuild_aggregates(args.db)
+    print(f"Rebuilt totals for {users} users and {companies} companies in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,265 @@
+"""Timing histograms for the hot paths, exported in Prometheus text format.
+
+    from metrics import DB_QUERY_SECONDS, timed
+
+    @timed(DB_QUERY_SECONDS, op="get_user_profile")
+    def get_user_profile(user_id): ...
+
+    with timed(CHART_SECONDS, kind="png"):
+        ...
+
+Metrics live in the process that records them; with several gunicorn
+workers each worker's ``/metrics`` shows its own share.
+"""
+import bisect
+import cProfile
+import functools
+import importlib.util
+import io
+import os
+import pstats
+import threading
+import time
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Who may ask for a profile: "0" (nobody), "local" (loopback clients only) or
+# "1" (anyone). Off by default; behind a reverse proxy on the same host every
+# client looks local, so "local" is only for development.
+PROFILING = os.environ.get("PROFILING", "0")
+LOOPBACK = {"127.0.0.1", "::1", "localhost"}
+
+
+def _label_text(names, values):
+    if not names:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for v in values)
+    return "{" + ",".join(f'{n}="{v}"' for n, v in zip(names, escaped)) + "}"
+
+
+class Histogram:
+    """Cumulative-bucket histogram keyed by label values."""
+
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def samples(self):
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for key, (counts, total, count) in sorted(series.items()):
+            cumulative = 0
+            for bound, n in zip(self.buckets + (float("inf"),), counts):
+                cumulative += n
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                yield f"{self.name}_bucket{_label_text(self.labelnames + ('le',), key + (le,))} {cumulative}"
+            yield f"{self.name}_sum{_label_text(self.labelnames, key)} {total}"
+            yield f"{self.name}_count{_label_text(self.labelnames, key)} {count}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels.get(n, "")) for n in self.labelnames)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            values = dict(self._values)
+        for key, value in sorted(values.items()):
+            yield f"{self.name}_total{_label_text(self.labelnames, key)} {value}"
+
+
+REGISTRY = {}
+_registry_lock = threading.Lock()
+
+
+def _register(cls, name, *args):
+    with _registry_lock:
+        metric = REGISTRY.get(name)
+        if metric is None:
+            metric = REGISTRY[name] = cls(name, *args)
+        return metric
+
+
+def histogram(name, help, labelnames=(), buckets=DEFAULT_BUCKETS):
+    """The histogram called ``name``, created on first use."""
+    return _register(Histogram, name, help, labelnames, buckets)
+
+
+def counter(name, help, labelnames=()):
+    return _register(Counter, name, help, labelnames)
+
+
+def render():
+    """All registered metrics in the Prometheus text exposition format."""
+    lines = []
+    for name, metric in sorted(REGISTRY.items()):
+        lines.append(f"# HELP {name} {metric.help}")
+        lines.append(f"# TYPE {name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+class timed:
+    """Observe elapsed seconds into ``metric``; a context manager or a decorator."""
+
+    def __init__(self, metric, **labels):
+        self.metric = metric
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.metric.observe(time.perf_counter() - self.started, **self.labels)
+
+    def __call__(self, fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            # A fresh instance per call, so concurrent calls do not share a start time
+            with timed(self.metric, **self.labels):
+                return fn(*args, **kwargs)
+        return wrapper
+
+
+DB_QUERY_SECONDS = histogram("green_invest_db_query_seconds", "Database operations, by function.", ["op"])
+CALCULATOR_SECONDS = histogram("green_invest_calculator_seconds", "Credit projections, by function.", ["op"])
+CHART_SECONDS = histogram("green_invest_chart_seconds", "Chart rendering, by chart.", ["kind"])
+UPSTREAM_SECONDS = histogram("green_invest_upstream_seconds", "Research upstream calls, by upstream.", ["upstream"])
+UPSTREAM_ERRORS = counter("green_invest_upstream_errors", "Research upstream calls that failed.", ["upstream"])
+HTTP_REQUEST_SECONDS = histogram("green_invest_http_request_seconds",
+                                 "Research API requests until the response starts.", ["route", "method", "status"])
+RERUN_SECONDS = histogram("green_invest_rerun_seconds", "Streamlit script runs, by script.", ["script"])
+
+
+# Profiling. pyinstrument gives a readable call tree when installed;
+# otherwise cProfile's top functions by cumulative time are reported.
+# Only the calling thread is profiled; work fanned out to pools shows up
+# in the histograms above instead.
+HAS_PYINSTRUMENT = importlib.util.find_spec("pyinstrument") is not None
+
+
+def profiling_allowed(value, client=None):
+    """True when a request asked for a profile (``value`` is "1"/"true") and may have one."""
+    if str(value).lower() not in ("1", "true", "yes"):
+        return False
+    if PROFILING == "1":
+        return True
+    return PROFILING == "local" and (client is None or client in LOOPBACK)
+
+
+class Profile:
+    """One profiling capture: ``start()``, run the code, then ``stop()`` for a text report."""
+
+    def start(self):
+        if HAS_PYINSTRUMENT:
+            from pyinstrument import Profiler
+            self._profiler = Profiler()
+            self._profiler.start()
+        else:
+            self._profiler = cProfile.Profile()
+            self._profiler.enable()
+        return self
+
+    def stop(self, limit=40):
+        if HAS_PYINSTRUMENT:
+            self._profiler.stop()
+            return self._profiler.output_text(unicode=True)
+        self._profiler.disable()
+        out = io.StringIO()
+        pstats.Stats(self._profiler, stream=out).sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+class Rerun:
+    """Times one Streamlit script run and, if asked, profiles it.
+
+    Call ``finish()`` at the end of the script (and before ``st.rerun()``);
+    it returns the profile report, or None when no profile was taken.
+    """
+
+    def __init__(self, script, profile=False):
+        ensure_metrics_server()
+        self.script = script
+        self.started = time.perf_counter()
+        self.profile = Profile().start() if profile else None
+        self.finished = False
+
+    def finish(self):
+        if self.finished:
+            return None
+        self.finished = True
+        RERUN_SECONDS.observe(time.perf_counter() - self.started, script=self.script)
+        return self.profile.stop() if self.profile is not None else None
+
+
+# Streamlit processes have no Flask app of their own; with METRICS_PORT set
+# they serve /metrics from a small side server instead.
+METRICS_HOST = os.environ.get("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = os.environ.get("METRICS_PORT")
+
+_metrics_server = None
+_metrics_server_lock = threading.Lock()
+
+
+def ensure_metrics_server(host=METRICS_HOST, port=METRICS_PORT):
+    """Start the /metrics side server once per process if a port is configured."""
+    global _metrics_server
+    if not port or _metrics_server is not None:
+        return _metrics_server
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            body = render().encode("utf-8") if self.path.split("?")[0] == "/metrics" else b""
+            self.send_response(200 if body else 404)
+            self.send_header("Content-Type", CONTENT_TYPE)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    with _metrics_server_lock:
+        if _metrics_server is None:
+            try:
+                server = ThreadingHTTPServer((host, int(port)), Handler)
+            except OSError as e:
+                # Another process (e.g. a second Streamlit worker) already serves it
+                print(f"Metrics server not started on {host}:{port}: {e}")
+                server = False
+            else:
+                server.daemon_threads = True
+                threading.Thread(target=server.serve_forever, daemon=True).start()
+            _metrics_server = server
+    return _metrics_server
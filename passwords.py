@@ -0,0 +1,149 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+# scrypt cost. N doubles the CPU and memory per hash; existing hashes with
+# other parameters keep verifying and are upgraded on the next login.
+SCRYPT_N = int(os.environ.get("PASSWORD_SCRYPT_N", 2**14))
+SCRYPT_R = int(os.environ.get("PASSWORD_SCRYPT_R", 8))
+SCRYPT_P = int(os.environ.get("PASSWORD_SCRYPT_P", 1))
+SALT_BYTES = 16
+KEY_BYTES = 32
+
+# At most WORKERS hashes run at once; at most QUEUE_SIZE more may wait.
+WORKERS = int(os.environ.get("PASSWORD_WORKERS", min(4, os.cpu_count() or 1)))
+QUEUE_SIZE = int(os.environ.get("PASSWORD_QUEUE_SIZE", 32))
+QUEUE_TIMEOUT = float(os.environ.get("PASSWORD_QUEUE_TIMEOUT", 5.0))
+
+PREFIX = "scrypt"
+
+
+class HasherBusy(RuntimeError):
+    """Raised when the hashing pool's queue stays full for QUEUE_TIMEOUT seconds."""
+
+
+def _b64(data):
+    return base64.b64encode(data).decode("ascii")
+
+
+def _scrypt(password, salt, n, r, p):
+    # hashlib.scrypt releases the GIL, so pool threads hash in parallel
+    return hashlib.scrypt(password.encode("utf-8"), salt=salt, n=n, r=r, p=p,
+                          maxmem=128 * r * (n + p + 2) + 2**20, dklen=KEY_BYTES)
+
+
+def _hash(password, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    salt = secrets.token_bytes(SALT_BYTES)
+    return f"{PREFIX}${n}${r}${p}${_b64(salt)}${_b64(_scrypt(password, salt, n, r, p))}"
+
+
+def _parse(stored):
+    """``(n, r, p, salt, key)`` of a hash made by ``_hash``, or None for anything else.
+
+    A legacy plaintext password may itself start with "scrypt$", so the
+    prefix alone does not make a hash.
+    """
+    fields = stored.split("$")
+    if len(fields) != 6 or fields[0] != PREFIX or not all(f.isdigit() for f in fields[1:4]):
+        return None
+    try:
+        salt, key = base64.b64decode(fields[4], validate=True), base64.b64decode(fields[5], validate=True)
+    except ValueError:
+        return None
+    if len(key) != KEY_BYTES:
+        return None
+    return int(fields[1]), int(fields[2]), int(fields[3]), salt, key
+
+
+def is_hashed(stored):
+    return _parse(stored) is not None
+
+
+def _verify(password, stored):
+    parsed = _parse(stored)
+    if parsed is None:
+        # Legacy plaintext row
+        return hmac.compare_digest(password.encode("utf-8"), stored.encode("utf-8"))
+    n, r, p, salt, key = parsed
+    return hmac.compare_digest(_scrypt(password, salt, n, r, p), key)
+
+
+def needs_rehash(stored, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+    """True for plaintext rows and hashes made with other cost parameters."""
+    parsed = _parse(stored)
+    return parsed is None or parsed[:3] != (n, r, p)
+
+
+class Hasher:
+    """Runs password hashing on a bounded thread pool.
+
+    Callers block until their hash is done, but only ``workers`` hashes use
+    CPU at a time and at most ``queue_size`` more may queue; beyond that
+    callers get ``HasherBusy`` instead of piling up.
+    """
+
+    def __init__(self, workers=WORKERS, queue_size=QUEUE_SIZE, queue_timeout=QUEUE_TIMEOUT,
+                 n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="password")
+        self.slots = threading.BoundedSemaphore(workers + queue_size)
+        self.queue_timeout = queue_timeout
+        self.params = (n, r, p)
+        self._dummy_hash = None
+
+    def _run(self, fn, *args):
+        if not self.slots.acquire(timeout=self.queue_timeout):
+            raise HasherBusy("Too many password checks in progress")
+        try:
+            return self.executor.submit(fn, *args).result()
+        finally:
+            self.slots.release()
+
+    def hash(self, password):
+        return self._run(_hash, password, *self.params)
+
+    def verify(self, password, stored):
+        return self._run(_verify, password, stored)
+
+    def needs_rehash(self, stored):
+        return needs_rehash(stored, *self.params)
+
+    def verify_dummy(self, password):
+        """Do the work of a failed check against a hash nobody has; always False.
+
+        Used when there is no such user, so that answers as slowly as a
+        wrong password and timing does not reveal which usernames exist.
+        """
+        if self._dummy_hash is None:
+            self._dummy_hash = self.hash(secrets.token_urlsafe(16))
+        self.verify(password, self._dummy_hash)
+        return False
+
+
+_hasher = None
+_hasher_lock = threading.Lock()
+
+
+def get_hasher():
+    """Process-wide Hasher configured from the environment."""
+    global _hasher
+    if _hasher is None:
+        with _hasher_lock:
+            if _hasher is None:
+                _hasher = Hasher()
+    return _hasher
+
+
+def hash_password(password):
+    return get_hasher().hash(password)
+
+
+def verify_password(password, stored):
+    return get_hasher().verify(password, stored)
+
+
+def verify_dummy(password):
+    return get_hasher().verify_dummy(password)
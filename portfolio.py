@@ -0,0 +1,200 @@
+"""Batch credit projections for every holding on the platform.
+
+Streams each user's per-company investment totals out of SQLite in chunks,
+projects their credits with the vectorized calculator and writes the
+results as NumPy arrays that dashboards memory-map instead of recomputing:
+
+    python portfolio.py --out .cache/portfolio
+"""
+import argparse
+import json
+import os
+import shutil
+import time
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+from cache import TTLCache
+from credit_calculator import COLUMNS, GROWTH_MONTHS, project_scenarios
+from db import connection, get_pool
+
+OUTPUT_DIR = os.environ.get("PORTFOLIO_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".cache", "portfolio"))
+CHUNK_SIZE = 50_000
+# Seconds a loaded build is reused before checking for a newer one
+PORTFOLIO_RELOAD_INTERVAL = float(os.environ.get("PORTFOLIO_RELOAD_INTERVAL", 60))
+
+PORTFOLIO_CACHE = TTLCache(maxsize=4, ttl=PORTFOLIO_RELOAD_INTERVAL)
+
+# Projection inputs per company; companies without a row use the
+# calculator's defaults below.
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS company_projections (
+        company_id INTEGER PRIMARY KEY REFERENCES companies (id),
+        initial_credits REAL NOT NULL,
+        manufacturing_duration INTEGER NOT NULL,
+        growth_rate REAL NOT NULL
+    )
+    ''',
+]
+DEFAULT_INITIAL_CREDITS = 1_000_000
+DEFAULT_MANUFACTURING_DURATION = 6
+DEFAULT_GROWTH_RATE = 0.02
+
+# Walks idx_investments_user_company, so groups come out already sorted
+# and SQLite never materializes the whole result. Ledger rows of deleted
+# companies are skipped.
+SELECT_HOLDINGS = '''
+    SELECT user_id, company_id, SUM(amount) FROM investments
+    WHERE company_id IN (SELECT id FROM companies)
+    GROUP BY user_id, company_id ORDER BY user_id, company_id
+'''
+COUNT_HOLDINGS = '''
+    SELECT COUNT(*) FROM (SELECT 1 FROM investments WHERE company_id IN (SELECT id FROM companies)
+                          GROUP BY user_id, company_id)
+'''
+SELECT_COMPANIES = '''
+    SELECT c.id, c.target_funding,
+           COALESCE(p.initial_credits, ?), COALESCE(p.manufacturing_duration, ?), COALESCE(p.growth_rate, ?)
+    FROM companies c LEFT JOIN company_projections p ON p.company_id = c.id
+'''
+
+ARRAYS = ("user_ids", "company_ids", "invested", "shares", "credits")
+
+Portfolio = namedtuple("Portfolio", ["meta"] + list(ARRAYS))
+
+
+def _company_curves(conn, growth_months):
+    """Per-company credit curves, indexable by company id, and each company's target funding."""
+    rows = conn.execute(SELECT_COMPANIES, (DEFAULT_INITIAL_CREDITS, DEFAULT_MANUFACTURING_DURATION,
+                                           DEFAULT_GROWTH_RATE)).fetchall()
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    target, initial, duration, growth = (np.array([row[i] for row in rows], dtype=float) for i in range(1, 5))
+    curves, _ = project_scenarios(1.0, initial, duration, growth, growth_months)
+    size = int(ids.max(initial=0)) + 1
+    by_id = np.full((size, curves.shape[1]), np.nan)
+    by_id[ids] = curves
+    funding = np.full(size, np.nan)
+    # Companies without a positive target have no defined shares
+    funding[ids] = np.where(target > 0, target, np.nan)
+    return by_id, funding
+
+
+def build_portfolio(path=None, out_dir=OUTPUT_DIR, chunk_size=CHUNK_SIZE, growth_months=GROWTH_MONTHS):
+    """Project every (user, company) holding and write the arrays to ``out_dir``.
+
+    A user's share of a company is what they invested over its target
+    funding, so their credits are that share of the company's curve. Memory
+    is bounded by ``chunk_size`` rows; the output is written next to
+    ``out_dir`` and swapped in whole when complete. Returns the metadata.
+    """
+    get_pool(path, schema=SCHEMA)
+    start = time.perf_counter()
+    tmp_dir = f"{out_dir}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+
+    with connection(path) as conn:
+        # One read transaction, so the count and the rows come from the same snapshot
+        conn.execute("BEGIN")
+        curves, funding = _company_curves(conn, growth_months)
+        rows = conn.execute(COUNT_HOLDINGS).fetchone()[0]
+        horizon = curves.shape[1]
+
+        def array(name, dtype, shape=(rows,)):
+            return np.lib.format.open_memmap(os.path.join(tmp_dir, f"{name}.npy"), mode="w+", dtype=dtype, shape=shape)
+
+        out = {
+            "user_ids": array("user_ids", np.int64),
+            "company_ids": array("company_ids", np.int64),
+            "invested": array("invested", np.float64),
+            "shares": array("shares", np.float64),
+            "credits": array("credits", np.float32, (rows, horizon)),
+        }
+        cursor = conn.execute(SELECT_HOLDINGS)
+        offset = 0
+        while True:
+            chunk = cursor.fetchmany(chunk_size)
+            if not chunk:
+                break
+            user_ids, company_ids, invested = (np.array(col) for col in zip(*chunk))
+            end = offset + len(chunk)
+            shares = invested / funding[company_ids]
+            out["user_ids"][offset:end] = user_ids
+            out["company_ids"][offset:end] = company_ids
+            out["invested"][offset:end] = invested
+            out["shares"][offset:end] = shares
+            out["credits"][offset:end] = shares[:, None] * curves[company_ids]
+            offset = end
+
+    for arr in out.values():
+        arr.flush()
+    del out
+    elapsed = time.perf_counter() - start
+    meta = {
+        "rows": offset,
+        "horizon": horizon,
+        "months": [f"Month {m}" for m in range(1, horizon + 1)],
+        "generated_at": time.time(),
+        "elapsed": elapsed,
+        "rows_per_sec": offset / elapsed if elapsed else 0.0,
+    }
+    with open(os.path.join(tmp_dir, "meta.json"), "w") as f:
+        json.dump(meta, f)
+
+    old_dir = f"{out_dir}.old-{os.getpid()}"
+    if os.path.isdir(out_dir):
+        os.replace(out_dir, old_dir)
+    os.replace(tmp_dir, out_dir)
+    shutil.rmtree(old_dir, ignore_errors=True)
+    return meta
+
+
+def load_portfolio(out_dir=OUTPUT_DIR):
+    """Memory-map a build_portfolio() output; nothing is read until it is indexed."""
+    with open(os.path.join(out_dir, "meta.json")) as f:
+        meta = json.load(f)
+    return Portfolio(meta, *(np.load(os.path.join(out_dir, f"{name}.npy"), mmap_mode="r") for name in ARRAYS))
+
+
+def user_holdings(portfolio, user_id):
+    """Row slice of ``portfolio`` for one user; rows are sorted by user id."""
+    lo, hi = np.searchsorted(portfolio.user_ids, [user_id, user_id + 1])
+    return slice(int(lo), int(hi))
+
+
+def user_projection(user_id, out_dir=OUTPUT_DIR):
+    """One user's projected credits per month over all their holdings, from the last build.
+
+    Returns a frame with the calculator's month and user credit columns, or
+    None until build_portfolio() has been run.
+    """
+    def load():
+        try:
+            return load_portfolio(out_dir)
+        except FileNotFoundError:
+            return None
+
+    portfolio = PORTFOLIO_CACHE.get_or_set(out_dir, load)
+    if portfolio is None:
+        return None
+    rows = user_holdings(portfolio, user_id)
+    # Companies with a shorter horizon are NaN past its end
+    return pd.DataFrame({
+        COLUMNS[0]: portfolio.meta["months"],
+        COLUMNS[2]: np.nansum(np.asarray(portfolio.credits[rows], dtype=np.float64), axis=0),
+    })
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Project credits for every holding and write them for dashboards.")
+    parser.add_argument("--db", help="database file (defaults to green_invest.db)")
+    parser.add_argument("--out", default=OUTPUT_DIR, help="output directory")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+    parser.add_argument("--growth-months", type=int, default=GROWTH_MONTHS)
+    args = parser.parse_args()
+    meta = build_portfolio(args.db, args.out, args.chunk_size, args.growth_months)
+    print(f"Projected {meta['rows']} holdings over {meta['horizon']} months in {meta['elapsed']:.2f}s "
+          f"({meta['rows_per_sec']:,.0f} rows/s) -> {args.out}")
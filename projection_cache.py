@@ -0,0 +1,50 @@
+import os
+from collections import namedtuple
+
+from cache import TTLCache
+from credit_calculator import project_credits
+
+# Projections and their rendered charts, shared by every session in the process.
+# Sized with PROJECTION_CACHE_SIZE (entries) and PROJECTION_CACHE_TTL (seconds).
+PROJECTION_CACHE = TTLCache(
+    maxsize=int(os.environ.get("PROJECTION_CACHE_SIZE", 256)),
+    ttl=float(os.environ.get("PROJECTION_CACHE_TTL", 3600)),
+)
+
+Projection = namedtuple("Projection", ["frame", "chart"])
+
+
+def normalize_inputs(user_share, initial_credits, manufacturing_duration, growth_rate):
+    """Canonical cache key for a set of calculator inputs.
+
+    Slider values arrive as floats with representation noise (10.0 / 100 vs
+    0.1) and number inputs as int or float, so equal projections are mapped
+    onto the same key.
+    """
+    return (
+        round(float(user_share), 6),
+        round(float(initial_credits), 6),
+        max(int(manufacturing_duration), 0),
+        round(float(growth_rate), 6),
+    )
+
+
+def cached_projection(user_share, initial_credits, manufacturing_duration, growth_rate,
+                      render_chart=None, cache=PROJECTION_CACHE):
+    """Return a ``Projection`` of the credits frame and its rendered chart.
+
+    ``render_chart(frame)`` builds whatever the page displays (image bytes, a
+    chart-ready frame, ...); it is only called on a cache miss. Pass a
+    module-level function, so every rerun hits the same entries. Cached
+    values are shared between sessions and must not be mutated by callers.
+    """
+    inputs = normalize_inputs(user_share, initial_credits, manufacturing_duration, growth_rate)
+    # The function itself, not its name: same-named renderers (lambdas, or
+    # functions in different modules) must not share entries
+    key = inputs + (render_chart,)
+
+    def build():
+        frame = project_credits(*inputs)
+        return Projection(frame, render_chart(frame) if render_chart else None)
+
+    return cache.get_or_set(key, build)
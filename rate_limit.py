@@ -0,0 +1,224 @@
+"""Admission control for the research API and its upstreams.
+
+``RateLimiter`` gives each client a token bucket, ``WorkQueue`` bounds how
+many requests run and wait at once, and ``CircuitBreaker`` stops calling an
+upstream that keeps failing or timing out until it has had time to recover.
+Rejections carry a ``retry_after`` in seconds for the Retry-After header.
+
+All state is per process; with several gunicorn workers each one enforces
+its own limits.
+"""
+import math
+import os
+import threading
+import time
+
+from cache import TTLCache
+from metrics import counter
+
+# Sustained requests per second per client, and the burst allowed on top
+RATE_LIMIT = float(os.environ.get("RATE_LIMIT", 1.0))
+RATE_LIMIT_BURST = int(os.environ.get("RATE_LIMIT_BURST", 10))
+RATE_LIMIT_CLIENTS = int(os.environ.get("RATE_LIMIT_CLIENTS", 10_000))
+# Research requests running at once, and how many more may wait for a slot
+QUEUE_CONCURRENCY = int(os.environ.get("RESEARCH_QUEUE_CONCURRENCY", 8))
+QUEUE_DEPTH = int(os.environ.get("RESEARCH_QUEUE_DEPTH", 16))
+QUEUE_TIMEOUT = float(os.environ.get("RESEARCH_QUEUE_TIMEOUT", 5.0))
+# Consecutive failures (errors, non-2xx or calls slower than CIRCUIT_SLOW_CALL)
+# that open a circuit, and seconds it stays open before a trial call
+CIRCUIT_FAILURES = int(os.environ.get("CIRCUIT_FAILURES", 5))
+CIRCUIT_RESET = float(os.environ.get("CIRCUIT_RESET", 30.0))
+CIRCUIT_SLOW_CALL = float(os.environ.get("CIRCUIT_SLOW_CALL", 4.0))
+
+REQUESTS_REJECTED = counter("green_invest_requests_rejected", "Research API requests turned away, by reason.",
+                            ["reason"])
+CIRCUIT_TRANSITIONS = counter("green_invest_circuit_transitions", "Upstream circuit breaker state changes.",
+                              ["upstream", "state"])
+
+
+class Rejected(Exception):
+    """A request refused by admission control; ``retry_after`` is in seconds."""
+
+    reason = "rejected"
+
+    def __init__(self, retry_after):
+        super().__init__(f"{self.reason}, retry after {retry_after:.1f}s")
+        self.retry_after = retry_after
+
+    def retry_after_header(self):
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class RateLimited(Rejected):
+    reason = "rate_limited"
+
+
+class Overloaded(Rejected):
+    reason = "overloaded"
+
+
+class CircuitOpen(Exception):
+    def __init__(self, upstream, retry_after):
+        super().__init__(f"{upstream} circuit open, retry after {retry_after:.1f}s")
+        self.upstream = upstream
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """``burst`` tokens refilled at ``rate`` per second; each request takes one."""
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self._clock = clock
+        self.updated = clock()
+        self._lock = threading.Lock()
+
+    def take(self):
+        """Take a token; returns 0 on success or the seconds until one is available."""
+        with self._lock:
+            now = self._clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0.0
+            return (1 - self.tokens) / self.rate
+
+
+class RateLimiter:
+    """Per-client token buckets.
+
+    A bucket left alone for ``burst / rate`` seconds is full again, so idle
+    clients are simply expired from the cache rather than tracked forever.
+    """
+
+    def __init__(self, rate=RATE_LIMIT, burst=RATE_LIMIT_BURST, maxsize=RATE_LIMIT_CLIENTS, clock=time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.buckets = TTLCache(maxsize=maxsize, ttl=burst / rate, clock=clock)
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def check(self, client):
+        """Raise RateLimited if ``client`` has no tokens left."""
+        with self._lock:
+            bucket = self.buckets.get(client)
+            if bucket is None:
+                bucket = TokenBucket(self.rate, self.burst, self._clock)
+            # Re-set on every request so the entry only expires once the bucket is full
+            self.buckets.set(client, bucket)
+        wait = bucket.take()
+        if wait:
+            REQUESTS_REJECTED.inc(reason=RateLimited.reason)
+            raise RateLimited(wait)
+
+
+class WorkQueue:
+    """At most ``concurrency`` requests run; up to ``depth`` more wait for a slot.
+
+    A request arriving to a full queue, or waiting longer than ``timeout``,
+    is shed with Overloaded. Its ``retry_after`` is the time the queue ahead
+    of it should take to drain, from a moving average of service times.
+    """
+
+    def __init__(self, concurrency=QUEUE_CONCURRENCY, depth=QUEUE_DEPTH, timeout=QUEUE_TIMEOUT):
+        self.concurrency = concurrency
+        self.depth = depth
+        self.timeout = timeout
+        self.active = 0
+        self.waiting = 0
+        self.service_time = 1.0
+        self._cond = threading.Condition()
+
+    def _overloaded(self):
+        REQUESTS_REJECTED.inc(reason=Overloaded.reason)
+        return Overloaded(self.service_time * (self.waiting + 1) / self.concurrency)
+
+    def acquire(self):
+        """Take a slot, waiting if needed; returns the start time to pass to ``release``."""
+        with self._cond:
+            if self.active >= self.concurrency:
+                if self.waiting >= self.depth:
+                    raise self._overloaded()
+                self.waiting += 1
+                try:
+                    ready = self._cond.wait_for(lambda: self.active < self.concurrency, self.timeout)
+                finally:
+                    self.waiting -= 1
+                if not ready:
+                    raise self._overloaded()
+            self.active += 1
+        return time.perf_counter()
+
+    def release(self, started):
+        elapsed = time.perf_counter() - started
+        with self._cond:
+            self.active -= 1
+            self.service_time += 0.2 * (elapsed - self.service_time)
+            self._cond.notify()
+
+    def stats(self):
+        with self._cond:
+            return {"active": self.active, "waiting": self.waiting, "concurrency": self.concurrency,
+                    "depth": self.depth, "service_time": self.service_time}
+
+
+class CircuitBreaker:
+    """Closed, open or half-open circuit around one upstream.
+
+    After ``failures`` consecutive failed or slow calls the circuit opens and
+    calls fail fast with CircuitOpen. Once ``reset`` seconds have passed a
+    single trial call is let through: success closes the circuit, failure
+    opens it again.
+    """
+
+    def __init__(self, name, failures=CIRCUIT_FAILURES, reset=CIRCUIT_RESET, slow_call=CIRCUIT_SLOW_CALL,
+                 clock=time.monotonic):
+        self.name = name
+        self.failures = failures
+        self.reset = reset
+        self.slow_call = slow_call
+        self.state = "closed"
+        self.consecutive = 0
+        self.opened_at = None
+        self._trial = False
+        self._clock = clock
+        self._lock = threading.Lock()
+
+    def _set_state(self, state):
+        if state != self.state:
+            self.state = state
+            CIRCUIT_TRANSITIONS.inc(upstream=self.name, state=state)
+
+    def before_call(self):
+        """Raise CircuitOpen unless a call may go ahead now."""
+        with self._lock:
+            if self.state == "closed":
+                return
+            remaining = self.opened_at + self.reset - self._clock()
+            if self.state == "open" and remaining <= 0:
+                self._set_state("half_open")
+            if self.state == "half_open" and not self._trial:
+                self._trial = True
+                return
+            raise CircuitOpen(self.name, max(remaining, 0.0))
+
+    def record(self, ok, elapsed=0.0):
+        """Report the outcome of a call let through by ``before_call``."""
+        ok = ok and elapsed <= self.slow_call
+        with self._lock:
+            self._trial = False
+            if ok:
+                self.consecutive = 0
+                self._set_state("closed")
+                return
+            self.consecutive += 1
+            if self.state == "half_open" or self.consecutive >= self.failures:
+                self.opened_at = self._clock()
+                self._set_state("open")
+
+    def stats(self):
+        with self._lock:
+            return {"state": self.state, "consecutive_failures": self.consecutive}
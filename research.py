@@ -0,0 +1,237 @@
+import os
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from metrics import UPSTREAM_ERRORS, UPSTREAM_SECONDS, timed
+from rate_limit import CircuitBreaker, CircuitOpen
+
+DDG_URL = os.environ.get("DDG_API_URL", "https://api.duckduckgo.com/")
+WIKIPEDIA_API_URL = os.environ.get("WIKIPEDIA_API_URL", "https://en.wikipedia.org/w/api.php")
+WIKIPEDIA_SUMMARY_URL = os.environ.get("WIKIPEDIA_SUMMARY_URL", "https://en.wikipedia.org/api/rest_v1/page/summary/")
+
+# Overall budget for one research request, in seconds. Whatever has
+# arrived when it runs out is returned as a partial answer.
+DEADLINE = float(os.environ.get("RESEARCH_DEADLINE", 8.0))
+DDG_TIMEOUT = 8
+WIKIPEDIA_TIMEOUT = 6
+UPSTREAMS = ('duckduckgo', 'wikipedia_search', 'wikipedia_summary')
+
+
+class ResearchClient:
+    """Queries DuckDuckGo and Wikipedia concurrently over pooled keep-alive connections.
+
+    DuckDuckGo and the Wikipedia search start together; each Wikipedia hit's
+    summary is requested as soon as the search returns. All calls share one
+    ``requests.Session`` and one thread pool. Each upstream has a circuit
+    breaker, so one that keeps failing or timing out is skipped instead of
+    holding every request until the deadline.
+    """
+
+    def __init__(self, ddg_url=DDG_URL, wikipedia_api_url=WIKIPEDIA_API_URL,
+                 wikipedia_summary_url=WIKIPEDIA_SUMMARY_URL, deadline=DEADLINE, max_workers=16):
+        self.ddg_url = ddg_url
+        self.wikipedia_api_url = wikipedia_api_url
+        self.wikipedia_summary_url = wikipedia_summary_url
+        self.deadline = deadline
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="research")
+        self.breakers = {name: CircuitBreaker(name) for name in UPSTREAMS}
+
+    def _get_json(self, upstream, url, timeout, params=None):
+        breaker = self.breakers[upstream]
+        breaker.before_call()
+        with timed(UPSTREAM_SECONDS, upstream=upstream) as call:
+            try:
+                response = self.session.get(url, params=params, timeout=timeout)
+            except Exception:
+                UPSTREAM_ERRORS.inc(upstream=upstream)
+                breaker.record(False)
+                raise
+        elapsed = time.perf_counter() - call.started
+        data = None
+        if response.ok:
+            try:
+                data = response.json()
+            except ValueError:
+                pass
+        # A 200 with a body that is not JSON is as broken as a 5xx
+        breaker.record(data is not None, elapsed)
+        if data is None:
+            UPSTREAM_ERRORS.inc(upstream=upstream)
+        return data
+
+    def fetch_duckduckgo(self, q, timeout=DDG_TIMEOUT):
+        """DuckDuckGo Instant Answer: main abstract plus up to three related topics."""
+        sources = []
+        jd = self._get_json('duckduckgo', self.ddg_url, timeout, params={
+            'q': q,
+            'format': 'json',
+            'no_html': 1,
+            'skip_disambig': 1
+        })
+        if not jd:
+            return sources
+        abstract = jd.get('AbstractText', '')
+        if abstract:
+            sources.append({
+                'source': 'DuckDuckGo',
+                'type': 'main',
+                'text': abstract,
+                'url': jd.get('AbstractURL'),
+                'title': jd.get('Heading', '')
+            })
+        for topic in (jd.get('RelatedTopics') or [])[:3]:
+            if isinstance(topic, dict) and topic.get('Text'):
+                sources.append({
+                    'source': 'DuckDuckGo',
+                    'type': 'related',
+                    'text': topic.get('Text'),
+                    'url': topic.get('FirstURL'),
+                    'title': 'Related Topic'
+                })
+        return sources
+
+    def search_wikipedia(self, q, timeout=WIKIPEDIA_TIMEOUT):
+        """Titles of the top three Wikipedia search hits."""
+        search_data = self._get_json('wikipedia_search', self.wikipedia_api_url, timeout, params={
+            'action': 'query',
+            'list': 'search',
+            'srsearch': q,
+            'format': 'json',
+            'srlimit': 3
+        })
+        results = (search_data or {}).get('query', {}).get('search', [])
+        return [r['title'] for r in results if r.get('title')]
+
+    def fetch_wikipedia_summary(self, title, timeout=WIKIPEDIA_TIMEOUT):
+        page_data = self._get_json('wikipedia_summary', self.wikipedia_summary_url + requests.utils.requote_uri(title),
+                                   timeout)
+        if not page_data:
+            return []
+        return [{
+            'source': 'Wikipedia',
+            'type': 'article',
+            'text': page_data.get('extract', ''),
+            'url': page_data.get('content_urls', {}).get('desktop', {}).get('page'),
+            'title': title,
+            'thumbnail': page_data.get('thumbnail', {}).get('source')
+        }]
+
+    def iter_sources(self, q, deadline=None):
+        """Yield ``(rank, sources)`` batches in completion order until done or out of time.
+
+        ``rank`` orders batches the way the answer presents them (DuckDuckGo
+        first, then Wikipedia articles in search order). Upstream failures
+        are logged and skipped, as are upstreams whose circuit is open;
+        calls still running at the deadline are abandoned and their results
+        discarded. The generator returns True when the deadline cut it short.
+        """
+        ends_at = time.monotonic() + (self.deadline if deadline is None else deadline)
+
+        def remaining(cap):
+            return max(min(cap, ends_at - time.monotonic()), 0.001)
+
+        pending = {
+            self.executor.submit(self.fetch_duckduckgo, q, remaining(DDG_TIMEOUT)): ('DuckDuckGo', 0),
+            self.executor.submit(self.search_wikipedia, q, remaining(WIKIPEDIA_TIMEOUT)): ('Wikipedia search', None),
+        }
+        while pending:
+            done, _ = wait(pending, timeout=ends_at - time.monotonic(), return_when=FIRST_COMPLETED)
+            if not done:
+                for future in pending:
+                    future.cancel()
+                print(f"Research deadline reached with {len(pending)} upstream call(s) pending")
+                return True
+            for future in done:
+                name, rank = pending.pop(future)
+                try:
+                    result = future.result()
+                except CircuitOpen:
+                    continue
+                except Exception as e:
+                    print(f"{name} API error: {str(e)}")
+                    continue
+                if rank is None:
+                    for i, title in enumerate(result):
+                        summary = self.executor.submit(self.fetch_wikipedia_summary, title, remaining(WIKIPEDIA_TIMEOUT))
+                        pending[summary] = ('Wikipedia', i + 1)
+                elif result:
+                    yield rank, result
+        return False
+
+    def stream_research(self, q, deadline=None):
+        """Yield ``("source", source)`` as each source arrives, then ``("answer", (payload, status))``."""
+        batches = []
+        sources_iter = self.iter_sources(q, deadline)
+        try:
+            while True:
+                rank, batch = next(sources_iter)
+                batches.append((rank, batch))
+                for source in batch:
+                    yield "source", source
+        except StopIteration as stop:
+            partial = bool(stop.value)
+        batches.sort(key=lambda batch: batch[0])
+        yield "answer", build_response(q, [source for _, batch in batches for source in batch], partial)
+
+    def research(self, q, deadline=None):
+        """Collect every source that arrives before the deadline and build the answer."""
+        for kind, item in self.stream_research(q, deadline):
+            if kind == "answer":
+                return item
+
+    def circuits(self):
+        return {name: breaker.stats() for name, breaker in self.breakers.items()}
+
+
+def build_response(q, sources, partial=False):
+    """Summary and suggestions for ``sources``, as ``(payload, http_status)``."""
+    response = {
+        'query': q,
+        'sources': sources,
+        'summary': '',
+        'suggestions': [],
+        'partial': partial
+    }
+
+    # Create main summary
+    summary_parts = []
+    main_sources = [s for s in sources if s['type'] == 'main']
+    if main_sources:
+        summary_parts.append(main_sources[0]['text'])
+
+    article_sources = [s for s in sources if s['type'] == 'article']
+    for source in article_sources[:2]:
+        if source['text'] and source['text'] not in summary_parts:
+            summary_parts.append(source['text'])
+
+    response['summary'] = '\n\n'.join(summary_parts)
+
+    # Add related topics as suggestions
+    related_sources = [s for s in sources if s['type'] == 'related']
+    response['suggestions'] = [{'text': s['text'], 'url': s['url']} for s in related_sources]
+
+    if response['summary']:
+        return response, 200
+    return {'error': 'no_results', 'suggestions': response['suggestions']}, 200
+
+
+_client = None
+_client_lock = threading.Lock()
+
+
+def get_client():
+    """Process-wide ResearchClient, so every request shares its connection pool."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = ResearchClient()
+    return _client
@@ -0,0 +1,300 @@
+import json
+import os
+import threading
+import time
+from collections import deque
+
+from cache import TTLCache
+from db import get_pool
+
+RESEARCH_CACHE_TTL = float(os.environ.get("RESEARCH_CACHE_TTL", 3600))
+# no_results and partial answers are kept for a shorter time
+RESEARCH_CACHE_NEGATIVE_TTL = float(os.environ.get("RESEARCH_CACHE_NEGATIVE_TTL", 300))
+# Good answers are kept this much longer past expiry, to serve while the upstreams are down
+RESEARCH_CACHE_STALE_TTL = float(os.environ.get("RESEARCH_CACHE_STALE_TTL", 86400))
+RESEARCH_CACHE_SIZE = int(os.environ.get("RESEARCH_CACHE_SIZE", 1024))
+# Optional SQLite file for a cache tier shared across processes and restarts
+RESEARCH_CACHE_DB = os.environ.get("RESEARCH_CACHE_DB")
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS research_cache (
+        query TEXT PRIMARY KEY,
+        payload TEXT NOT NULL,
+        status INTEGER NOT NULL,
+        expires_at REAL NOT NULL
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_research_cache_expires_at ON research_cache (expires_at)",
+]
+
+LATENCY_WINDOW = 1000
+
+
+def normalize_query(q):
+    """Cache key for a question: case-folded with whitespace collapsed."""
+    return " ".join(q.casefold().split())
+
+
+def is_negative(payload):
+    return payload.get('error') == 'no_results' or payload.get('partial', False)
+
+
+def replay(answer):
+    """Stream items for a cached ``(payload, status)`` answer."""
+    for source in answer[0].get('sources', []):
+        yield "source", source
+    yield "answer", answer
+
+
+class Flight:
+    """One upstream fetch in progress, as a log of stream items that any number of requests follow."""
+
+    def __init__(self):
+        self.items = []
+        self.done = False
+        self.error = None
+        self._cond = threading.Condition()
+
+    def add(self, item):
+        with self._cond:
+            self.items.append(item)
+            self._cond.notify_all()
+
+    def finish(self, error=None):
+        with self._cond:
+            self.done = True
+            self.error = error
+            self._cond.notify_all()
+
+    def follow(self):
+        """Yield every item from the first, then raise the fetch's error if it failed."""
+        seen = 0
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: len(self.items) > seen or self.done)
+                items = self.items[seen:]
+                done, error = self.done, self.error
+            seen += len(items)
+            yield from items
+            if done and seen == len(self.items):
+                if error is not None:
+                    raise error
+                return
+
+
+class ResearchCache:
+    """Two-tier cache of research answers with in-flight request coalescing.
+
+    Answers are kept in an in-memory LRU and, when ``db_path`` is given, in a
+    SQLite table shared by every process using that file. Concurrent misses
+    for the same normalized query wait on a single upstream fetch.
+
+    Good answers outlive their TTL by ``stale_ttl``. When a fetch fails or
+    comes back empty or partial (typically an upstream being down, slow or
+    behind an open circuit) the last good answer is served instead, marked
+    ``stale``, and the failed fetch is not cached.
+    """
+
+    def __init__(self, ttl=RESEARCH_CACHE_TTL, negative_ttl=RESEARCH_CACHE_NEGATIVE_TTL,
+                 maxsize=RESEARCH_CACHE_SIZE, db_path=RESEARCH_CACHE_DB, stale_ttl=RESEARCH_CACHE_STALE_TTL):
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.stale_ttl = stale_ttl
+        self.memory = TTLCache(maxsize=maxsize, ttl=ttl, clock=time.time)
+        self.stale = TTLCache(maxsize=maxsize, ttl=ttl + stale_ttl, clock=time.time)
+        self.pool = get_pool(db_path, schema=SCHEMA) if db_path else None
+        self._inflight = {}
+        self._lock = threading.Lock()
+        self.counts = {"memory_hits": 0, "persistent_hits": 0, "misses": 0, "coalesced": 0, "negative_stored": 0,
+                       "stale_served": 0}
+        self.latency = {"hit": deque(maxlen=LATENCY_WINDOW), "miss": deque(maxlen=LATENCY_WINDOW)}
+
+    def _count(self, name, started=None, kind=None):
+        with self._lock:
+            self.counts[name] += 1
+            if started is not None:
+                self.latency[kind].append(time.perf_counter() - started)
+
+    def _load(self, key):
+        if self.pool is None:
+            return None
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT payload, status, expires_at FROM research_cache WHERE query = ? AND expires_at > ?",
+                               (key, time.time())).fetchone()
+        if row is None:
+            return None
+        value = (json.loads(row["payload"]), row["status"])
+        self.memory.set(key, value, ttl=row["expires_at"] - time.time())
+        return value
+
+    def _load_stale(self, key):
+        value = self.stale.get(key)
+        if value is None and self.pool is not None:
+            with self.pool.connection() as conn:
+                row = conn.execute("SELECT payload, status FROM research_cache WHERE query = ? AND expires_at > ?",
+                                   (key, time.time() - self.stale_ttl)).fetchone()
+            if row is not None and not is_negative(json.loads(row["payload"])):
+                value = (json.loads(row["payload"]), row["status"])
+        if value is None:
+            return None
+        self._count("stale_served")
+        return {**value[0], 'stale': True}, value[1]
+
+    def _store(self, key, value):
+        negative = is_negative(value[0])
+        ttl = self.negative_ttl if negative else self.ttl
+        if negative:
+            self._count("negative_stored")
+        else:
+            self.stale.set(key, value)
+        self.memory.set(key, value, ttl=ttl)
+        if self.pool is not None:
+            with self.pool.connection() as conn:
+                conn.execute("INSERT OR REPLACE INTO research_cache (query, payload, status, expires_at) VALUES (?, ?, ?, ?)",
+                             (key, json.dumps(value[0]), value[1], time.time() + ttl))
+
+    def get(self, q):
+        """Cached ``(payload, status)`` for ``q``, or None."""
+        key = normalize_query(q)
+        return self.memory.get(key) or self._load(key)
+
+    def _settle(self, key, value):
+        """Cache a fetched answer and return what to serve: it, or a stale answer instead of a bad one."""
+        if is_negative(value[0]):
+            stale = self._load_stale(key)
+            if stale is not None:
+                return stale
+        self._store(key, value)
+        return value
+
+    def put(self, q, value):
+        """Store a ``(payload, status)`` answer computed outside ``get_or_fetch``.
+
+        Returns the answer to serve, which is a stale one when ``value`` is
+        empty or partial and a good answer is still retained.
+        """
+        return self._settle(normalize_query(q), value)
+
+    def get_or_fetch(self, q, fetch):
+        """Return ``(payload, status)`` for ``q``, calling ``fetch()`` at most once per key at a time.
+
+        Exceptions from ``fetch`` propagate to every waiting caller and
+        nothing is cached, unless a stale answer can be served instead.
+        """
+        for kind, item in self.stream(q, lambda: iter([("answer", fetch())])):
+            if kind == "answer":
+                return item
+
+    def stream(self, q, stream):
+        """Streaming ``get_or_fetch``: yields ``("source", source)`` items, then ``("answer", (payload, status))``.
+
+        ``stream()`` must yield items the same way (see
+        ``ResearchClient.stream_research``). Hits replay the cached answer.
+        The first miss for a key starts the fetch on its own thread and every
+        request for it, the first included, follows that fetch, so a client
+        going away does not cancel it for the others. When a stale answer is
+        served after live sources went out, a ``("reset", None)`` item comes
+        before the stale answer's sources.
+        """
+        started = time.perf_counter()
+        key = normalize_query(q)
+        value = self.memory.get(key)
+        if value is not None:
+            self._count("memory_hits", started, "hit")
+            yield from replay(value)
+            return
+
+        with self._lock:
+            flight = self._inflight.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._inflight[key] = Flight()
+        if leader:
+            threading.Thread(target=self._fetch, args=(key, stream, flight, started), daemon=True).start()
+        else:
+            self._count("coalesced")
+        yield from flight.follow()
+
+    def _fetch(self, key, stream, flight, started):
+        error = RuntimeError("research fetch did not finish")
+        try:
+            value = self._load(key)
+            if value is not None:
+                self._count("persistent_hits", started, "hit")
+                for item in replay(value):
+                    flight.add(item)
+            else:
+                streamed = False
+                try:
+                    for kind, item in stream():
+                        if kind == "answer":
+                            value = self._settle(key, item)
+                            break
+                        streamed = True
+                        flight.add((kind, item))
+                    else:
+                        raise RuntimeError("research stream ended without an answer")
+                except Exception:
+                    value = self._load_stale(key)
+                    if value is None:
+                        raise
+                self._count("misses", started, "miss")
+                if value[0].get('stale'):
+                    # Swap whatever the failed fetch streamed for the stale answer's sources
+                    if streamed:
+                        flight.add(("reset", None))
+                    for item in replay(value):
+                        flight.add(item)
+                else:
+                    flight.add(("answer", value))
+            error = None
+        except Exception as e:
+            error = e
+        finally:
+            flight.finish(error)
+            with self._lock:
+                del self._inflight[key]
+
+    def purge_expired(self):
+        """Delete rows past their stale window from the persistent tier; returns the number removed."""
+        if self.pool is None:
+            return 0
+        with self.pool.connection() as conn:
+            return conn.execute("DELETE FROM research_cache WHERE expires_at <= ?",
+                                (time.time() - self.stale_ttl,)).rowcount
+
+    def stats(self):
+        with self._lock:
+            counts = dict(self.counts)
+            latency = {kind: sorted(samples) for kind, samples in self.latency.items()}
+        hits = counts["memory_hits"] + counts["persistent_hits"] + counts["coalesced"]
+        lookups = hits + counts["misses"]
+        return {
+            **counts,
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "memory": self.memory.stats(),
+            "persistent": self.pool is not None,
+            "latency_ms": {
+                kind: {
+                    "count": len(samples),
+                    "p50": 1000 * samples[len(samples) // 2] if samples else None,
+                    "p95": 1000 * samples[int(0.95 * (len(samples) - 1))] if samples else None,
+                }
+                for kind, samples in latency.items()
+            },
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache():
+    """Process-wide ResearchCache configured from the environment."""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResearchCache()
+    return _cache
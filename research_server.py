@@ -0,0 +1,280 @@
+"""Research API for the chatbot widget.
+
+Run it as its own service under a multi-worker server:
+
+    python research_server.py --workers 4 --threads 8
+
+or let a Streamlit page embed it with ``ensure_server()``, which starts at
+most one threaded server per process.
+
+The research routes are rate limited per client and run through a bounded
+work queue; over either limit they answer 429 with a Retry-After header.
+Clients are told apart by address, so behind a reverse proxy set
+RESEARCH_TRUSTED_PROXIES to the number of proxies in front of the server;
+otherwise every request shares the proxy's address and its rate limit.
+"""
+import argparse
+import functools
+import json
+import os
+import socket
+import threading
+import time
+
+from flask import (Flask, Response, g, redirect, request as flask_request, jsonify, stream_with_context,
+                   url_for)
+from werkzeug.middleware.proxy_fix import ProxyFix
+
+from bundle import get_bundle, widget_url
+from metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, HTTP_REQUEST_SECONDS, Profile, profiling_allowed, render
+from rate_limit import RateLimiter, Rejected, WorkQueue
+from research import get_client as get_research_client
+from research_cache import get_cache as get_research_cache
+
+HOST = os.environ.get("RESEARCH_API_HOST", "127.0.0.1")
+PORT = int(os.environ.get("RESEARCH_API_PORT", 8502))
+# Reverse proxies in front of the server whose X-Forwarded-For entries are trusted
+TRUSTED_PROXIES = int(os.environ.get("RESEARCH_TRUSTED_PROXIES", 0))
+
+
+def create_app(client=None, cache=None, limiter=None, queue=None, trusted_proxies=TRUSTED_PROXIES):
+    """Build the Flask app; ``client`` and ``cache`` default to the process-wide instances.
+
+    ``limiter`` and ``queue`` default to a new RateLimiter and WorkQueue
+    configured from the environment. With ``trusted_proxies`` set, the
+    client address is taken from that many X-Forwarded-For hops (counted
+    from the right, so a client cannot spoof it) instead of the socket peer.
+    """
+    app = Flask(__name__)
+    if trusted_proxies:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=trusted_proxies)
+    get_client = (lambda: client) if client is not None else get_research_client
+    get_cache = (lambda: cache) if cache is not None else get_research_cache
+    limiter = limiter or RateLimiter()
+    queue = queue or WorkQueue()
+
+    def admitted(view):
+        """Rate limit a research route and hold a queue slot until its response is closed."""
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            try:
+                limiter.check(flask_request.remote_addr)
+                started = queue.acquire()
+            except Rejected as e:
+                response = jsonify({'error': e.reason, 'retry_after': e.retry_after})
+                response.status_code = 429
+                response.headers['Retry-After'] = e.retry_after_header()
+                return response
+            streamed = False
+            try:
+                response = app.make_response(view(*args, **kwargs))
+                # Streamed bodies keep working after the view returns
+                streamed = response.is_streamed
+                if streamed:
+                    response.call_on_close(lambda: queue.release(started))
+                return response
+            finally:
+                if not streamed:
+                    queue.release(started)
+        return wrapper
+
+    @app.before_request
+    def before_request():
+        g.started = time.perf_counter()
+        # ?profile=1 or an X-Profile: 1 header returns a profile of this request instead of its response
+        requested = flask_request.args.get('profile') or flask_request.headers.get('X-Profile')
+        g.profile = Profile().start() if profiling_allowed(requested, flask_request.remote_addr) else None
+
+    @app.teardown_request
+    def teardown_request(exc):
+        # after_request has taken the profile unless the view raised
+        profile = g.pop('profile', None)
+        if profile is not None:
+            profile.stop()
+
+    @app.after_request
+    def after_request(response):
+        rule = flask_request.url_rule.rule if flask_request.url_rule else 'unmatched'
+        HTTP_REQUEST_SECONDS.observe(time.perf_counter() - g.started, route=rule, method=flask_request.method,
+                                     status=response.status_code)
+        if g.get('profile') is not None:
+            # Drain streamed bodies so their work is part of the profile
+            response.direct_passthrough = False
+            response.get_data()
+            response.close()
+            status = response.status
+            response = Response(g.pop('profile').stop(), mimetype="text/plain")
+            response.headers['X-Profiled-Status'] = status
+        response.headers.add('Access-Control-Allow-Origin', '*')
+        response.headers.add('Access-Control-Allow-Headers', 'Content-Type, X-Profile')
+        response.headers.add('Access-Control-Allow-Methods', 'GET,POST')
+        response.headers.add('Access-Control-Expose-Headers', 'Retry-After')
+        return response
+
+    @app.route('/api/research', methods=['POST'])
+    @admitted
+    def research_api():
+        """Enhanced web search functionality similar to Google Gemini."""
+        data = flask_request.get_json(force=True)
+        q = (data or {}).get('query', '')
+        if not q:
+            return jsonify({'error': 'empty_query'}), 400
+
+        # DuckDuckGo and Wikipedia are queried concurrently within a deadline;
+        # repeated questions are answered from the cache, and a failing
+        # upstream gets the last good answer served in its place
+        payload, status = get_cache().get_or_fetch(q, lambda: get_client().research(q))
+        return jsonify(payload), status
+
+    @app.route('/api/research/stream', methods=['POST'])
+    @admitted
+    def research_stream_api():
+        """Server-Sent Events variant of /api/research.
+
+        Emits a ``source`` event per source as it arrives, then an ``answer``
+        event with the summary and suggestions (or the error), then ``done``.
+        A ``reset`` event means the sources sent so far are to be dropped, as
+        a stale answer and its own sources are served in their place.
+        """
+        data = flask_request.get_json(force=True)
+        q = (data or {}).get('query', '')
+        if not q:
+            return jsonify({'error': 'empty_query'}), 400
+        cache = get_cache()
+
+        def events():
+            # Same coalescing, stale fallback and hit/miss counting as /api/research
+            for kind, item in cache.stream(q, lambda: get_client().stream_research(q)):
+                if kind == "source":
+                    yield sse_event("source", item)
+                    continue
+                if kind == "reset":
+                    yield sse_event("reset", {})
+                    continue
+                payload, _ = item
+                yield sse_event("answer", {k: v for k, v in payload.items() if k != 'sources'})
+            yield sse_event("done", {})
+
+        return Response(stream_with_context(events()), mimetype="text/event-stream",
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+    @app.route('/api/research/stats', methods=['GET'])
+    def research_stats_api():
+        return jsonify({**get_cache().stats(), 'queue': queue.stats(), 'circuits': get_client().circuits()}), 200
+
+    @app.route('/metrics', methods=['GET'])
+    def metrics():
+        """Latency histograms of this process in Prometheus text format."""
+        return Response(render(), content_type=METRICS_CONTENT_TYPE)
+
+    @app.route('/widget', methods=['GET'])
+    @app.route('/widget/<etag>.html', methods=['GET'])
+    def widget(etag=None):
+        """The chatbot page, built once per process and revalidated by ETag.
+
+        Content-hashed URLs are immutable and cached by the browser for a
+        year; a stale hash redirects to the current one. Clients that accept
+        gzip get the copy compressed at build time.
+        """
+        bundle = get_bundle()
+        if etag is not None and etag != bundle.etag:
+            return redirect(url_for('widget', etag=bundle.etag))
+        if 'gzip' in flask_request.accept_encodings:
+            response = Response(bundle.gzipped, mimetype="text/html")
+            response.headers["Content-Encoding"] = "gzip"
+            response.set_etag(bundle.etag + "-gzip")
+        else:
+            response = Response(bundle.html, mimetype="text/html")
+            response.set_etag(bundle.etag)
+        response.vary.add("Accept-Encoding")
+        response.headers["Cache-Control"] = "public, max-age=31536000, immutable" if etag else "no-cache"
+        return response.make_conditional(flask_request)
+
+    return app
+
+
+def sse_event(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def server_url(host=HOST, port=PORT):
+    return f"http://{host}:{port}"
+
+
+def _port_in_use(host, port):
+    with socket.socket(socket.AF_INET, socket.SOCK_STREAM) as s:
+        s.settimeout(0.2)
+        return s.connect_ex((host, port)) == 0
+
+
+_embedded = None
+_embedded_lock = threading.Lock()
+
+
+def ensure_server(host=HOST, port=PORT):
+    """Start a threaded API server in this process once and return its URL.
+
+    Safe to call on every Streamlit rerun. If something is already listening
+    on the port (typically a standalone research_server), that server is used.
+    """
+    global _embedded
+    with _embedded_lock:
+        if _embedded is None:
+            if _port_in_use(host, port):
+                _embedded = "external"
+            else:
+                from werkzeug.serving import make_server
+                server = make_server(host, port, create_app(), threaded=True)
+                threading.Thread(target=server.serve_forever, name="research-api", daemon=True).start()
+                _embedded = server
+    return server_url(host, port)
+
+
+def serve(host=HOST, port=PORT, workers=1, threads=8, server="auto"):
+    """Serve the API in the foreground with gunicorn, waitress or werkzeug."""
+    if server == "auto":
+        try:
+            import gunicorn  # noqa: F401 (unavailable on Windows)
+            server = "gunicorn"
+        except ImportError:
+            try:
+                import waitress  # noqa: F401
+                server = "waitress"
+            except ImportError:
+                server = "werkzeug"
+
+    if server == "gunicorn":
+        from gunicorn.app.base import BaseApplication
+
+        class ResearchApplication(BaseApplication):
+            def load_config(self):
+                self.cfg.set("bind", f"{host}:{port}")
+                self.cfg.set("workers", workers)
+                self.cfg.set("threads", threads)
+                self.cfg.set("worker_class", "gthread")
+
+            def load(self):
+                return create_app()
+
+        ResearchApplication().run()
+    elif server == "waitress":
+        import waitress
+        if workers > 1:
+            print("waitress runs a single process; serving with threads only")
+        waitress.serve(create_app(), host=host, port=port, threads=threads)
+    else:
+        from werkzeug.serving import run_simple
+        run_simple(host, port, create_app(), threaded=workers == 1, processes=1 if workers == 1 else workers)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Serve the chatbot research API.")
+    parser.add_argument("--host", default=HOST)
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--workers", type=int, default=int(os.environ.get("RESEARCH_API_WORKERS", 2)),
+                        help="worker processes (gunicorn)")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("RESEARCH_API_THREADS", 8)),
+                        help="threads per worker")
+    parser.add_argument("--server", choices=["auto", "gunicorn", "waitress", "werkzeug"], default="auto")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.threads, args.server)
@@ -0,0 +1,128 @@
+"""Local stand-in for the DuckDuckGo and Wikipedia endpoints used by research.py.
+
+Serves canned answers on localhost with injectable latency and failures,
+so the research API can be exercised and benchmarked offline:
+
+    stub = StubUpstream(latency={"summary": 1.0}).start()
+    client = ResearchClient(**stub.client_urls())
+
+``latency`` (seconds), ``failing`` (route names answered with HTTP 503) and
+``garbled`` (route names answered 200 with a body that is not JSON) are
+plain attributes and can be changed while the server is running.
+Routes are ``ddg``, ``search`` and ``summary``.
+"""
+import argparse
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, unquote, urlparse
+
+TITLES = ["Solar power", "Photovoltaics", "Community solar"]
+
+
+class StubUpstream:
+    def __init__(self, host="127.0.0.1", port=0, latency=None, failing=(), garbled=()):
+        self.latency = dict(latency or {})
+        self.failing = set(failing)
+        self.garbled = set(garbled)
+        self.calls = {"ddg": 0, "search": 0, "summary": 0}
+        self._calls_lock = threading.Lock()
+        self.server = ThreadingHTTPServer((host, port), self._handler())
+        self.server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def client_urls(self):
+        """Keyword arguments pointing a ResearchClient at this stub."""
+        return {
+            "ddg_url": self.url + "/ddg/",
+            "wikipedia_api_url": self.url + "/w/api.php",
+            "wikipedia_summary_url": self.url + "/api/rest_v1/page/summary/",
+        }
+
+    def start(self):
+        self._thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    def respond(self, route, query, path):
+        """Canned JSON body for a route."""
+        if route == "ddg":
+            q = query.get("q", [""])[0]
+            return {
+                "Heading": q.title(),
+                "AbstractText": f"{q} is a topic covered by the stub DuckDuckGo endpoint.",
+                "AbstractURL": f"https://duckduckgo.com/{q}",
+                "RelatedTopics": [{"Text": f"{q} related topic {i}", "FirstURL": f"https://duckduckgo.com/{q}/{i}"}
+                                  for i in range(1, 4)],
+            }
+        if route == "search":
+            return {"query": {"search": [{"title": title} for title in TITLES]}}
+        title = unquote(path.rsplit("/", 1)[-1])
+        return {
+            "extract": f"{title} summary from the stub Wikipedia endpoint.",
+            "content_urls": {"desktop": {"page": f"https://en.wikipedia.org/wiki/{title}"}},
+        }
+
+    def _handler(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                parsed = urlparse(self.path)
+                if parsed.path.startswith("/ddg"):
+                    route = "ddg"
+                elif parsed.path.startswith("/w/api.php"):
+                    route = "search"
+                elif parsed.path.startswith("/api/rest_v1/page/summary/"):
+                    route = "summary"
+                else:
+                    self.send_error(404)
+                    return
+                with stub._calls_lock:
+                    stub.calls[route] += 1
+                time.sleep(stub.latency.get(route, 0))
+                if route in stub.failing:
+                    self.send_error(503)
+                    return
+                if route in stub.garbled:
+                    body = b"<html>Service temporarily unavailable</html>"
+                else:
+                    body = json.dumps(stub.respond(route, parse_qs(parsed.query), parsed.path)).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the stub DuckDuckGo/Wikipedia upstream.")
+    parser.add_argument("--port", type=int, default=8600)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every response")
+    args = parser.parse_args()
+    stub = StubUpstream(port=args.port, latency=dict.fromkeys(["ddg", "search", "summary"], args.latency))
+    print(f"Stub upstream on {stub.url}; point the API at it with:")
+    for name, url in zip(["DDG_API_URL", "WIKIPEDIA_API_URL", "WIKIPEDIA_SUMMARY_URL"], stub.client_urls().values()):
+        print(f"  {name}={url}")
+    stub.server.serve_forever()
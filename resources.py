@@ -0,0 +1,39 @@
+"""Static assets loaded once per process and shared by every session and rerun."""
+import json
+import os
+
+from cache import TTLCache
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+ASSET_DIRS = (os.path.join(ROOT_DIR, "assets"), ROOT_DIR)
+LOTTIE_FILE = "Animation - 1729896198439.json"
+
+# No TTL: assets only change with a deploy, which restarts the process
+RESOURCE_CACHE = TTLCache(maxsize=32)
+
+
+def resolve_asset(name):
+    """Path of a file shipped with the app (assets/ first, then the project root), or None."""
+    if not name:
+        return None
+    for directory in ASSET_DIRS:
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            return path
+    return None
+
+
+def load_json(name):
+    """Parsed JSON asset (assets/ first, then the project root), or None if it does not exist."""
+    def load():
+        path = resolve_asset(name)
+        if path is None:
+            return None
+        with open(path, "r") as f:
+            return json.load(f)
+
+    return RESOURCE_CACHE.get_or_set(("json", name), load)
+
+
+def lottie_animation(name=LOTTIE_FILE):
+    return load_json(name)
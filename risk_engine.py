@@ -0,0 +1,157 @@
+import multiprocessing
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+
+from cache import TTLCache
+from credit_calculator import DECLINE_RATE, GROWTH_MONTHS
+from metrics import CALCULATOR_SECONDS, timed
+
+PERCENTILES = (5, 50, 95)
+# Quantile grid each chunk is summarized on before chunks are merged
+SKETCH_POINTS = 2001
+CHUNK_PATHS = 50_000
+# Below this many paths the simulation runs in-process; pool overhead would dominate
+PARALLEL_THRESHOLD = int(os.environ.get("RISK_PARALLEL_THRESHOLD", 200_000))
+WORKERS = int(os.environ.get("RISK_WORKERS", os.cpu_count() or 1))
+
+RISK_CACHE = TTLCache(maxsize=64, ttl=float(os.environ.get("RISK_CACHE_TTL", 3600)))
+
+
+class Distribution(namedtuple("Distribution", ["kind", "a", "b", "c"])):
+    """A monthly rate distribution: normal(mean, std), uniform(low, high),
+    triangular(low, mode, high) or fixed(value)."""
+
+    def sample(self, rng, size):
+        if self.kind == "normal":
+            return rng.normal(self.a, self.b, size)
+        if self.kind == "uniform":
+            return rng.uniform(self.a, self.b, size)
+        if self.kind == "triangular":
+            return rng.triangular(self.a, self.b, self.c, size)
+        if self.kind == "fixed":
+            return np.full(size, self.a)
+        raise ValueError(f"Unknown distribution: {self.kind}")
+
+
+def normal(mean, std):
+    return Distribution("normal", mean, std, None)
+
+
+def uniform(low, high):
+    return Distribution("uniform", low, high, None)
+
+
+def triangular(low, mode, high):
+    # NumPy rejects low == high; a zero-width triangle is a constant
+    if low == high:
+        return fixed(mode)
+    return Distribution("triangular", low, mode, high)
+
+
+def fixed(value):
+    return Distribution("fixed", value, None, None)
+
+
+def _simulate_chunk(seed, paths, initial_credits, manufacturing_duration, growth_months, decline, growth):
+    """Simulate one chunk of paths; returns (per-month quantile sketch, per-month sum)."""
+    rng = np.random.default_rng(seed)
+    decline_rates = np.clip(decline.sample(rng, (paths, manufacturing_duration)), 0.0, 0.999)
+    growth_rates = np.clip(growth.sample(rng, (paths, growth_months)), -0.999, None)
+    log_factors = np.concatenate([np.log1p(-decline_rates), np.log1p(growth_rates)], axis=1)
+    credits = initial_credits * np.exp(np.cumsum(log_factors, axis=1))
+    # Sorting month rows is several times faster than np.quantile(axis=0)
+    ordered = np.sort(credits.T, axis=1)
+    position = np.linspace(0.0, paths - 1, SKETCH_POINTS)
+    low = np.floor(position).astype(int)
+    high = np.minimum(low + 1, paths - 1)
+    frac = position - low
+    sketch = ordered[:, low] * (1 - frac) + ordered[:, high] * frac
+    return sketch.T, credits.sum(axis=0)
+
+
+def _merge_quantiles(sketches, sizes, percentiles):
+    """Percentiles of the union of chunks from their per-chunk quantile sketches.
+
+    Each sketch point stands for an equal share of its chunk's paths; the
+    merged distribution is the weighted mixture of those points.
+    """
+    values = np.concatenate(sketches, axis=0)  # (chunks * points, months)
+    weights = np.concatenate([np.full(SKETCH_POINTS, size / SKETCH_POINTS) for size in sizes])
+    order = np.argsort(values, axis=0)
+    sorted_values = np.take_along_axis(values, order, axis=0)
+    cumulative = np.cumsum(weights[order], axis=0)
+    cumulative = (cumulative - weights[order] / 2) / weights.sum()
+    targets = np.asarray(percentiles) / 100
+    return {
+        p: np.array([np.interp(t, cumulative[:, m], sorted_values[:, m]) for m in range(values.shape[1])])
+        for p, t in zip(percentiles, targets)
+    }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_pool():
+    """Process pool shared by all simulations, started on first parallel run.
+
+    Workers are spawned rather than forked, since the Streamlit and API
+    processes that call this are multi-threaded.
+    """
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ProcessPoolExecutor(max_workers=WORKERS, mp_context=multiprocessing.get_context("spawn"))
+    return _pool
+
+
+@timed(CALCULATOR_SECONDS, op="simulate_credits")
+def simulate_credits(user_share, initial_credits, manufacturing_duration, decline=normal(DECLINE_RATE, 0.01),
+                     growth=normal(0.02, 0.01), growth_months=GROWTH_MONTHS, paths=100_000, seed=None,
+                     parallel=None):
+    """Monte Carlo projection of company credits with rates drawn every month.
+
+    Returns a frame with P5/P50/P95 bands for the company's and the user's
+    credits plus the expected user credits per month. ``parallel`` forces
+    (True) or disables (False) the process pool; by default it is used from
+    PARALLEL_THRESHOLD paths up.
+    """
+    duration = max(int(manufacturing_duration), 0)
+    months = duration + growth_months
+    if parallel is None:
+        parallel = paths >= PARALLEL_THRESHOLD and WORKERS > 1
+    # Chunking depends only on paths, so a seed gives the same draws serially, in parallel and on any machine
+    chunks = max(1, -(-paths // CHUNK_PATHS))
+    sizes = [paths // chunks + (i < paths % chunks) for i in range(chunks)]
+    seeds = np.random.SeedSequence(seed).spawn(chunks)
+    args = [(s, size, float(initial_credits), duration, growth_months, decline, growth) for s, size in zip(seeds, sizes)]
+
+    if parallel:
+        results = list(get_pool().map(_simulate_chunk, *zip(*args)))
+    else:
+        results = [_simulate_chunk(*a) for a in args]
+
+    bands = _merge_quantiles([r[0] for r in results], sizes, PERCENTILES)
+    expected = sum(r[1] for r in results) / paths
+    frame = {"Time Period": [f"Month {m}" for m in range(1, months + 1)]}
+    for p in PERCENTILES:
+        frame[f"Company P{p}"] = bands[p]
+    for p in PERCENTILES:
+        frame[f"User P{p}"] = bands[p] * user_share
+    frame["Expected User Credits"] = expected * user_share
+    return pd.DataFrame(frame)
+
+
+def cached_simulation(user_share, initial_credits, manufacturing_duration, decline, growth,
+                      growth_months=GROWTH_MONTHS, paths=100_000, seed=0):
+    """simulate_credits() memoized on its inputs; a fixed seed keeps reruns stable."""
+    key = (round(float(user_share), 6), round(float(initial_credits), 6), max(int(manufacturing_duration), 0),
+           tuple(decline), tuple(growth), int(growth_months), int(paths), seed)
+    return RISK_CACHE.get_or_set(key, lambda: simulate_credits(
+        user_share, initial_credits, manufacturing_duration, decline, growth, growth_months, paths, seed))
@@ -0,0 +1,201 @@
+import hashlib
+import json
+import os
+import secrets
+import threading
+import time
+from collections import namedtuple
+
+from cache import TTLCache
+from db import DB_PATH, get_pool
+
+SESSION_TTL = float(os.environ.get("SESSION_TTL", 7 * 24 * 3600))
+# How long a session's profile snapshot is served before it is reloaded
+PROFILE_TTL = float(os.environ.get("SESSION_PROFILE_TTL", 300))
+# Per-process cache in front of the backend. A logout in another process
+# takes up to this long to be seen here.
+LOCAL_CACHE_TTL = float(os.environ.get("SESSION_LOCAL_CACHE_TTL", 15))
+SESSION_DB = os.environ.get("SESSION_DB", DB_PATH)
+
+Session = namedtuple("Session", ["token", "user_id", "expires_at", "profile", "profile_loaded_at"])
+
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS sessions (
+        token_hash TEXT PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        expires_at REAL NOT NULL,
+        profile TEXT,
+        profile_loaded_at REAL
+    )
+    ''',
+    "CREATE INDEX IF NOT EXISTS idx_sessions_expires_at ON sessions (expires_at)",
+]
+
+
+def _token_hash(token):
+    # Only a digest of the token is stored, so a copy of the table cannot be replayed
+    return hashlib.sha256(token.encode("ascii")).hexdigest()
+
+
+class MemoryBackend:
+    """Sessions in a dict; for a single process and for development."""
+
+    def __init__(self):
+        self._rows = {}
+        self._lock = threading.Lock()
+
+    def save(self, key, user_id, expires_at, profile, profile_loaded_at):
+        with self._lock:
+            self._rows[key] = (user_id, expires_at, profile, profile_loaded_at)
+
+    def update_profile(self, key, profile, profile_loaded_at):
+        with self._lock:
+            row = self._rows.get(key)
+            if row is None or row[1] <= time.time():
+                return False
+            self._rows[key] = row[:2] + (profile, profile_loaded_at)
+            return True
+
+    def load(self, key):
+        row = self._rows.get(key)
+        return row if row and row[1] > time.time() else None
+
+    def delete(self, key):
+        with self._lock:
+            self._rows.pop(key, None)
+
+    def purge_expired(self):
+        now = time.time()
+        with self._lock:
+            expired = [key for key, row in self._rows.items() if row[1] <= now]
+            for key in expired:
+                del self._rows[key]
+        return len(expired)
+
+
+class SQLiteBackend:
+    """Sessions in a SQLite table, shared by every process using the file."""
+
+    def __init__(self, path=SESSION_DB):
+        self.pool = get_pool(path, schema=SCHEMA)
+
+    def save(self, key, user_id, expires_at, profile, profile_loaded_at):
+        with self.pool.connection() as conn:
+            conn.execute("INSERT OR REPLACE INTO sessions (token_hash, user_id, expires_at, profile, profile_loaded_at) "
+                         "VALUES (?, ?, ?, ?, ?)", (key, user_id, expires_at, profile, profile_loaded_at))
+
+    def update_profile(self, key, profile, profile_loaded_at):
+        # UPDATE rather than INSERT OR REPLACE: never brings back a session
+        # that was logged out or expired in the meantime
+        with self.pool.connection() as conn:
+            return conn.execute("UPDATE sessions SET profile = ?, profile_loaded_at = ? "
+                                "WHERE token_hash = ? AND expires_at > ?",
+                                (profile, profile_loaded_at, key, time.time())).rowcount > 0
+
+    def load(self, key):
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT user_id, expires_at, profile, profile_loaded_at FROM sessions "
+                               "WHERE token_hash = ? AND expires_at > ?", (key, time.time())).fetchone()
+        return tuple(row) if row else None
+
+    def delete(self, key):
+        with self.pool.connection() as conn:
+            conn.execute("DELETE FROM sessions WHERE token_hash = ?", (key,))
+
+    def purge_expired(self):
+        with self.pool.connection() as conn:
+            return conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (time.time(),)).rowcount
+
+
+class SessionStore:
+    """Opaque-token login sessions with a cached user-profile snapshot.
+
+    ``backend`` is any object with ``save``/``update_profile``/``load``/
+    ``delete``/``purge_expired`` (see MemoryBackend and SQLiteBackend). Lookups are
+    served from a short per-process cache so a page view usually costs no
+    backend round trip.
+    """
+
+    def __init__(self, backend=None, ttl=SESSION_TTL, profile_ttl=PROFILE_TTL, local_cache_ttl=LOCAL_CACHE_TTL):
+        self.backend = backend if backend is not None else SQLiteBackend()
+        self.ttl = ttl
+        self.profile_ttl = profile_ttl
+        self.local = TTLCache(maxsize=4096, ttl=local_cache_ttl, clock=time.time)
+
+    def _save(self, session):
+        key = _token_hash(session.token)
+        self.backend.save(key, session.user_id, session.expires_at,
+                          None if session.profile is None else json.dumps(session.profile),
+                          session.profile_loaded_at)
+        self.local.set(key, session)
+
+    def _update_profile(self, session):
+        """Store a new profile snapshot on a session that still exists."""
+        key = _token_hash(session.token)
+        if self.backend.update_profile(key, None if session.profile is None else json.dumps(session.profile),
+                                       session.profile_loaded_at):
+            self.local.set(key, session)
+        else:
+            self.local.pop(key)
+
+    def create(self, user_id, profile=None):
+        """Start a session for ``user_id`` and return it; ``session.token`` goes to the client."""
+        now = time.time()
+        session = Session(secrets.token_urlsafe(32), user_id, now + self.ttl,
+                          profile, now if profile is not None else None)
+        self._save(session)
+        return session
+
+    def get(self, token):
+        """The live session for ``token``, or None if it is unknown or expired."""
+        if not token or not isinstance(token, str):
+            return None
+        key = _token_hash(token)
+        session = self.local.get(key)
+        if session is None:
+            row = self.backend.load(key)
+            if row is None:
+                return None
+            user_id, expires_at, profile, profile_loaded_at = row
+            session = Session(token, user_id, expires_at, json.loads(profile) if profile else None, profile_loaded_at)
+            self.local.set(key, session)
+        if session.expires_at <= time.time():
+            self.local.pop(key)
+            return None
+        return session
+
+    def profile(self, session, loader):
+        """The session's profile snapshot, reloaded with ``loader(user_id)`` when missing or stale."""
+        now = time.time()
+        if session.profile is not None and now - session.profile_loaded_at < self.profile_ttl:
+            return session.profile
+        profile = loader(session.user_id)
+        self._update_profile(session._replace(profile=profile, profile_loaded_at=now))
+        return profile
+
+    def invalidate_profile(self, session):
+        """Force the next ``profile()`` call to reload, e.g. after the user invests."""
+        self._update_profile(session._replace(profile=None, profile_loaded_at=None))
+
+    def delete(self, token):
+        key = _token_hash(token)
+        self.local.pop(key)
+        self.backend.delete(key)
+
+    def purge_expired(self):
+        return self.backend.purge_expired()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """Process-wide SessionStore backed by SESSION_DB."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = SessionStore()
+    return _store
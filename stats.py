@@ -0,0 +1,190 @@
+import argparse
+import bisect
+import os
+import time
+from collections import namedtuple
+
+from db import connection, get_pool
+from metrics import DB_QUERY_SECONDS, timed
+from portfolio import DEFAULT_INITIAL_CREDITS, SCHEMA as PORTFOLIO_SCHEMA
+
+# Summaries older than this are refreshed by the next reader
+REFRESH_INTERVAL = float(os.environ.get("STATS_REFRESH_INTERVAL", 30))
+
+# Upper edges (percent of a company's target funding) of the share histogram buckets
+SHARE_EDGES = (0.01, 0.1, 0.5, 1, 5, 10, 25, 50)
+SHARE_LABELS = (["< 0.01%"] + [f"{lo}-{hi}%" for lo, hi in zip(SHARE_EDGES, SHARE_EDGES[1:])]
+                + [f">= {SHARE_EDGES[-1]}%"])
+
+# Platform-wide figures, folded in from the investments ledger up to
+# ``watermark`` (the last investment id seen). Deleting a ledger row resets
+# the watermark so the next refresh rebuilds from scratch.
+SCHEMA = [
+    '''
+    CREATE TABLE IF NOT EXISTS stats_summary (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        watermark INTEGER NOT NULL DEFAULT -1,
+        total_credits REAL NOT NULL DEFAULT 0,
+        allocated_credits REAL NOT NULL DEFAULT 0,
+        total_invested REAL NOT NULL DEFAULT 0,
+        holdings INTEGER NOT NULL DEFAULT 0,
+        refreshed_at REAL NOT NULL DEFAULT 0
+    )
+    ''',
+    "INSERT OR IGNORE INTO stats_summary (id) VALUES (1)",
+    '''
+    CREATE TABLE IF NOT EXISTS share_histogram (
+        bucket INTEGER PRIMARY KEY,
+        holdings INTEGER NOT NULL DEFAULT 0
+    )
+    ''',
+    '''
+    CREATE TRIGGER IF NOT EXISTS trg_investments_delete_stats AFTER DELETE ON investments
+    BEGIN
+        UPDATE stats_summary SET watermark = -1;
+    END
+    ''',
+]
+
+PlatformStats = namedtuple("PlatformStats", ["total_credits", "allocated_credits", "total_invested", "holdings",
+                                             "histogram", "refreshed_at"])
+
+SELECT_COMPANY_TERMS = '''
+    SELECT c.id, c.target_funding, COALESCE(p.initial_credits, ?)
+    FROM companies c LEFT JOIN company_projections p ON p.company_id = c.id
+'''
+SELECT_HOLDING = "SELECT SUM(amount) FROM investments WHERE user_id = ? AND company_id = ?"
+UPSERT_BUCKET = '''
+    INSERT INTO share_histogram (bucket, holdings) VALUES (?, ?)
+    ON CONFLICT (bucket) DO UPDATE SET holdings = holdings + excluded.holdings
+'''
+
+
+def _pool(path):
+    # App tables first: the delete trigger above is on investments
+    get_pool(path)
+    get_pool(path, schema=PORTFOLIO_SCHEMA)
+    return get_pool(path, schema=SCHEMA)
+
+
+def share_bucket(share_percent):
+    # bisect_right: an edge value opens the bucket above, as the labels say (50 is ">= 50%")
+    return bisect.bisect_right(SHARE_EDGES, share_percent)
+
+
+@timed(DB_QUERY_SECONDS, op="refresh_stats")
+def refresh_stats(path=None, full=False):
+    """Fold investments recorded since the last refresh into the summary.
+
+    Only the holdings touched by new ledger rows are looked up, so a refresh
+    costs O(new investments) however many users there are. ``full`` (or a
+    deleted ledger row) rebuilds everything, e.g. after a company's target
+    funding changes. Returns the number of holdings that were updated.
+    """
+    pool = _pool(path)
+    with pool.connection() as conn:
+        # Serializes refreshes and keeps new investments out until we are done
+        conn.execute("BEGIN IMMEDIATE")
+        watermark = conn.execute("SELECT watermark FROM stats_summary WHERE id = 1").fetchone()[0]
+        high = conn.execute("SELECT COALESCE(MAX(id), 0) FROM investments").fetchone()[0]
+        terms = {row[0]: (row[1], row[2]) for row in conn.execute(SELECT_COMPANY_TERMS, (DEFAULT_INITIAL_CREDITS,))}
+
+        counts = {}
+        allocated = 0.0
+        rebuild = full or watermark < 0 or high < watermark
+        if rebuild:
+            conn.execute("DELETE FROM share_histogram")
+        cursor = conn.execute("SELECT user_id, company_id, SUM(amount) FROM investments WHERE id > ? "
+                              "GROUP BY user_id, company_id", (-1 if rebuild else watermark,))
+
+        updated = 0
+        for user_id, company_id, delta in cursor:
+            target, initial = terms.get(company_id, (None, 0))
+            if not target or target <= 0:
+                continue
+            total = delta if rebuild else conn.execute(SELECT_HOLDING, (user_id, company_id)).fetchone()[0]
+            old = total - delta
+            if old > 0:
+                bucket = share_bucket(old / target * 100)
+                counts[bucket] = counts.get(bucket, 0) - 1
+            bucket = share_bucket(total / target * 100)
+            counts[bucket] = counts.get(bucket, 0) + 1
+            allocated += delta / target * initial
+            updated += 1
+
+        conn.executemany(UPSERT_BUCKET, counts.items())
+        conn.execute('''
+            UPDATE stats_summary SET
+                watermark = ?,
+                total_credits = (SELECT COALESCE(SUM(COALESCE(p.initial_credits, ?)), 0)
+                                 FROM companies c LEFT JOIN company_projections p ON p.company_id = c.id),
+                allocated_credits = CASE WHEN ? THEN ? ELSE allocated_credits + ? END,
+                total_invested = (SELECT COALESCE(SUM(total_invested), 0) FROM company_totals),
+                holdings = (SELECT COALESCE(SUM(holdings), 0) FROM share_histogram),
+                refreshed_at = ?
+            WHERE id = 1
+        ''', (high, DEFAULT_INITIAL_CREDITS, rebuild, allocated, allocated, time.time()))
+    return updated
+
+
+@timed(DB_QUERY_SECONDS, op="get_stats")
+def get_stats(path=None, max_age=REFRESH_INTERVAL):
+    """The platform summary, refreshed first if it is older than ``max_age`` seconds."""
+    pool = _pool(path)
+    with pool.connection() as conn:
+        summary = conn.execute("SELECT * FROM stats_summary WHERE id = 1").fetchone()
+    if max_age is not None and time.time() - summary["refreshed_at"] > max_age:
+        refresh_stats(path)
+        return get_stats(path, max_age=None)
+    with pool.connection() as conn:
+        counts = dict(conn.execute("SELECT bucket, holdings FROM share_histogram").fetchall())
+    histogram = [(label, counts.get(i, 0)) for i, label in enumerate(SHARE_LABELS)]
+    return PlatformStats(summary["total_credits"], summary["allocated_credits"], summary["total_invested"],
+                         summary["holdings"], histogram, summary["refreshed_at"])
+
+
+@timed(DB_QUERY_SECONDS, op="top_holders")
+def top_holders(limit=10, path=None):
+    """The largest per-user invested amounts, read off idx_users_invested_amount.
+
+    Only the amounts: the statistics page is public, so who holds them is left out.
+    """
+    with connection(path) as conn:
+        return conn.execute('''
+            SELECT invested_amount FROM users
+            WHERE invested_amount > 0 ORDER BY invested_amount DESC LIMIT ?
+        ''', (limit,)).fetchall()
+
+
+@timed(DB_QUERY_SECONDS, op="funding_progress")
+def funding_progress(limit=20, path=None):
+    """Companies with their running funding totals, most funded first."""
+    with connection(path) as conn:
+        return conn.execute('''
+            SELECT c.id, c.name, c.target_funding,
+                   COALESCE(t.total_invested, 0) AS total_invested,
+                   COALESCE(t.investment_count, 0) AS investment_count
+            FROM companies c LEFT JOIN company_totals t ON t.company_id = c.id
+            ORDER BY total_invested DESC, c.name LIMIT ?
+        ''', (limit,)).fetchall()
+
+
+@timed(DB_QUERY_SECONDS, op="user_shares")
+def user_shares(user_id, path=None):
+    """One user's holdings with their share of each company's target funding."""
+    with connection(path) as conn:
+        return conn.execute('''
+            SELECT c.name, SUM(i.amount) AS invested, SUM(i.amount) * 100.0 / c.target_funding AS share_percent
+            FROM investments i JOIN companies c ON c.id = i.company_id
+            WHERE i.user_id = ? GROUP BY i.company_id ORDER BY invested DESC
+        ''', (user_id,)).fetchall()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Refresh the platform statistics summary.")
+    parser.add_argument("--db", help="database file (defaults to green_invest.db)")
+    parser.add_argument("--full", action="store_true", help="rebuild from the whole ledger")
+    args = parser.parse_args()
+    start = time.perf_counter()
+    updated = refresh_stats(args.db, full=args.full)
+    print(f"Folded in {updated} holdings in {time.perf_counter() - start:.2f}s")
@@ -0,0 +1,21 @@
+import atexit
+import os
+import shutil
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Point every module at a throwaway copy of the database before any of them
+# is imported; they read these at import time
+_tmp = tempfile.mkdtemp(prefix="green-invest-tests-")
+atexit.register(shutil.rmtree, _tmp, ignore_errors=True)
+os.environ["GREEN_INVEST_DB"] = os.path.join(_tmp, "green_invest.db")
+os.environ["SESSION_DB"] = os.environ["GREEN_INVEST_DB"]
+os.environ["PORTFOLIO_DIR"] = os.path.join(_tmp, "portfolio")
+os.environ.pop("RESEARCH_CACHE_DB", None)
+os.environ.pop("METRICS_PORT", None)
+# Cheap password hashing; the cost is not what these tests check
+os.environ["PASSWORD_SCRYPT_N"] = "1024"
+shutil.copy(os.path.join(ROOT, "green_invest.db"), os.environ["GREEN_INVEST_DB"])
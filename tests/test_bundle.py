@@ -0,0 +1,51 @@
+import gzip
+import os
+import re
+
+from bundle import ASSETS_DIR, build_bundle, get_bundle
+from research_server import create_app
+
+
+def read_asset(name):
+    with open(os.path.join(ASSETS_DIR, name), encoding="utf-8") as f:
+        return f.read()
+
+
+def test_script_is_inlined_verbatim():
+    script = read_asset("script.js")
+    assert script in build_bundle()
+
+
+def test_template_strings_survive():
+    html = build_bundle()
+    literals = re.findall(r"`[^`]*`", read_asset("script.js"))
+    assert any("\n" in literal for literal in literals)  # the chat markup spans lines
+    for literal in literals:
+        assert literal in html
+
+
+def test_css_is_inlined_verbatim():
+    # Whitespace in selectors is significant: ".a :hover" is not ".a:hover"
+    assert read_asset("style.css") in build_bundle()
+
+
+def test_gzipped_copy_matches():
+    bundle = get_bundle()
+    assert gzip.decompress(bundle.gzipped).decode("utf-8") == bundle.html
+
+
+def test_widget_served_gzipped_when_accepted():
+    client = create_app().test_client()
+    bundle = get_bundle()
+    url = f"/widget/{bundle.etag}.html"
+
+    response = client.get(url, headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(response.data).decode("utf-8") == bundle.html
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert client.get(url, headers={"Accept-Encoding": "gzip", "If-None-Match": response.headers["ETag"]}
+                      ).status_code == 304
+
+    plain = client.get(url)
+    assert "Content-Encoding" not in plain.headers
+    assert plain.get_data(as_text=True) == bundle.html
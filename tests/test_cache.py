@@ -0,0 +1,76 @@
+import pytest
+
+from cache import TTLCache
+from projection_cache import cached_projection
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_entries_expire_after_ttl(clock):
+    cache = TTLCache(maxsize=4, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=None)
+    clock.now = 9.9
+    assert cache.get("a") == 1
+    clock.now = 10.0
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_least_recently_used_is_evicted(clock):
+    cache = TTLCache(maxsize=2, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    assert cache.evictions == 1 and len(cache) == 2
+
+
+def test_get_or_set_calls_factory_once(clock):
+    cache = TTLCache(ttl=5, clock=clock)
+    calls = []
+    factory = lambda: calls.append(1) or len(calls)  # noqa: E731
+    assert cache.get_or_set("k", factory) == cache.get_or_set("k", factory) == 1
+    clock.now = 5
+    assert cache.get_or_set("k", factory) == 2
+
+
+def test_cached_projection_normalizes_inputs():
+    cache = TTLCache()
+    first = cached_projection(10.0 / 100, 1_000_000, 6.0, 2.0 / 100, cache=cache)
+    again = cached_projection(0.1, 1_000_000.0, 6, 0.02, cache=cache)
+    assert again is first and first.chart is None
+    assert cache.stats()["hits"] == 1
+
+
+def test_cached_projection_keys_on_the_renderer():
+    cache = TTLCache()
+    renderers = [lambda frame: "first", lambda frame: "second"]
+    assert renderers[0].__qualname__ == renderers[1].__qualname__
+    charts = [cached_projection(0.1, 1_000_000, 6, 0.02, render_chart=r, cache=cache).chart for r in renderers]
+    assert charts == ["first", "second"]
+    assert cached_projection(0.1, 1_000_000, 6, 0.02, render_chart=renderers[0], cache=cache).chart == "first"
+
+
+def test_page_renderers_hit_across_reruns():
+    # Page scripts are re-executed on every rerun, so their renderers live in charts
+    from charts import credits_line_data
+
+    cache = TTLCache()
+    first = cached_projection(0.1, 1_000_000, 6, 0.02, render_chart=credits_line_data, cache=cache)
+    assert cached_projection(0.1, 1_000_000, 6, 0.02, render_chart=credits_line_data, cache=cache) is first
+    assert list(first.chart.columns) == ["Company Credits", "User's Share Credits"]
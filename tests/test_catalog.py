@@ -0,0 +1,76 @@
+import sqlite3
+
+import pytest
+
+from catalog import CATALOG_CACHE, catalog_bounds, import_companies, query_companies
+
+TAG = "Catalogtest"
+
+
+def source_db(path, rows):
+    with sqlite3.connect(path) as conn:
+        conn.execute("CREATE TABLE companies (id INTEGER PRIMARY KEY, name TEXT, description TEXT, "
+                     "target_funding REAL, energy_output REAL)")
+        conn.executemany("INSERT INTO companies VALUES (?, ?, '', ?, ?)", rows)
+    return str(path)
+
+
+# id, name, target funding, energy output; ids are clear of the seeded companies
+ROWS = [(5000 + i, f"{TAG} {name}", funding, energy) for i, (name, funding, energy) in enumerate([
+    ("alpha", 100_000, 9_000), ("Bravo", 300_000, 1_000), ("charlie", 200_000, 5_000), ("Delta", 300_000, 7_000),
+    ("echo 100%", 50_000, 2_000), ("foxtrot_x", 400_000, 3_000), ("golf", 150_000, 8_000),
+])]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def companies(tmp_path_factory):
+    assert import_companies(source_db(tmp_path_factory.mktemp("catalog") / "source.db", ROWS)) == len(ROWS)
+
+
+def names(page):
+    return [company["name"][len(TAG) + 1:] for company in page.companies]
+
+
+def test_sorts():
+    query = lambda sort: names(query_companies(TAG, sort=sort, page_size=50))  # noqa: E731
+    assert query("Name") == ["alpha", "Bravo", "charlie", "Delta", "echo 100%", "foxtrot_x", "golf"]
+    assert query("Target funding (high to low)") == ["foxtrot_x", "Bravo", "Delta", "charlie", "golf", "alpha",
+                                                     "echo 100%"]
+    assert query("Target funding (low to high)") == ["echo 100%", "alpha", "golf", "charlie", "Bravo", "Delta",
+                                                     "foxtrot_x"]
+    assert query("Energy output (high to low)")[:3] == ["alpha", "golf", "Delta"]
+    with pytest.raises(ValueError):
+        query_companies(TAG, sort="Popularity")
+
+
+def test_filters():
+    assert names(query_companies(TAG, min_funding=300_000)) == ["Bravo", "Delta", "foxtrot_x"]
+    assert names(query_companies(TAG, min_funding=150_000, min_energy=5_000)) == ["charlie", "Delta", "golf"]
+    # LIKE wildcards in the search are matched literally
+    assert names(query_companies("100%")) == ["echo 100%"]
+    assert names(query_companies("t_x")) == ["foxtrot_x"]
+    assert query_companies("o_t").total == 0
+    assert query_companies(f"  {TAG.lower()} ").total == len(ROWS)
+
+
+def test_paging():
+    pages = [query_companies(TAG, page=n, page_size=3) for n in (1, 2, 3)]
+    assert [len(p.companies) for p in pages] == [3, 3, 1]
+    assert {p.total for p in pages} == {7} and {p.page_count for p in pages} == {3}
+    assert sum((names(p) for p in pages), []) == names(query_companies(TAG, page_size=50))
+    past_end = query_companies(TAG, page=10, page_size=3)
+    assert past_end.page == 3 and past_end.companies == pages[2].companies
+    assert query_companies(f"{TAG} none", page=4).page_count == 1
+
+
+def test_results_are_cached_until_an_import(tmp_path):
+    first = query_companies(TAG, page_size=50)
+    hits = CATALOG_CACHE.hits
+    assert query_companies(TAG, page_size=50) is first
+    assert CATALOG_CACHE.hits == hits + 1
+
+    bounds = catalog_bounds()
+    added = [(5100, f"{TAG} hotel", 10_000_000, 90_000)]
+    assert import_companies(source_db(tmp_path / "more.db", added)) == 1
+    assert query_companies(TAG, page_size=50).total == len(ROWS) + 1
+    assert catalog_bounds() == (10_000_000, 90_000) != bounds
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import credit_calculator
+from credit_calculator import CreditCalculator, project_credits, project_scenarios
+
+CASES = [
+    # (user_share, initial_credits, manufacturing_duration, growth_rate)
+    (0.1, 1_000_000, 6, 0.02),
+    (0.5, 250_000, 0, 0.02),
+    (0.25, 1_000_000, 1, 0.02),
+    (0.1, 1_000_000, 6, 0.0),
+    (0.1, 1_000_000, 6, -0.03),
+    (1.0, 1_000_000, 48, 0.05),
+]
+
+
+def oracle(user_share, initial_credits, manufacturing_duration, growth_rate):
+    calc = CreditCalculator(user_share, initial_credits, manufacturing_duration, growth_rate)
+    calc.calculate_manufacturing_loss()
+    calc.calculate_growth_after_manufacturing()
+    return calc.get_data()
+
+
+@pytest.mark.parametrize("args", CASES)
+def test_project_credits_matches_calculator(args):
+    pd.testing.assert_frame_equal(project_credits(*args), oracle(*args), check_exact=False, rtol=1e-12)
+
+
+@pytest.mark.parametrize("args", CASES)
+def test_project_scenarios_matches_calculator(args):
+    expected = oracle(*args)
+    company, user = project_scenarios(*args)
+    np.testing.assert_allclose(company[0], expected["Company Credits"], rtol=1e-12)
+    np.testing.assert_allclose(user[0], expected["User's Share Credits"], rtol=1e-12)
+
+
+def test_project_scenarios_batch_matches_calculator():
+    shares, initial, durations, growth = (np.array(column) for column in zip(*CASES))
+    company, user = project_scenarios(shares, initial, durations, growth)
+    for row, args in enumerate(CASES):
+        expected = oracle(*args)
+        horizon = len(expected)
+        np.testing.assert_allclose(company[row, :horizon], expected["Company Credits"], rtol=1e-12)
+        np.testing.assert_allclose(user[row, :horizon], expected["User's Share Credits"], rtol=1e-12)
+        assert np.isnan(company[row, horizon:]).all()
+
+
+def test_one_month_horizon(monkeypatch):
+    monkeypatch.setattr(credit_calculator, "GROWTH_MONTHS", 0)
+    expected = oracle(0.1, 1_000_000, 1, 0.02)
+    assert len(expected) == 1
+    pd.testing.assert_frame_equal(project_credits(0.1, 1_000_000, 1, 0.02, growth_months=0), expected,
+                                  check_exact=False, rtol=1e-12)
+    company, _ = project_scenarios(0.1, 1_000_000, 1, 0.02, growth_months=0)
+    np.testing.assert_allclose(company[0], expected["Company Credits"], rtol=1e-12)
@@ -0,0 +1,94 @@
+import uuid
+
+import pytest
+
+import passwords
+from db import ConnectionPool, PoolExhausted, check_credentials, connection, create_user
+
+
+@pytest.fixture
+def scrypt_calls(monkeypatch):
+    calls = []
+    scrypt = passwords._scrypt
+
+    def counting(*args):
+        calls.append(args)
+        return scrypt(*args)
+
+    monkeypatch.setattr(passwords, "_scrypt", counting)
+    return calls
+
+
+@pytest.fixture
+def user():
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    create_user(name, "correct horse")
+    return name
+
+
+def test_check_credentials(user):
+    assert check_credentials(user, "correct horse")["username"] == user
+    assert check_credentials(user, "wrong") is None
+
+
+def test_unknown_user_costs_a_hash(user, scrypt_calls):
+    check_credentials("missing", "wrong")  # the dummy hash is made on first use
+    scrypt_calls.clear()
+    check_credentials(user, "wrong")
+    wrong_password = len(scrypt_calls)
+    scrypt_calls.clear()
+
+    assert check_credentials(f"missing-{uuid.uuid4().hex}", "wrong") is None
+    assert len(scrypt_calls) == wrong_password == 1
+
+
+def test_emails_are_unique_ignoring_case():
+    tag = uuid.uuid4().hex[:8]
+    assert create_user(f"test-{tag}-a", "pw", f"Investor-{tag}@Example.com ")
+    assert not create_user(f"test-{tag}-b", "pw", f"investor-{tag}@example.com")
+    assert create_user(f"test-{tag}-c", "pw")
+    assert create_user(f"test-{tag}-d", "pw", "")
+
+
+def stored_password(username):
+    with connection() as conn:
+        return conn.execute("SELECT password FROM users WHERE username = ?", (username,)).fetchone()[0]
+
+
+@pytest.mark.parametrize("plaintext", ["legacy-password", "scrypt$not-a-hash", "scrypt$1$2$3$abc$def"])
+def test_plaintext_password_is_migrated_on_login(plaintext):
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    with connection() as conn:
+        conn.execute("INSERT INTO users (username, password) VALUES (?, ?)", (name, plaintext))
+
+    assert check_credentials(name, "wrong") is None
+    assert stored_password(name) == plaintext
+    assert check_credentials(name, plaintext)["username"] == name
+    migrated = stored_password(name)
+    assert passwords.is_hashed(migrated) and not passwords.needs_rehash(migrated)
+    assert check_credentials(name, plaintext)["username"] == name
+    assert stored_password(name) == migrated
+
+
+def test_password_rehashed_when_cost_changes(monkeypatch):
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    current = passwords.get_hasher()
+    monkeypatch.setattr(passwords, "_hasher", passwords.Hasher(n=512))
+    create_user(name, "correct horse")
+    old = stored_password(name)
+    assert old.startswith("scrypt$512$")
+
+    monkeypatch.setattr(passwords, "_hasher", current)
+    assert check_credentials(name, "correct horse")["username"] == name
+    assert stored_password(name).startswith(f"scrypt${current.params[0]}$")
+    assert check_credentials(name, "correct horse")["username"] == name
+
+
+def test_exhausted_pool_raises_pool_exhausted(tmp_path):
+    pool = ConnectionPool(str(tmp_path / "pool.db"), size=1, timeout=0.05, schema=[])
+    with pool.connection():
+        with pytest.raises(PoolExhausted, match="1 in use"):
+            with pool.connection():
+                pass
+    with pool.connection() as conn:
+        assert conn.execute("SELECT 1").fetchone()[0] == 1
@@ -0,0 +1,28 @@
+import pytest
+
+import images
+import resources
+from images import IMAGE_CACHE, image_bytes
+
+
+@pytest.fixture(autouse=True)
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(images, "IMAGE_CACHE_DIR", str(tmp_path / "variants"))
+    IMAGE_CACHE.clear()
+    yield tmp_path / "variants"
+    IMAGE_CACHE.clear()
+
+
+def test_variant_is_encoded_once_and_written(cache_dir, monkeypatch):
+    data = image_bytes("company1.jpg", width=100)
+    assert data and [p.name.endswith("-100.webp") for p in cache_dir.iterdir()] == [True]
+    monkeypatch.setattr(images, "_encode", lambda *args: pytest.fail("should be cached"))
+    assert image_bytes("company1.jpg", width=100) == data
+
+
+def test_missing_or_unreadable_images_give_none(tmp_path, monkeypatch):
+    (tmp_path / "broken.jpg").write_bytes(b"data:image/jpeg;base64,/9j/4AAQ")
+    monkeypatch.setattr(resources, "ASSET_DIRS", (str(tmp_path),))
+    assert image_bytes("broken.jpg") is None
+    assert image_bytes("missing.jpg") is None
+    assert image_bytes(None) is None
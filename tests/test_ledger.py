@@ -0,0 +1,62 @@
+import sqlite3
+import uuid
+
+import pytest
+
+from db import check_credentials, connection, create_user
+from ledger import CO2_TONS_PER_KWH, rebuild_aggregates, record_investment
+
+
+def new_user():
+    name = f"test-{uuid.uuid4().hex[:8]}"
+    create_user(name, "pw")
+    return check_credentials(name, "pw")["id"]
+
+
+def totals():
+    """Every running total the triggers maintain, rounded to absorb float drift."""
+    with connection() as conn:
+        users = conn.execute("SELECT id, invested_amount, energy_produced, co_saved FROM users").fetchall()
+        companies = conn.execute("SELECT company_id, total_invested, energy_produced, co_saved, investment_count "
+                                 "FROM company_totals WHERE investment_count > 0").fetchall()
+    return ({row[0]: tuple(round(v, 6) for v in row[1:]) for row in users},
+            {row[0]: tuple(round(v, 6) for v in row[1:]) for row in companies})
+
+
+def test_investment_updates_user_and_company_totals():
+    user = new_user()
+    _, before = totals()
+    with connection() as conn:
+        target, output = conn.execute("SELECT target_funding, energy_output FROM companies WHERE id = 1").fetchone()
+
+    assert record_investment(user, 1, 1000)
+    energy = 1000 / target * output
+    users, companies = totals()
+    assert users[user] == tuple(round(v, 6) for v in (1000, energy, energy * CO2_TONS_PER_KWH))
+    assert companies[1][0] == pytest.approx(before.get(1, (0,))[0] + 1000)
+    assert companies[1][3] == before.get(1, (0, 0, 0, 0))[3] + 1
+
+
+def test_triggers_match_rebuild_after_inserts_and_deletes():
+    users = [new_user() for _ in range(3)]
+    ids = [record_investment(user, company, amount)
+           for user, company, amount in [(users[0], 1, 500), (users[0], 2, 250), (users[1], 1, 1000),
+                                         (users[2], 3, 75), (users[2], 3, 125)]]
+    with connection() as conn:
+        conn.executemany("DELETE FROM investments WHERE id = ?", [(ids[1],), (ids[3],)])
+    maintained = totals()
+
+    rebuild_aggregates()
+    assert totals() == maintained
+    assert maintained[0][users[0]][0] == 500 and maintained[0][users[2]][0] == 125
+
+
+def test_rejected_investments():
+    user = new_user()
+    assert record_investment(user, 999_999, 100) is None
+    with pytest.raises(ValueError):
+        record_investment(user, 1, 0)
+    investment = record_investment(user, 1, 100)
+    with pytest.raises(sqlite3.IntegrityError, match="append-only"):
+        with connection() as conn:
+            conn.execute("UPDATE investments SET amount = 1 WHERE id = ?", (investment,))
@@ -0,0 +1,76 @@
+import sqlite3
+
+import numpy as np
+import pytest
+
+import portfolio
+from credit_calculator import COLUMNS, project_credits
+from db import get_pool
+from portfolio import (DEFAULT_GROWTH_RATE, DEFAULT_INITIAL_CREDITS, DEFAULT_MANUFACTURING_DURATION, build_portfolio,
+                       load_portfolio, user_holdings, user_projection)
+
+# (user_id, company_id, amount); the seeded companies have ids 1-3
+INVESTMENTS = [(1, 1, 1000), (1, 1, 500), (1, 3, 750), (2, 2, 5000), (3, 1, 100), (3, 2, 200), (3, 3, 300), (4, 2, 50)]
+# Per (user, company) totals, in the order the build writes them
+HOLDINGS = [(1, 1, 1500), (1, 3, 750), (2, 2, 5000), (3, 1, 100), (3, 2, 200), (3, 3, 300), (4, 2, 50)]
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    path = str(tmp_path / "green_invest.db")
+    get_pool(path)
+    with sqlite3.connect(path) as conn:
+        conn.executemany("INSERT INTO users (id, username, password) VALUES (?, ?, 'x')",
+                         [(i, f"user{i}") for i in range(1, 6)])
+        conn.executemany("INSERT INTO investments (user_id, company_id, amount) VALUES (?, ?, ?)", INVESTMENTS)
+        # Left behind by a deleted company; foreign keys are off on this connection
+        conn.execute("INSERT INTO investments (user_id, company_id, amount) VALUES (2, 99, 10)")
+    return path
+
+
+@pytest.fixture
+def targets(db_path):
+    with sqlite3.connect(db_path) as conn:
+        return dict(conn.execute("SELECT id, target_funding FROM companies"))
+
+
+def company_curve():
+    return project_credits(1.0, DEFAULT_INITIAL_CREDITS, DEFAULT_MANUFACTURING_DURATION,
+                           DEFAULT_GROWTH_RATE)[COLUMNS[2]].to_numpy()
+
+
+@pytest.mark.parametrize("chunk_size", [1, 3, 1000])
+def test_build_writes_every_holding(db_path, targets, tmp_path, chunk_size):
+    out_dir = str(tmp_path / "portfolio")
+    meta = build_portfolio(db_path, out_dir, chunk_size=chunk_size)
+    built = load_portfolio(out_dir)
+
+    assert meta["rows"] == built.meta["rows"] == len(HOLDINGS)
+    assert list(zip(built.user_ids, built.company_ids, built.invested)) == HOLDINGS
+    shares = np.array([invested / targets[company] for _, company, invested in HOLDINGS])
+    np.testing.assert_allclose(built.shares, shares)
+    np.testing.assert_allclose(built.credits, shares[:, None] * company_curve(), rtol=1e-6)
+    assert len(built.meta["months"]) == built.credits.shape[1]
+
+
+def test_rebuild_replaces_the_output(db_path, tmp_path):
+    out_dir = str(tmp_path / "portfolio")
+    build_portfolio(db_path, out_dir)
+    with sqlite3.connect(db_path) as conn:
+        conn.execute("INSERT INTO investments (user_id, company_id, amount) VALUES (5, 1, 10)")
+    assert build_portfolio(db_path, out_dir)["rows"] == len(HOLDINGS) + 1
+    assert user_holdings(load_portfolio(out_dir), 5) == slice(len(HOLDINGS), len(HOLDINGS) + 1)
+    assert [p.name for p in tmp_path.iterdir() if p.name.startswith("portfolio")] == ["portfolio"]
+
+
+def test_user_projection_sums_holdings(db_path, targets, tmp_path):
+    out_dir = str(tmp_path / "portfolio")
+    assert user_projection(1, out_dir) is None
+    portfolio.PORTFOLIO_CACHE.clear()
+    build_portfolio(db_path, out_dir)
+
+    projected = user_projection(1, out_dir)
+    expected = (1500 / targets[1] + 750 / targets[3]) * company_curve()
+    np.testing.assert_allclose(projected[COLUMNS[2]], expected, rtol=1e-6)
+    assert projected[COLUMNS[0]].iloc[0] == "Month 1"
+    assert not user_projection(5, out_dir)[COLUMNS[2]].any()
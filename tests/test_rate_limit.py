@@ -0,0 +1,116 @@
+import pytest
+
+from rate_limit import CircuitBreaker, CircuitOpen, RateLimited, RateLimiter, TokenBucket
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock():
+    return Clock()
+
+
+def test_bucket_allows_burst_then_waits(clock):
+    bucket = TokenBucket(rate=2.0, burst=3, clock=clock)
+    assert [bucket.take() for _ in range(3)] == [0.0, 0.0, 0.0]
+    assert bucket.take() == pytest.approx(0.5)
+
+
+def test_bucket_refills_at_rate(clock):
+    bucket = TokenBucket(rate=2.0, burst=3, clock=clock)
+    for _ in range(3):
+        bucket.take()
+    clock.advance(0.5)
+    assert bucket.take() == 0.0
+    assert bucket.take() == pytest.approx(0.5)
+
+
+def test_bucket_never_exceeds_burst(clock):
+    bucket = TokenBucket(rate=2.0, burst=3, clock=clock)
+    clock.advance(3600)
+    assert [bucket.take() for _ in range(4)][-1] == pytest.approx(0.5)
+
+
+def test_limiter_is_per_client(clock):
+    limiter = RateLimiter(rate=1.0, burst=2, clock=clock)
+    limiter.check("a")
+    limiter.check("a")
+    with pytest.raises(RateLimited) as excinfo:
+        limiter.check("a")
+    assert excinfo.value.retry_after == pytest.approx(1.0)
+    assert excinfo.value.retry_after_header() == "1"
+    limiter.check("b")
+    clock.advance(1.0)
+    limiter.check("a")
+
+
+def test_limiter_forgets_idle_clients_with_a_full_bucket(clock):
+    limiter = RateLimiter(rate=1.0, burst=2, clock=clock)
+    limiter.check("a")
+    limiter.check("a")
+    clock.advance(2.0)
+    assert limiter.buckets.get("a") is None
+    limiter.check("a")
+    limiter.check("a")
+
+
+def fail(breaker, times=1):
+    for _ in range(times):
+        breaker.before_call()
+        breaker.record(False)
+
+
+def test_breaker_opens_after_consecutive_failures(clock):
+    breaker = CircuitBreaker("up", failures=3, reset=10.0, clock=clock)
+    fail(breaker, 2)
+    breaker.before_call()
+    breaker.record(True)
+    fail(breaker, 2)
+    assert breaker.state == "closed"
+    fail(breaker)
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpen) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_after == pytest.approx(10.0)
+
+
+def test_breaker_half_open_lets_one_trial_through_then_closes(clock):
+    breaker = CircuitBreaker("up", failures=1, reset=10.0, clock=clock)
+    fail(breaker)
+    clock.advance(10.0)
+    breaker.before_call()
+    assert breaker.state == "half_open"
+    with pytest.raises(CircuitOpen):
+        breaker.before_call()
+    breaker.record(True)
+    assert breaker.state == "closed"
+    breaker.before_call()
+
+
+def test_breaker_failed_trial_reopens(clock):
+    breaker = CircuitBreaker("up", failures=3, reset=10.0, clock=clock)
+    fail(breaker, 3)
+    clock.advance(10.0)
+    fail(breaker)
+    assert breaker.state == "open"
+    clock.advance(5.0)
+    with pytest.raises(CircuitOpen) as excinfo:
+        breaker.before_call()
+    assert excinfo.value.retry_after == pytest.approx(5.0)
+
+
+def test_breaker_counts_slow_calls_as_failures(clock):
+    breaker = CircuitBreaker("up", failures=2, slow_call=1.0, clock=clock)
+    for _ in range(2):
+        breaker.before_call()
+        breaker.record(True, elapsed=1.5)
+    assert breaker.state == "open"
@@ -0,0 +1,72 @@
+import time
+
+import pytest
+
+from research import ResearchClient
+from research_stub import StubUpstream
+
+LATENCY = 0.4
+
+
+@pytest.fixture
+def stub():
+    with StubUpstream() as stub:
+        yield stub
+
+
+def test_fan_out_is_concurrent(stub):
+    # DuckDuckGo and the Wikipedia search start together, then the three
+    # summaries together: two rounds, not five calls in a row
+    stub.latency = {"ddg": LATENCY, "search": LATENCY, "summary": LATENCY}
+    client = ResearchClient(**stub.client_urls(), deadline=5)
+    started = time.perf_counter()
+    payload, status = client.research("solar panels")
+    elapsed = time.perf_counter() - started
+
+    assert status == 200 and not payload["partial"]
+    assert len(payload["sources"]) == 7
+    assert stub.calls == {"ddg": 1, "search": 1, "summary": 3}
+    assert elapsed < 3 * LATENCY  # the sum would be 5 * LATENCY
+
+
+def test_slowest_source_sets_the_pace(stub):
+    stub.latency = {"ddg": 2 * LATENCY}
+    client = ResearchClient(**stub.client_urls(), deadline=5)
+    started = time.perf_counter()
+    payload, _ = client.research("solar panels")
+    elapsed = time.perf_counter() - started
+
+    assert not payload["partial"]
+    assert 2 * LATENCY <= elapsed < 3 * LATENCY
+
+
+def test_deadline_returns_partial_results(stub):
+    stub.latency = {"summary": 5.0}
+    client = ResearchClient(**stub.client_urls(), deadline=LATENCY)
+    started = time.perf_counter()
+    payload, status = client.research("solar panels")
+    elapsed = time.perf_counter() - started
+
+    assert status == 200
+    assert payload["partial"]
+    assert [s["source"] for s in payload["sources"]] == ["DuckDuckGo"] * 4
+    assert payload["summary"].startswith("solar panels is a topic")
+    assert elapsed < LATENCY + 0.5
+
+
+def test_failing_upstream_is_skipped(stub):
+    stub.failing = {"ddg"}
+    client = ResearchClient(**stub.client_urls(), deadline=5)
+    payload, _ = client.research("solar panels")
+
+    assert not payload["partial"]
+    assert {s["source"] for s in payload["sources"]} == {"Wikipedia"}
+
+
+def test_non_json_body_counts_as_a_failure(stub):
+    stub.garbled = {"ddg"}
+    client = ResearchClient(**stub.client_urls(), deadline=5)
+    payload, _ = client.research("solar panels")
+
+    assert {s["source"] for s in payload["sources"]} == {"Wikipedia"}
+    assert client.breakers["duckduckgo"].stats()["consecutive_failures"] == 1
@@ -0,0 +1,158 @@
+import json
+import threading
+import time
+
+import pytest
+
+from research import ResearchClient
+from research_cache import ResearchCache
+from research_server import create_app
+from research_stub import StubUpstream
+
+
+@pytest.fixture
+def stub():
+    with StubUpstream() as stub:
+        yield stub
+
+
+def answers(cache, client, q):
+    items = list(cache.stream(q, lambda: client.stream_research(q)))
+    assert items[-1][0] == "answer"
+    return items
+
+
+def test_stream_counts_hits_and_misses(stub):
+    client = ResearchClient(**stub.client_urls())
+    cache = ResearchCache(db_path=None)
+    first = answers(cache, client, "solar panels")
+    again = answers(cache, client, "Solar  Panels")
+
+    assert [kind for kind, _ in first].count("source") == 7
+    assert again[-1] == first[-1]
+    assert {source["url"] for kind, source in again if kind == "source"} == \
+           {source["url"] for kind, source in first if kind == "source"}
+    stats = cache.stats()
+    assert (stats["misses"], stats["memory_hits"]) == (1, 1)
+    assert stub.calls["ddg"] == 1
+
+
+def test_concurrent_streams_share_one_fetch(stub):
+    stub.latency = {"ddg": 0.3}
+    client = ResearchClient(**stub.client_urls())
+    cache = ResearchCache(db_path=None)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(answers(cache, client, "solar panels")))
+               for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert len(results) == 4
+    assert all(r[-1] == results[0][-1] for r in results)
+    assert stub.calls["ddg"] == 1
+    stats = cache.stats()
+    assert (stats["misses"], stats["coalesced"]) == (1, 3)
+
+
+def test_get_or_fetch_shares_the_stream_path():
+    cache = ResearchCache(db_path=None)
+    answer = ({"summary": "s", "sources": [], "partial": False}, 200)
+    assert cache.get_or_fetch("q", lambda: answer) == answer
+    assert cache.get_or_fetch("q", lambda: pytest.fail("should be cached")) == answer
+    assert (cache.stats()["misses"], cache.stats()["memory_hits"]) == (1, 1)
+
+
+def test_leader_closing_early_does_not_fail_waiters():
+    cache = ResearchCache(db_path=None)
+    release = threading.Event()
+    answer = ({"summary": "s", "sources": [{"url": "a"}, {"url": "b"}], "partial": False}, 200)
+
+    def upstream():
+        yield "source", {"url": "a"}
+        release.wait(5)
+        yield "source", {"url": "b"}
+        yield "answer", answer
+
+    leader = cache.stream("q", upstream)
+    assert next(leader) == ("source", {"url": "a"})
+    results = []
+    waiter = threading.Thread(target=lambda: results.append(list(cache.stream("q", upstream))))
+    waiter.start()
+    while cache.stats()["coalesced"] < 1:
+        time.sleep(0.01)
+    leader.close()
+    release.set()
+    waiter.join(5)
+
+    assert results == [[("source", {"url": "a"}), ("source", {"url": "b"}), ("answer", answer)]]
+    assert cache.get("q") == answer
+
+
+def sse_events(response):
+    body = response.get_data(as_text=True)
+    response.close()
+    events = []
+    for block in body.strip().split("\n\n"):
+        event, data = block.split("\n")
+        events.append((event[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+
+def test_persistent_hit_streams_its_sources(stub, tmp_path):
+    db_path = str(tmp_path / "research.db")
+    urls = stub.client_urls()
+    first = create_app(client=ResearchClient(**urls), cache=ResearchCache(db_path=db_path)).test_client()
+    sse_events(first.post("/api/research/stream", json={"query": "solar panels"}))
+
+    cache = ResearchCache(db_path=db_path)
+    app = create_app(client=ResearchClient(**urls), cache=cache).test_client()
+    events = sse_events(app.post("/api/research/stream", json={"query": "solar panels"}))
+
+    assert [event for event, _ in events].count("source") == 7
+    assert [event for event, _ in events][-2:] == ["answer", "done"]
+    assert cache.stats()["persistent_hits"] == 1
+    assert stub.calls["ddg"] == 1
+
+
+def test_stale_answer_served_while_upstream_fails(stub):
+    client = ResearchClient(**stub.client_urls())
+    cache = ResearchCache(db_path=None, ttl=0)
+    app = create_app(client=client, cache=cache).test_client()
+    fresh = answers(cache, client, "solar panels")[-1][1]
+    stub.failing = {"ddg", "search", "summary"}
+    payload, status = answers(cache, client, "solar panels")[-1][1]
+
+    assert payload["stale"] and payload["summary"] == fresh[0]["summary"]
+    assert app.post("/api/research", json={"query": "solar panels"}).json["stale"]
+    events = sse_events(app.post("/api/research/stream", json={"query": "solar panels"}))
+    assert [data for event, data in events if event == "source"] == fresh[0]["sources"]
+    assert dict(events)["answer"]["stale"]
+    assert cache.stats()["stale_served"] == 3
+
+
+def test_stale_fallback_replaces_sources_already_streamed():
+    cache = ResearchCache(db_path=None, ttl=0)
+    good = ({"summary": "old", "sources": [{"url": "a"}, {"url": "b"}], "partial": False}, 200)
+    cache.put("q", good)
+
+    def failing():
+        yield "source", {"url": "x"}
+        raise RuntimeError("upstream down")
+
+    items = list(cache.stream("q", failing))
+    assert items == [("source", {"url": "x"}), ("reset", None), ("source", {"url": "a"}), ("source", {"url": "b"}),
+                     ("answer", ({**good[0], "stale": True}, 200))]
+
+
+def test_stream_route_is_counted(stub):
+    cache = ResearchCache(db_path=None)
+    app = create_app(client=ResearchClient(**stub.client_urls()), cache=cache).test_client()
+    for _ in range(2):
+        response = app.post("/api/research/stream", json={"query": "solar panels"})
+        assert "event: answer" in response.get_data(as_text=True)
+        response.close()
+
+    stats = app.get("/api/research/stats").json
+    assert (stats["misses"], stats["memory_hits"]) == (1, 1)
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+import pytest
+
+import metrics
+from metrics import profiling_allowed
+from rate_limit import RateLimiter
+from research_cache import ResearchCache
+from research_server import create_app
+
+
+class BrokenClient:
+    def research(self, q):
+        raise RuntimeError("upstream exploded")
+
+    def stream_research(self, q):
+        raise RuntimeError("upstream exploded")
+        yield
+
+
+@pytest.fixture
+def app(monkeypatch):
+    monkeypatch.setattr("metrics.PROFILING", "1")
+    return create_app(client=BrokenClient(), cache=ResearchCache(db_path=None))
+
+
+def test_profiled_request_returns_a_profile(app):
+    response = app.test_client().get("/metrics?profile=1")
+    assert response.headers["X-Profiled-Status"] == "200 OK"
+    assert sys.getprofile() is None
+
+
+@pytest.mark.parametrize("propagate", [True, False])
+def test_profiler_stopped_when_the_view_raises(app, propagate):
+    app.config["PROPAGATE_EXCEPTIONS"] = propagate
+    client = app.test_client()
+    if propagate:
+        with pytest.raises(RuntimeError):
+            client.post("/api/research?profile=1", json={"query": "solar"})
+    else:
+        response = client.post("/api/research?profile=1", json={"query": "solar"})
+        assert response.headers["X-Profiled-Status"].startswith("500")
+    assert sys.getprofile() is None
+
+
+@pytest.mark.parametrize("trusted_proxies, second_status", [(0, 429), (1, 500)])
+def test_rate_limit_keys_on_trusted_forwarded_address(trusted_proxies, second_status):
+    app = create_app(client=BrokenClient(), cache=ResearchCache(db_path=None),
+                     limiter=RateLimiter(rate=0.001, burst=1), trusted_proxies=trusted_proxies)
+    client = app.test_client()
+
+    def ask(forwarded_for):
+        return client.post("/api/research", json={"query": "solar"}, headers={"X-Forwarded-For": forwarded_for},
+                           environ_base={"REMOTE_ADDR": "10.0.0.1"})
+
+    assert ask("203.0.113.7").status_code == 500
+    # Behind one proxy the second client has its own bucket; a spoofed leftmost entry does not help
+    assert ask("203.0.113.8").status_code == second_status
+    assert ask("203.0.113.8, 203.0.113.7").status_code == 429
+
+
+@pytest.mark.parametrize("setting, client, allowed", [
+    ("0", "127.0.0.1", False),
+    ("local", "127.0.0.1", True),
+    ("local", "203.0.113.7", False),
+    ("1", "203.0.113.7", True),
+])
+def test_profiling_allowed(monkeypatch, setting, client, allowed):
+    monkeypatch.setattr("metrics.PROFILING", setting)
+    assert profiling_allowed("1", client) is allowed
+    assert not profiling_allowed(None, client)
+
+
+def test_profiling_is_off_by_default():
+    env = {k: v for k, v in os.environ.items() if k != "PROFILING"}
+    out = subprocess.run([sys.executable, "-c", "import metrics; print(metrics.PROFILING)"],
+                         cwd=os.path.dirname(metrics.__file__), env=env, capture_output=True, text=True,
+                         check=True).stdout
+    assert out.strip() == "0"
@@ -0,0 +1,20 @@
+import json
+
+import resources
+from resources import RESOURCE_CACHE, load_json, resolve_asset
+
+
+def test_resolve_asset_prefers_assets_dir():
+    assert resolve_asset("user.jpg").endswith("assets/user.jpg")
+    assert resolve_asset("company1.jpg") == f"{resources.ROOT_DIR}/company1.jpg"
+    assert resolve_asset("missing.json") is None
+    assert resolve_asset("") is None
+
+
+def test_load_json_parses_once(tmp_path, monkeypatch):
+    monkeypatch.setattr(resources, "ASSET_DIRS", (str(tmp_path),))
+    RESOURCE_CACHE.clear()
+    (tmp_path / "anim.json").write_text(json.dumps({"v": "5.7"}))
+    assert load_json("anim.json") == {"v": "5.7"}
+    assert load_json("anim.json") is load_json("anim.json")
+    assert load_json("missing.json") is None
@@ -0,0 +1,42 @@
+import numpy as np
+import pytest
+
+from credit_calculator import project_credits
+from risk_engine import fixed, normal, simulate_credits, triangular, uniform
+
+
+@pytest.mark.parametrize("make", [
+    lambda center: triangular(center, center, center),
+    lambda center: uniform(center, center),
+    lambda center: normal(center, 0.0),
+    fixed,
+])
+def test_zero_spread_matches_deterministic_projection(make):
+    risk = simulate_credits(0.1, 1_000_000, 6, decline=make(0.05), growth=make(0.02), paths=1_000, seed=0,
+                            parallel=False)
+    expected = project_credits(0.1, 1_000_000, 6, 0.02)
+    for column in ("User P5", "User P50", "User P95", "Expected User Credits"):
+        np.testing.assert_allclose(risk[column], expected["User's Share Credits"], rtol=1e-9)
+
+
+def test_zero_width_triangle_is_fixed():
+    assert triangular(0.02, 0.02, 0.02) == fixed(0.02)
+
+
+def test_bands_are_ordered():
+    risk = simulate_credits(0.1, 1_000_000, 6, decline=triangular(0.03, 0.05, 0.07),
+                            growth=normal(0.02, 0.01), paths=5_000, seed=1, parallel=False)
+    assert (risk["User P5"] <= risk["User P50"]).all()
+    assert (risk["User P50"] <= risk["User P95"]).all()
+
+
+def test_seed_is_reproducible():
+    run = lambda: simulate_credits(0.1, 1_000_000, 6, paths=2_000, seed=7, parallel=False)  # noqa: E731
+    assert run().equals(run())
+
+
+def test_parallel_matches_serial(monkeypatch):
+    monkeypatch.setattr("risk_engine.WORKERS", 4)
+    run = lambda parallel: simulate_credits(0.1, 1_000_000, 6, decline=triangular(0.03, 0.05, 0.07),  # noqa: E731
+                                            paths=120_000, seed=3, parallel=parallel)
+    assert run(True).equals(run(False))
@@ -0,0 +1,47 @@
+import pytest
+
+from sessions import MemoryBackend, SessionStore, SQLiteBackend
+
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    return MemoryBackend() if request.param == "memory" else SQLiteBackend(str(tmp_path / "sessions.db"))
+
+
+def other_process(backend):
+    # A second store on the same backend, with its own local cache
+    return SessionStore(backend, local_cache_ttl=0)
+
+
+def test_profile_is_cached_on_the_session(backend):
+    store = SessionStore(backend)
+    session = store.create(1, profile={"name": "a"})
+    assert store.profile(store.get(session.token), lambda user_id: pytest.fail("should be cached")) == {"name": "a"}
+
+    store.invalidate_profile(session)
+    assert store.profile(store.get(session.token), lambda user_id: {"name": "b"}) == {"name": "b"}
+    assert other_process(backend).get(session.token).profile == {"name": "b"}
+
+
+def test_profile_refresh_does_not_revive_a_logged_out_session(backend):
+    store = SessionStore(backend)
+    session = store.create(1)
+    other_process(backend).delete(session.token)
+
+    assert store.profile(session, lambda user_id: {"name": "a"}) == {"name": "a"}
+    store.invalidate_profile(session)
+    assert other_process(backend).get(session.token) is None
+    assert store.get(session.token) is None
+
+
+def test_profile_refresh_does_not_extend_an_expired_session(backend):
+    store = SessionStore(backend, ttl=-1)
+    session = store.create(1)
+    store.profile(session, lambda user_id: {"name": "a"})
+    assert other_process(backend).get(session.token) is None
+
+
+def test_non_string_tokens_are_ignored(backend):
+    store = SessionStore(backend)
+    assert store.get(None) is None
+    assert store.get(b"token") is None
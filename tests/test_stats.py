@@ -0,0 +1,37 @@
+import pytest
+
+from db import check_credentials, connection, create_user
+from ledger import record_investment
+from stats import SHARE_EDGES, SHARE_LABELS, share_bucket, top_holders
+
+
+@pytest.mark.parametrize("share, label", [
+    (0.0, "< 0.01%"),
+    (0.009, "< 0.01%"),
+    (0.01, "0.01-0.1%"),
+    (0.1, "0.1-0.5%"),
+    (24.99, "10-25%"),
+    (25, "25-50%"),
+    (49.99, "25-50%"),
+    (50, ">= 50%"),
+    (100, ">= 50%"),
+])
+def test_share_bucket_edges(share, label):
+    assert SHARE_LABELS[share_bucket(share)] == label
+
+
+@pytest.mark.parametrize("edge", SHARE_EDGES)
+def test_edges_open_the_bucket_above(edge):
+    assert share_bucket(edge) == SHARE_EDGES.index(edge) + 1
+
+
+def test_top_holders_are_anonymous():
+    create_user("stats-holder", "correct horse", "holder@example.com")
+    user = check_credentials("stats-holder", "correct horse")
+    with connection() as conn:
+        company_id = conn.execute("SELECT id FROM companies WHERE target_funding > 0 LIMIT 1").fetchone()["id"]
+    record_investment(user["id"], company_id, 1_000_000_000)
+
+    holders = top_holders()
+    assert holders[0]["invested_amount"] >= 1_000_000_000
+    assert all(row.keys() == ["invested_amount"] for row in holders)